@@ -1,8 +1,26 @@
+import argparse
 import os
-from typing import Dict
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
-from codecarbon import EmissionsTracker
+
+from src.carbon.carbon_stats import ALL_NAME, CI_COLUMNS, CI_DIR_NAME, RunningStats, get_ci_rows
+from src.carbon.energy_model import POWER_MODEL_PATH, RAPL_ROOT, PowerModel, RaplReader
+from src.scheduler.rnadvisor_command import RNAdvisorCommand
+from src.scheduler.worker_pool import WorkerPool
+from src.utils.benchmark_history import BenchmarkHistory
+from src.utils.csv_cache import get_file_hash
+from src.utils.result_cache import ResultCache
+from src.utils.workload_generator import read_manifest
+
+try:
+    from codecarbon import EmissionsTracker
+except ImportError:  # pragma: no cover
+    EmissionsTracker = None
 
 COMMAND = (
     "docker run --rm -it -v ${PWD}/docker_data/:/app/docker_data -v ${PWD}/tmp:/tmp rnadvisor "
@@ -10,6 +28,10 @@ COMMAND = (
     "--result_path=$path_to_output --all_scores=$SCORE"
 )
 
+BACKENDS = ["codecarbon", "model", "rapl"]
+# File written by CodeCarbon in its output folder
+EMISSIONS_FILE = "emissions.csv"
+
 ALL_SCORES = [
     "RMSD",
     "P-VALUE",
@@ -23,7 +45,6 @@ ALL_SCORES = [
     "GDT-TS",
     "lDDT",
     "QS-SCORE",
-    "BARNABA",
     "DFIRE",
     "rsRNASP",
     "RASP",
@@ -35,70 +56,427 @@ class CarbonBenchmark:
     Benchmark class for CodeCarbon for the different datasets.
     """
 
-    def __init__(self, input_paths: Dict, out_path: str):
+    def __init__(
+        self,
+        input_paths: Dict,
+        out_path: str,
+        cache: Optional[ResultCache] = None,
+        worker_pool: Optional[WorkerPool] = None,
+        history: Optional[BenchmarkHistory] = None,
+        single_run: bool = False,
+        backend: str = "codecarbon",
+        power_model: Optional[PowerModel] = None,
+        n_preds: Optional[int] = 2,
+        n_workers: int = 1,
+        max_rel_margin: Optional[float] = None,
+        min_preds: int = 3,
+        confidence: float = 0.95,
+        seed: int = 77,
+        command: Optional[RNAdvisorCommand] = None,
+    ):
+        """
+        :param input_paths: the folder of each dataset, or the manifest of decoys of the
+            workload generator
+        :param out_path: folder where to save the emissions
+        :param cache: cache of the emissions of each (native, prediction, score). If None,
+            all the emissions are measured.
+        :param worker_pool: long-lived RNAdvisor workers. If None, a container is started
+            for each score.
+        :param history: where to add the emissions, with the version of RNAdvisor
+        :param single_run: measure all the scores of a prediction in one task of the tracker,
+            run on a warm worker, and split its emissions between the scores (with the RAPL
+            energy of each score, or else its CPU time). A worker is started if worker_pool
+            is None.
+        :param backend: how the emissions are measured: `codecarbon` (live sampling of the
+            power), `model` (CPU time and memory of each score converted with the power model
+            of the host) or `rapl` (energy counters of the CPU). The `model` and `rapl`
+            backends run the scores on a warm worker, started if worker_pool is None.
+        :param power_model: power of the host, for the emissions of the `model` and `rapl`
+            backends. If None, it is read from the default configuration.
+        :param n_preds: number of predictions measured for each RNA (all of them if None).
+            Not used with max_rel_margin.
+        :param n_workers: number of predictions measured at the same time, on as many
+            workers. Only the `model` backend measures each run on its own: the other
+            backends measure the power of the whole host.
+        :param max_rel_margin: if not None, sample the predictions of each RNA: min_preds
+            random predictions are measured first, then as many as needed for a confidence
+            interval of the mean of each score within max_rel_margin of the mean (like 0.05),
+            among all the predictions of the RNA.
+        :param min_preds: number of predictions of each RNA measured before sampling
+        :param confidence: level of the confidence intervals
+        :param seed: seed of the order of the sampled predictions
+        :param command: the RNAdvisor image whose version is recorded, and run by the
+            workers started by the benchmark (`rnadvisor` by default). A given worker_pool
+            should run the same image.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend}, should be one of {BACKENDS}")
+        if backend == "codecarbon" and EmissionsTracker is None:
+            raise ImportError("codecarbon is needed for the codecarbon backend")
+        if n_workers > 1 and backend != "model":
+            raise ValueError("Only the model backend can measure several runs at the same time")
         self.input_paths = input_paths
         self.out_path = out_path
+        self.cache = cache
+        self.worker_pool = worker_pool
+        self.history = history
+        self.single_run = single_run
+        self.backend = backend
+        self.power_model = PowerModel.from_config() if power_model is None else power_model
+        self.n_preds = n_preds
+        self.n_workers = n_workers
+        self.max_rel_margin = max_rel_margin
+        self.min_preds = min_preds
+        self.confidence = confidence
+        self.seed = seed
+        self.command = RNAdvisorCommand("rnadvisor") if command is None else command
+        self.own_pool = (single_run or backend != "codecarbon") and worker_pool is None
+        if self.own_pool:
+            self.worker_pool = WorkerPool(self.command.get_worker_command(), n_workers)
+        self.rapl = RaplReader()
+        if backend == "rapl" and not self.rapl.available:
+            raise ValueError(f"The RAPL counters are not readable in {RAPL_ROOT}")
+        if backend != "codecarbon":
+            self.benchmark_name = f"carbon_{backend}"
+        else:
+            self.benchmark_name = "carbon_single" if single_run else "carbon"
+        self.version = (
+            self.command.get_version() if cache is not None or history is not None else ""
+        )
 
     def run(self):
         os.makedirs(self.out_path, exist_ok=True)
         out_path = "tmp"
         os.makedirs(out_path, exist_ok=True)
-        for dataset, dataset_prefix in self.input_paths.items():
-            carbon_emissions = self.get_carbon_emissions_all_dataset(dataset_prefix, out_path)
-            save_path = os.path.join(self.out_path, f"{dataset}.csv")
-            carbon_emissions.to_csv(save_path, index=False)
-            self.clean()
+        run_id = None
+        try:
+            for dataset, dataset_prefix in self.input_paths.items():
+                carbon_emissions, carbon_ci = self.get_carbon_emissions_all_dataset(
+                    dataset_prefix, out_path
+                )
+                save_path = os.path.join(self.out_path, f"{dataset}.csv")
+                carbon_emissions.to_csv(save_path, index=False)
+                ci_dir = os.path.join(self.out_path, CI_DIR_NAME)
+                os.makedirs(ci_dir, exist_ok=True)
+                carbon_ci.to_csv(os.path.join(ci_dir, f"{dataset}.csv"), index=False)
+                if self.history is not None:
+                    run_id = self.history.record(
+                        self.benchmark_name,
+                        self.version,
+                        dataset,
+                        carbon_emissions.set_index("NAME"),
+                        run_id,
+                    )
+                self.clean(out_path)
+        finally:
+            if self.own_pool:
+                self.worker_pool.close()  # type: ignore
 
-    def clean(self):
+    def clean(self, out_path: str):
         """
         Remove the code carbon outputs
         """
-        command = "rm *.csv"
-        os.system(command)
+        emissions_path = os.path.join(out_path, EMISSIONS_FILE)
+        if os.path.exists(emissions_path):
+            os.remove(emissions_path)
 
-
-    def get_carbon_emissions_all_dataset(self, dataset_prefix: str, out_path: str):
+    def get_carbon_emissions_all_dataset(
+        self, dataset_prefix: str, out_path: str
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """
         Return carbon emissions for each metric for each dataset.
+        The emissions of the predictions are added to running means as they are measured.
+        :return: the mean emissions of each RNA, and the confidence intervals of the means of
+            each RNA and of the dataset (the mean over the RNAs)
+        """
+        # With sampling, the sample size is chosen among all the predictions
+        rnas = self.get_rnas(
+            dataset_prefix, None if self.max_rel_margin is not None else self.n_preds
+        )
+        rna_stats = {name: {metric: RunningStats() for metric in ALL_SCORES} for name, _, _ in rnas}
+        if self.max_rel_margin is None:
+            self.measure(
+                [(name, native, pred) for name, native, preds in rnas for pred in preds],
+                rna_stats,
+                out_path,
+            )
+        else:
+            rnas = [
+                (name, native, self.shuffle(preds, i))
+                for i, (name, native, preds) in enumerate(rnas)
+            ]
+            self.measure(
+                [
+                    (name, native, pred)
+                    for name, native, preds in rnas
+                    for pred in preds[: self.min_preds]  # noqa: E203
+                ],
+                rna_stats,
+                out_path,
+            )
+            jobs = []
+            for name, native, preds in rnas:
+                sample_size = max(
+                    running_stats.get_sample_size(self.max_rel_margin, self.confidence)
+                    for running_stats in rna_stats[name].values()
+                )
+                sampled = preds[self.min_preds : sample_size]  # noqa: E203
+                jobs.extend((name, native, pred) for pred in sampled)
+            self.measure(jobs, rna_stats, out_path)
+        rows, ci_rows = [], []
+        dataset_stats = {metric: RunningStats() for metric in ALL_SCORES}
+        for name, score_stats in rna_stats.items():
+            rows.append(
+                {**{metric: stats.mean for metric, stats in score_stats.items()}, "NAME": name}
+            )
+            ci_rows.extend(get_ci_rows(name, score_stats, self.confidence))
+            for metric, running_stats in score_stats.items():
+                dataset_stats[metric].update(running_stats.mean)
+        ci_rows.extend(get_ci_rows(ALL_NAME, dataset_stats, self.confidence))
+        return pd.DataFrame(rows), pd.DataFrame(ci_rows, columns=CI_COLUMNS)
+
+    def shuffle(self, pred_paths: List[str], i_rna: int) -> List[str]:
         """
-        carbon_emissions = None
-        rna_lists = os.listdir(os.path.join(dataset_prefix, "NATIVE"))
-        for rna_native in rna_lists:
-            native_path = os.path.join(dataset_prefix, "NATIVE", rna_native)
+        Return the predictions of an RNA in a random order, the same from one run to another
+        """
+        order = np.random.default_rng([self.seed, i_rna]).permutation(len(pred_paths))
+        return [pred_paths[i] for i in order]
+
+    def measure(
+        self,
+        jobs: List[Tuple[str, str, str]],
+        rna_stats: Dict[str, Dict[str, RunningStats]],
+        out_path: str,
+    ):
+        """
+        Measure the (RNA, native, prediction) jobs, on n_workers threads, and add the
+        emissions to the running means of the RNAs as the jobs complete
+        """
+        if self.n_workers == 1:
+            for name, native_path, pred_path in jobs:
+                emissions = self.get_carbon_emissions(native_path, pred_path, out_path)
+                self.add_emissions(rna_stats[name], emissions)
+            return
+        with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+            futures = {
+                executor.submit(self.measure_job, native_path, pred_path, out_path): name
+                for name, native_path, pred_path in jobs
+            }
+            for future in as_completed(futures):
+                self.add_emissions(rna_stats[futures[future]], future.result())
+
+    def measure_job(self, native_path: str, pred_path: str, out_path: str) -> Dict:
+        """
+        Measure a prediction with its own result folder, as the jobs run at the same time
+        """
+        rna_dir, pred = os.path.split(pred_path)
+        job_path = os.path.join(out_path, f"{os.path.basename(rna_dir)}_{pred}")
+        os.makedirs(job_path, exist_ok=True)
+        try:
+            return self.get_carbon_emissions(native_path, pred_path, job_path)
+        finally:
+            shutil.rmtree(job_path, ignore_errors=True)
+
+    @staticmethod
+    def add_emissions(score_stats: Dict[str, RunningStats], emissions: Dict):
+        for metric, value in emissions.items():
+            score_stats[metric].update(value)
+
+    @staticmethod
+    def get_rnas(
+        dataset_prefix: str, n_preds: Optional[int] = None
+    ) -> List[Tuple[str, str, List[str]]]:
+        """
+        Return the name, the native and the predictions of each RNA of the dataset.
+        For a manifest, each length of each native is an RNA, with its decoys.
+        :param n_preds: number of predictions of each RNA (all of them if None)
+        """
+        if os.path.isfile(dataset_prefix):
+            manifest = read_manifest(dataset_prefix)
+            return [
+                (
+                    f"{rna}_{length}",
+                    df["native_path"].iloc[0],
+                    df["pred_path"].tolist()[:n_preds],
+                )
+                for (rna, length), df in manifest.groupby(["rna", "length"], sort=False)
+            ]
+        rnas = []
+        for rna_native in os.listdir(os.path.join(dataset_prefix, "NATIVE")):
             rna = rna_native.replace(".pdb", "")
-            # Take only two predictions
-            pred_lists = os.listdir(os.path.join(dataset_prefix, "PREDS", rna))[:2]
-            c_emission_tmp = None
-            for pred in pred_lists:
-                pred_path = os.path.join(dataset_prefix, "PREDS", rna, pred)
-                carbon_emission = self.get_carbon_emissions(native_path, pred_path, out_path)
-                if c_emission_tmp is not None:
-                    c_emission_tmp = pd.concat([c_emission_tmp, carbon_emission])
-                else:
-                    c_emission_tmp = carbon_emission
-            current_emission = c_emission_tmp.mean().to_frame().T  # type: ignore
-            current_emission["NAME"] = rna_native.replace(".pdb", "")
-            carbon_emissions = (
-                pd.concat([carbon_emissions, current_emission])
-                if carbon_emissions is not None
-                else current_emission
+            pred_lists = sorted(os.listdir(os.path.join(dataset_prefix, "PREDS", rna)))[:n_preds]
+            rnas.append(
+                (
+                    rna,
+                    os.path.join(dataset_prefix, "NATIVE", rna_native),
+                    [os.path.join(dataset_prefix, "PREDS", rna, pred) for pred in pred_lists],
+                )
             )
-        return carbon_emissions
+        return rnas
 
     def get_carbon_emissions(self, native_path: str, pred_path: str, out_path: str):
-        output = {}
-        tracker = EmissionsTracker(log_level="critical", measure_power_secs=0.1)
+        if self.backend != "codecarbon":
+            return self.get_carbon_emissions_estimated(native_path, pred_path, out_path)
+        if self.single_run:
+            return self.get_carbon_emissions_single_run(native_path, pred_path, out_path)
+        cached = self.get_cached_emissions(native_path, pred_path)
+        if len(cached) == len(ALL_SCORES):
+            return cached
+        output = dict(cached)
+        tracker = EmissionsTracker(
+            log_level="critical", measure_power_secs=0.1, output_dir=out_path
+        )
         for metric in ALL_SCORES:
+            if metric in cached:
+                continue
             tracker.start_task("test")
             try:
                 self.run_docker(native_path, pred_path, out_path, metric)
             finally:
                 tracker.stop_task("test")
             output[metric] = tracker._tasks["test"].emissions_data.emissions
+            self.cache_emissions(native_path, pred_path, metric, {"emissions": output[metric]})
         tracker.stop()
-        return pd.DataFrame(output, index=[0])
+        return output
+
+    def get_carbon_emissions_single_run(self, native_path: str, pred_path: str, out_path: str):
+        """
+        Measure the scores not cached in one task of the tracker: each score is a job of the
+        warm worker, with its wall time, CPU time and RAPL energy. The emissions of the task
+        are then split between the scores. Nothing is attributed (or cached) if a score fails.
+        """
+        cached = self.get_cached_emissions(native_path, pred_path)
+        output = dict(cached)
+        metrics = [metric for metric in ALL_SCORES if metric not in cached]
+        if len(metrics) == 0:
+            return output
+        phases: Dict[str, Dict] = {}
+        tracker = EmissionsTracker(
+            log_level="critical", measure_power_secs=0.1, output_dir=out_path
+        )
+        tracker.start_task("all_scores")
+        try:
+            for metric in metrics:
+                energy_start, start = self.rapl.read(), time.perf_counter()
+                response = self.run_worker(native_path, pred_path, out_path, metric)
+                phases[metric] = {
+                    "wall": time.perf_counter() - start,
+                    "cpu": response.get("user", 0) + response.get("sys", 0),
+                    "energy": self.rapl.get_energy(energy_start, self.rapl.read()),
+                }
+        finally:
+            tracker.stop_task("all_scores")
+            if len(phases) < len(metrics):
+                # A score failed: the emissions of the task are not split between the scores
+                tracker.stop()
+        emissions = tracker._tasks["all_scores"].emissions_data.emissions
+        tracker.stop()
+        for metric, share in self.get_shares(phases).items():
+            output[metric] = emissions * share
+            self.cache_emissions(native_path, pred_path, metric, {"emissions": output[metric]})
+        return output
+
+    def get_carbon_emissions_estimated(self, native_path: str, pred_path: str, out_path: str):
+        """
+        Run each score not cached on the warm worker, and convert its resources into
+        emissions: its CPU time and memory with the power model, or its RAPL energy.
+        For the power model, the resources are cached rather than the emissions, so that
+        the emissions follow the configuration of the host.
+        """
+        cached = self.get_cached_emissions(native_path, pred_path)
+        output = dict(cached)
+        for metric in ALL_SCORES:
+            if metric in cached:
+                continue
+            energy_start = self.rapl.read() if self.backend == "rapl" else None
+            response = self.run_worker(native_path, pred_path, out_path, metric)
+            if self.backend == "rapl":
+                joules = self.rapl.get_energy(energy_start, self.rapl.read())
+                energy = joules * self.power_model.pue / 3.6e6  # type: ignore
+                result = {"emissions": self.power_model.get_emissions(energy)}
+            else:
+                result = {
+                    "cpu": response.get("user", 0) + response.get("sys", 0),
+                    # Peak of this job only: the peak of the worker includes the previous
+                    # jobs. The memory is not counted if it can not be isolated.
+                    "job_maxrss": response.get("job_maxrss") or 0,
+                    "wall": response.get("wall", 0),
+                }
+            output[metric] = self.get_emissions(result)
+            self.cache_emissions(native_path, pred_path, metric, result)
+        return output
+
+    def run_worker(self, native_path: str, pred_path: str, out_path: str, metric: str) -> Dict:
+        """
+        Run a score on a warm worker
+        :return: the response of the worker, with the resources used by the score
+        """
+        response = self.worker_pool.run(  # type: ignore
+            native_path, pred_path, out_path, all_scores=metric
+        )
+        if response.get("status") != "ok":
+            # A failed run would be measured (and cached) as a run without emissions
+            raise RuntimeError(f"{metric} failed for {pred_path}: {response.get('error')}")
+        return response
+
+    def get_emissions(self, result: Dict) -> float:
+        """
+        Return the emissions of a cached result, in kg of CO2 equivalent
+        """
+        if "emissions" in result:
+            return result["emissions"]
+        energy = self.power_model.get_energy(result["cpu"], result["job_maxrss"], result["wall"])
+        return self.power_model.get_emissions(energy)
+
+    @staticmethod
+    def get_shares(phases: Dict[str, Dict]) -> Dict[str, float]:
+        """
+        Return the share of each score in the emissions: its RAPL energy if measured, or else
+        its CPU time, or else its wall time
+        """
+        for key in ["energy", "cpu", "wall"]:
+            values = {metric: phase[key] for metric, phase in phases.items()}
+            if None in values.values():
+                continue
+            total = sum(values.values())
+            if total > 0:
+                return {metric: value / total for metric, value in values.items()}
+        return {metric: 1 / len(phases) for metric in phases}
+
+    def get_cached_emissions(self, native_path: str, pred_path: str) -> Dict:
+        """
+        Return the emissions of the scores already measured for the prediction
+        """
+        if self.cache is None:
+            return {}
+        native_hash, pred_hash = get_file_hash(native_path), get_file_hash(pred_path)
+        output = {}
+        for metric in ALL_SCORES:
+            result = self.cache.get(
+                native_hash, pred_hash, f"{self.benchmark_name}:{metric}", self.version
+            )
+            # The resources cached with the peak memory of the worker are measured again
+            if result is not None and ("emissions" in result or "job_maxrss" in result):
+                output[metric] = self.get_emissions(result)
+        return output
+
+    def cache_emissions(self, native_path: str, pred_path: str, metric: str, result: Dict):
+        """
+        Cache the emissions of a score, or its resources for the power model
+        """
+        if self.cache is not None:
+            self.cache.put(
+                get_file_hash(native_path),
+                get_file_hash(pred_path),
+                f"{self.benchmark_name}:{metric}",
+                self.version,
+                result,
+            )
 
     def run_docker(self, native_path: str, pred_path: str, out_path: str, metric: str):
+        if self.worker_pool is not None:
+            self.worker_pool.run(native_path, pred_path, out_path, all_scores=metric)
+            return
         command = (
             COMMAND.replace("$path_to_native", native_path)
             .replace("$path_to_pred", pred_path)
@@ -109,11 +487,56 @@ class CarbonBenchmark:
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--manifest_path", default=None, help="Manifest of decoys of the workload generator"
+    )
+    parser.add_argument(
+        "--single_run",
+        action="store_true",
+        help="Measure all the scores on a warm worker and split the emissions between them",
+    )
+    parser.add_argument(
+        "--backend", default="codecarbon", choices=BACKENDS, help="How to measure the emissions"
+    )
+    parser.add_argument(
+        "--power_model_path",
+        default=POWER_MODEL_PATH,
+        help="JSON file with the power model of each host, for the model and rapl backends",
+    )
+    parser.add_argument(
+        "--n_preds", type=int, default=2, help="Predictions measured per RNA, all of them if 0"
+    )
+    parser.add_argument(
+        "--n_workers", type=int, default=1, help="Predictions measured at the same time (model)"
+    )
+    parser.add_argument(
+        "--max_rel_margin",
+        type=float,
+        default=None,
+        help="Sample the predictions for confidence intervals within this margin of the mean",
+    )
+    parser.add_argument("--min_preds", type=int, default=3, help="Predictions before sampling")
+    args = parser.parse_args()
     input_paths = {
         "TestSetI": os.path.join("docker_data", "input", "TestSetI"),
         "TestSetII": os.path.join("docker_data", "input", "TestSetII"),
         "TestSetIII": os.path.join("docker_data", "input", "TestSetIII"),
     }
+    if args.manifest_path is not None:
+        input_paths = {"workload": args.manifest_path}
     out_path = os.path.join("docker_data", "output", "carbon")
-    carbon_benchmark = CarbonBenchmark(input_paths, out_path)
+    carbon_benchmark = CarbonBenchmark(
+        input_paths,
+        out_path,
+        cache=ResultCache(),
+        history=BenchmarkHistory(),
+        single_run=args.single_run,
+        backend=args.backend,
+        power_model=PowerModel.from_config(args.power_model_path),
+        n_preds=args.n_preds or None,
+        n_workers=args.n_workers,
+        max_rel_margin=args.max_rel_margin,
+        min_preds=args.min_preds,
+    )
     carbon_benchmark.run()
@@ -0,0 +1,79 @@
+import math
+from typing import Dict, List
+
+from scipy import stats
+
+# Folder of the confidence intervals, in the folder of the emissions
+CI_DIR_NAME = "ci"
+# Name of the row of the whole dataset in the confidence intervals
+ALL_NAME = "ALL"
+CI_COLUMNS = ["NAME", "score", "n", "mean", "std", "ci_low", "ci_high"]
+
+
+class RunningStats:
+    """
+    Mean and variance of a stream of values (Welford's algorithm), without keeping the
+    values.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def std(self) -> float:
+        """
+        Sample standard deviation (0 with less than two values)
+        """
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def get_margin(self, confidence: float = 0.95) -> float:
+        """
+        Return the half width of the confidence interval of the mean (Student t distribution)
+        """
+        if self.count < 2:
+            return 0.0
+        t_value = stats.t.ppf((1 + confidence) / 2, self.count - 1)
+        return t_value * self.std / math.sqrt(self.count)
+
+    def get_sample_size(self, rel_margin: float, confidence: float = 0.95) -> int:
+        """
+        Return the number of values needed for a confidence interval of the mean within
+        rel_margin of the mean, estimated from the values seen so far
+        :param rel_margin: the half width of the interval, relative to the mean (like 0.05)
+        """
+        if self.count < 2 or self.mean == 0:
+            return self.count
+        t_value = stats.t.ppf((1 + confidence) / 2, self.count - 1)
+        sample_size = math.ceil((t_value * self.std / (rel_margin * abs(self.mean))) ** 2)
+        return max(self.count, sample_size)
+
+
+def get_ci_rows(
+    name: str, score_stats: Dict[str, RunningStats], confidence: float = 0.95
+) -> List[Dict]:
+    """
+    Return a row for each score, with the mean and its confidence interval
+    """
+    rows = []
+    for score, running_stats in score_stats.items():
+        margin = running_stats.get_margin(confidence)
+        rows.append(
+            {
+                "NAME": name,
+                "score": score,
+                "n": running_stats.count,
+                "mean": running_stats.mean,
+                "std": running_stats.std,
+                "ci_low": running_stats.mean - margin,
+                "ci_high": running_stats.mean + margin,
+            }
+        )
+    return rows
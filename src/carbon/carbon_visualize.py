@@ -1,9 +1,11 @@
 import os
-from typing import Dict
+from typing import Dict, List
 
 import pandas as pd
 import plotly.express as px
 
+from src.carbon.carbon_stats import ALL_NAME, CI_DIR_NAME
+
 METRICS = [
     "RMSD",
     "P-VALUE",
@@ -45,10 +47,12 @@ class CarbonVisualize:
         os.makedirs(os.path.dirname(self.save_path), exist_ok=True)
 
     def read_csv(self, carbon_path: str):
-        data: Dict = {"metric": [], "Dataset": [], "carbon": []}
+        data: Dict = {"metric": [], "Dataset": [], "carbon": [], "error": [], "error_minus": []}
         dfs = pd.DataFrame([])
         names = []
         for csv in os.listdir(carbon_path):
+            if not csv.endswith(".csv"):
+                continue
             df = pd.read_csv(os.path.join(carbon_path, csv))
             df = df.drop("NAME", axis=1)
             df = df.mean().to_frame().T * 1000
@@ -58,6 +62,9 @@ class CarbonVisualize:
             data["metric"] += list(df.columns)
             data["Dataset"].extend([name] * len(df.columns))
             data["carbon"] += list(df.values[0])
+            ci = self.read_ci(carbon_path, csv, list(df.columns)) * 1000
+            data["error"] += list(ci["ci_high"].values - df.values[0])
+            data["error_minus"] += list(df.values[0] - ci["ci_low"].values)
         new_df = pd.DataFrame(data)
         new_df = new_df[new_df["metric"].isin(ALL_SCORES)]
         new_df.replace("BARNABA", "eRMSD/eSCORE", inplace=True)
@@ -65,6 +72,19 @@ class CarbonVisualize:
         new_df.replace("CAD", "CAD-score", inplace=True)
         return new_df
 
+    @staticmethod
+    def read_ci(carbon_path: str, csv: str, metrics: List[str]) -> pd.DataFrame:
+        """
+        Return the confidence interval of the mean over the RNAs of each metric (NaN for a
+        benchmark without confidence intervals)
+        """
+        ci_path = os.path.join(carbon_path, CI_DIR_NAME, csv)
+        if not os.path.exists(ci_path):
+            return pd.DataFrame(index=metrics, columns=["ci_low", "ci_high"], dtype=float)
+        ci = pd.read_csv(ci_path)
+        ci = ci[ci["NAME"] == ALL_NAME].set_index("score")
+        return ci.reindex(metrics)[["ci_low", "ci_high"]]
+
     def update_fig(self, fig):
         params_axes = dict(
             showgrid=True,
@@ -94,7 +114,12 @@ class CarbonVisualize:
         return fig
 
     def run(self):
-        fig = px.bar(self.all_df, x="metric", y="carbon", color="Dataset")
+        error = (
+            dict(error_y="error", error_y_minus="error_minus", barmode="group")
+            if self.all_df["error"].notna().any()
+            else {}
+        )
+        fig = px.bar(self.all_df, x="metric", y="carbon", color="Dataset", **error)
         fig = self.update_fig(fig)
         if self.save_path:
             fig.write_image(self.save_path, scale=2)
@@ -0,0 +1,120 @@
+import json
+import os
+import socket
+from typing import Dict, List, NamedTuple, Optional
+
+RAPL_ROOT = "/sys/class/powercap"
+POWER_MODEL_PATH = os.path.join("docker_data", "config", "power_models.json")
+
+
+class RaplReader:
+    """
+    Read the energy counters of the CPU packages (Intel RAPL), in /sys/class/powercap.
+    The counters are machine-wide: they also count the other processes.
+    """
+
+    def __init__(self, root: str = RAPL_ROOT):
+        """
+        :param root: the powercap folder
+        """
+        self.domains = self.get_domains(root)
+
+    @staticmethod
+    def get_domains(root: str) -> Dict[str, int]:
+        """
+        Return the energy counter of each package with its maximum value (in micro joules)
+        """
+        domains: Dict[str, int] = {}
+        if not os.path.isdir(root):
+            return domains
+        for name in sorted(os.listdir(root)):
+            # The packages (intel-rapl:0), not their sub-domains (intel-rapl:0:0)
+            if not name.startswith("intel-rapl:") or name.count(":") != 1:
+                continue
+            energy_path = os.path.join(root, name, "energy_uj")
+            try:
+                with open(energy_path) as file:
+                    file.read()
+                with open(os.path.join(root, name, "max_energy_range_uj")) as file:
+                    domains[energy_path] = int(file.read())
+            except (OSError, ValueError):
+                continue
+        return domains
+
+    @property
+    def available(self) -> bool:
+        return len(self.domains) > 0
+
+    def read(self) -> Optional[List[int]]:
+        """
+        Return the counter of each package, in micro joules (None without RAPL)
+        """
+        if not self.available:
+            return None
+        counters = []
+        for energy_path in self.domains:
+            with open(energy_path) as file:
+                counters.append(int(file.read()))
+        return counters
+
+    def get_energy(self, start: Optional[List[int]], end: Optional[List[int]]) -> Optional[float]:
+        """
+        Return the energy consumed between two reads, in joules, with the counters that
+        wrapped around
+        """
+        if start is None or end is None:
+            return None
+        energy = 0
+        for counter_start, counter_end, max_range in zip(start, end, self.domains.values()):
+            energy += (counter_end - counter_start) % (max_range + 1)
+        return energy / 1e6
+
+
+class PowerModel(NamedTuple):
+    """
+    Power of a host, to convert the resources used by a run into energy and emissions.
+    The default values are the ones of CodeCarbon when it can not read the power of the
+    hardware: a busy core, 3 W for 8 GB of memory and the world average carbon intensity.
+    The powers are in W (cpu_watts for one busy core), and the carbon intensity in g of CO2
+    equivalent per kWh.
+    """
+
+    cpu_watts: float = 10.0
+    memory_watts_per_gb: float = 0.375
+    pue: float = 1.0
+    carbon_intensity: float = 475.0
+
+    @staticmethod
+    def from_config(config_path: str = POWER_MODEL_PATH, host: Optional[str] = None):
+        """
+        Read the power model of a host from a JSON file like
+        {"<host>": {"cpu_watts": ..., ...}, "default": {...}}.
+        The default values are used without a file or without an entry for the host.
+        :param config_path: path to the JSON file
+        :param host: name of the host. If None, the name of this host.
+        """
+        if not os.path.isfile(config_path):
+            return PowerModel()
+        with open(config_path) as file:
+            config = json.load(file)
+        host = socket.gethostname() if host is None else host
+        return PowerModel(**config.get(host, config.get("default", {})))
+
+    def get_energy(self, cpu_seconds: float, maxrss: float, wall: float) -> float:
+        """
+        Return the energy of a run, in kWh
+        :param cpu_seconds: user and system CPU time of the run
+        :param maxrss: maximum resident set size during the run (not over the life of a
+            warm worker), in KB
+        :param wall: wall time of the run, in seconds
+        """
+        memory_gb = maxrss / 1024**2
+        joules = self.cpu_watts * cpu_seconds + self.memory_watts_per_gb * memory_gb * wall
+        return joules * self.pue / 3.6e6
+
+    def get_emissions(self, energy: float) -> float:
+        """
+        Return the emissions of an energy in kWh, in kg of CO2 equivalent
+        :param energy: the energy, in kWh
+        """
+        return energy * self.carbon_intensity / 1000
@@ -0,0 +1,97 @@
+import os
+import shutil
+from typing import List, Optional
+
+import pandas as pd
+
+# RNAdvisor names the row of each structure `normalized_<file of the structure>`
+ROW_PREFIX = "normalized_"
+
+
+def get_row_file(row_name: str) -> str:
+    """
+    Return the file of the structure of a row of RNAdvisor
+    """
+    if row_name.startswith(ROW_PREFIX):
+        return row_name[len(ROW_PREFIX) :]  # noqa: E203
+    return row_name
+
+
+class DecoySharding:
+    """
+    Split the predictions of an RNA into shards of decoys, scored independently, and merge the
+    scores of the shards back into one CSV file.
+    The shards are folders of symbolic links to the predictions, with relative targets so that
+    they are still valid in the docker volume.
+    """
+
+    def __init__(self, shard_size: int):
+        """
+        :param shard_size: maximum number of decoys in a shard
+        """
+        self.shard_size = shard_size
+
+    @staticmethod
+    def get_decoys(pred_path: str) -> List[str]:
+        return sorted(os.listdir(pred_path))
+
+    def get_n_shards(self, n_decoys: int) -> int:
+        return max(1, -(-n_decoys // self.shard_size))
+
+    def split(
+        self, pred_path: str, staging_dir: str, decoys: Optional[List[str]] = None
+    ) -> List[str]:
+        """
+        Create the shards of the prediction folder.
+        The decoys are sorted by name and split in contiguous shards, so that the merged scores
+        always have the same order.
+        :param pred_path: folder with the predictions of one RNA
+        :param staging_dir: folder where to create the shards
+        :param decoys: the decoys to split (all the decoys of the folder by default)
+        :return: the paths of the shard folders
+        """
+        decoys = self.get_decoys(pred_path) if decoys is None else sorted(decoys)
+        n_shards = self.get_n_shards(len(decoys))
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        shard_paths = []
+        for i_shard in range(n_shards):
+            shard_path = os.path.join(staging_dir, f"shard_{i_shard}")
+            os.makedirs(shard_path)
+            start = i_shard * self.shard_size
+            for decoy in decoys[start : start + self.shard_size]:  # noqa: E203
+                target = os.path.relpath(os.path.join(pred_path, decoy), shard_path)
+                os.symlink(target, os.path.join(shard_path, decoy))
+            shard_paths.append(shard_path)
+        return shard_paths
+
+    @staticmethod
+    def merge(shard_csvs: List[str], output_path: str, decoys: List[str]):
+        """
+        Merge the scores of the shards.
+        The rows computed in several shards (like the native structure) are kept once, first,
+        followed by the decoys in the given order.
+        :param shard_csvs: the CSV files of the shards
+        :param output_path: path of the merged CSV file
+        :param decoys: the names of the decoys, in the order of the merged rows
+        """
+        df = pd.concat(
+            [
+                pd.read_csv(shard_csv, index_col=[0], float_precision="round_trip")
+                for shard_csv in shard_csvs
+            ],
+            axis=0,
+        )
+        DecoySharding.write(df[~df.index.duplicated(keep="first")], output_path, decoys)
+
+    @staticmethod
+    def write(df: pd.DataFrame, output_path: str, decoys: List[str]):
+        """
+        Write the scores with the other rows (like the native structure) first, followed by
+        the decoys in the given order
+        """
+        positions = {decoy: i for i, decoy in enumerate(decoys)}
+        order = [positions.get(get_row_file(name), -1) for name in df.index]
+        df = df.iloc[sorted(range(len(df)), key=order.__getitem__)]
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        df.to_csv(f"{output_path}.tmp")
+        os.replace(f"{output_path}.tmp", output_path)
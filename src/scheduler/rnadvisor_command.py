@@ -0,0 +1,124 @@
+import hashlib
+import os
+import shlex
+import subprocess
+import sys
+from typing import List, Optional
+
+DOCKER_IMAGE = "rna_scores"
+WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rnadvisor_worker.py")
+
+
+class RNAdvisorCommand:
+    """
+    Build the command line to run RNAdvisor, either through docker or with a local executable
+    that takes the same arguments (like a fake `rnadvisor` script for the tests).
+    """
+
+    def __init__(self, image: str = DOCKER_IMAGE, executable: Optional[str] = None):
+        """
+        :param image: the docker image of RNAdvisor
+        :param executable: a local command to use instead of docker, e.g. `python main.py`
+        """
+        self.image = image
+        self.executable = executable
+        self._version: Optional[str] = None
+
+    def get_version(self) -> str:
+        """
+        Return the version of RNAdvisor: the digest of the docker image or, for a local
+        executable, a hash of the command and of the files it refers to
+        """
+        if self._version is None:
+            self._version = self._get_version()
+        return self._version
+
+    def _get_version(self) -> str:
+        if self.executable is None:
+            try:
+                process = subprocess.run(
+                    ["docker", "image", "inspect", "--format", "{{.Id}}", self.image],
+                    capture_output=True,
+                    text=True,
+                )
+            except FileNotFoundError:
+                return self.image
+            return process.stdout.strip() if process.returncode == 0 else self.image
+        sha256 = hashlib.sha256(self.executable.encode())
+        for arg in shlex.split(self.executable):
+            if os.path.isfile(arg):
+                with open(arg, "rb") as file:
+                    sha256.update(file.read())
+        return sha256.hexdigest()
+
+    def get_prefix(self) -> List[str]:
+        """
+        Return the command that launches RNAdvisor, without its arguments
+        """
+        if self.executable is not None:
+            return shlex.split(self.executable)
+        cwd = os.getcwd()
+        return [
+            "docker",
+            "run",
+            "--rm",
+            "-v",
+            f"{cwd}/docker_data/:/app/docker_data",
+            "-v",
+            f"{cwd}/tmp:/tmp",
+            self.image,
+        ]
+
+    def get_worker_command(self, main: str = "main.py") -> List[str]:
+        """
+        Return the command that starts a long-lived RNAdvisor worker (see rnadvisor_worker.py)
+        :param main: the main script of RNAdvisor. With a local executable, the last argument
+            of the executable is used (e.g. `main.py` for `python main.py`).
+        """
+        if self.executable is not None:
+            main = shlex.split(self.executable)[-1]
+            return [sys.executable, WORKER_PATH, f"--main={main}"]
+        cwd = os.getcwd()
+        return [
+            "docker",
+            "run",
+            "--rm",
+            "-i",
+            "-v",
+            f"{cwd}/docker_data/:/app/docker_data",
+            "-v",
+            f"{cwd}/tmp:/tmp",
+            "-v",
+            f"{WORKER_PATH}:/worker/rnadvisor_worker.py:ro",
+            "--entrypoint",
+            "python",
+            self.image,
+            "/worker/rnadvisor_worker.py",
+            f"--main={main}",
+        ]
+
+    def build(
+        self,
+        native_path: str,
+        pred_path: str,
+        result_path: str,
+        all_scores: str = "ALL",
+        time_path: Optional[str] = None,
+    ) -> List[str]:
+        """
+        Return the command to compute the scores of the predictions.
+        :param native_path: path to the native structure
+        :param pred_path: path to a prediction or a folder of predictions
+        :param result_path: path to the CSV file where to save the scores
+        :param all_scores: the scores to compute, separated by commas
+        :param time_path: path to the CSV file where to save the computation times
+        """
+        args = [
+            f"--native_path={native_path}",
+            f"--pred_path={pred_path}",
+            f"--result_path={result_path}",
+            f"--all_scores={all_scores}",
+        ]
+        if time_path is not None:
+            args.append(f"--time_path={time_path}")
+        return self.get_prefix() + args
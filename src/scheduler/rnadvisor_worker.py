@@ -0,0 +1,152 @@
+import argparse
+import json
+import os
+import resource
+import runpy
+import sys
+import time
+import traceback
+import tracemalloc
+
+ARGUMENTS = ["native_path", "pred_path", "result_path", "all_scores", "time_path"]
+
+
+def get_cpu_times():
+    self_usage = resource.getrusage(resource.RUSAGE_SELF)
+    children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return (
+        self_usage.ru_utime + children_usage.ru_utime,
+        self_usage.ru_stime + children_usage.ru_stime,
+        max(get_hwm(self_usage.ru_maxrss), children_usage.ru_maxrss),
+    )
+
+
+def get_hwm(default: int) -> int:
+    """
+    Return the peak resident set size of this process, in KB.
+    Unlike its maximum resident set size, it does not include the memory of the parent
+    process, copied when this process was forked.
+    """
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return default
+
+
+def reset_hwm() -> bool:
+    """
+    Reset the peak resident set size of this process (VmHWM) to its current size, so that
+    the peak of the next job does not include the previous jobs (Linux only)
+    :return: whether the peak was reset
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def run_main(main: str, job: dict):
+    """
+    Run the main script (a path to a file or a module name) as `__main__` with the arguments
+    of the job
+    """
+    argv = [main] + [f"--{arg}={job[arg]}" for arg in ARGUMENTS if job.get(arg) is not None]
+    old_argv, sys.argv = sys.argv, argv
+    try:
+        if main.endswith(".py"):
+            runpy.run_path(main, run_name="__main__")
+        else:
+            runpy.run_module(main, run_name="__main__", alter_sys=True)
+    except SystemExit as error:
+        if error.code not in [None, 0]:
+            raise
+    finally:
+        sys.argv = old_argv
+
+
+def run_job(main: str, job: dict) -> dict:
+    is_reset = reset_hwm()
+    user, system, _ = get_cpu_times()
+    children_maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    response = {"status": "ok", "error": None}
+    try:
+        run_main(main, job)
+    except BaseException:
+        response = {"status": "error", "error": traceback.format_exc()}
+    end_user, end_system, maxrss = get_cpu_times()
+    job_maxrss = None
+    if is_reset:
+        # The peak of the subprocesses is the peak of all the jobs: it is only counted
+        # when this job raised it
+        end_children_maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        job_maxrss = max(
+            get_hwm(0), end_children_maxrss if end_children_maxrss > children_maxrss else 0
+        )
+    response.update(
+        {
+            "wall": time.perf_counter() - start,
+            "user": end_user - user,
+            "sys": end_system - system,
+            "maxrss": maxrss,
+            "job_maxrss": job_maxrss,
+        }
+    )
+    if tracemalloc.is_tracing():
+        # Peak of the memory allocated by Python, in bytes
+        response["tracemalloc_peak"] = tracemalloc.get_traced_memory()[1]
+    return response
+
+
+def serve(main: str):
+    """
+    Read one JSON job per line on stdin, run the main script of RNAdvisor in this process
+    with the arguments of the job, and write one JSON response per line on stdout.
+    This file only uses the standard library, so that it can be mounted in the docker image.
+    Job: {"native_path": ..., "pred_path": ..., "result_path": ..., "all_scores": ...,
+    "time_path": ...}
+    Response: {"status": "ok" | "error", "error": ..., "wall": ..., "user": ..., "sys": ...,
+    "maxrss": ..., "job_maxrss": ...}, with the times in seconds and the maximum resident set
+    size in KB: maxrss includes the subprocesses of the previous jobs, job_maxrss is the peak
+    of the job only (None if it can not be isolated).
+    """
+    # The responses are written on the original stdout: everything printed by RNAdvisor
+    # (including its subprocesses) goes to stderr
+    protocol = os.fdopen(os.dup(sys.stdout.fileno()), "w", buffering=1)
+    sys.stdout.flush()
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        response = run_job(main, json.loads(line))
+        protocol.write(json.dumps(response) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--main", default="main.py", help="Main script or module of RNAdvisor")
+    parser.add_argument(
+        "--tracemalloc", action="store_true", help="Trace the memory allocated by Python"
+    )
+    parser.add_argument("--job", default=None, help="Run only this JSON job, without stdin")
+    parser.add_argument("--response_path", default=None, help="Where to save the response")
+    args = parser.parse_args()
+    if args.tracemalloc:
+        tracemalloc.start()
+    if args.job is None:
+        serve(args.main)
+    else:
+        response = run_job(args.main, json.loads(args.job))
+        if args.response_path is None:
+            print(json.dumps(response))
+        else:
+            with open(args.response_path, "w") as file:
+                json.dump(response, file)
@@ -0,0 +1,413 @@
+import argparse
+import os
+import shutil
+import subprocess
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, NamedTuple, Optional
+
+import pandas as pd
+
+from src.scheduler.decoy_sharding import DecoySharding, get_row_file
+from src.scheduler.rnadvisor_command import DOCKER_IMAGE, RNAdvisorCommand
+from src.time_benchmark.complexity import ComplexityAnalysis
+from src.utils.csv_cache import get_file_hash
+from src.utils.decoy_archive import ARCHIVE_DIR_NAME, DecoyArchive
+from src.utils.result_cache import ResultCache
+
+INPUT_DIR = os.path.join("docker_data", "input")
+OUTPUT_DIR = os.path.join("docker_data", "output")
+DATASETS = ["TestSetI", "TestSetII", "TestSetIII", "TestSetI_tmp"]
+ALL_SCORES = "ALL"
+
+
+class ScoreJob(NamedTuple):
+    """Computation of the scores of all the predictions of one RNA"""
+
+    dataset: str
+    rna: str
+    native_path: str
+    pred_path: str
+    output_path: str
+    cost: float
+    # The archive of the decoys, extracted in pred_path when the job is scheduled
+    archive_path: Optional[str] = None
+
+
+class ScoreTask(NamedTuple):
+    """One run of RNAdvisor: the whole job, or one shard of its decoys"""
+
+    job: ScoreJob
+    pred_path: str
+    result_path: str
+    done_path: str
+    cost: float
+
+
+class ScoreScheduler:
+    """
+    Compute the metrics and energies of each RNA of the datasets with RNAdvisor.
+    The RNAs are run concurrently (largest first), the RNAs already computed are skipped,
+    and the failed RNAs are retried.
+    The decoys of an RNA can be split in shards, computed by different workers and merged.
+    The decoys of an RNA without a PREDS folder are read from its archive (see DecoyArchive):
+    they are written in a temporary folder when the RNA is scheduled, and removed once its
+    scores are computed.
+    With a result cache, only the decoys whose scores are not in the cache are computed.
+    """
+
+    def __init__(
+        self,
+        datasets: List[str],
+        input_dir: str = INPUT_DIR,
+        output_dir: str = OUTPUT_DIR,
+        n_workers: int = 1,
+        retries: int = 1,
+        command: Optional[RNAdvisorCommand] = None,
+        shard_size: Optional[int] = None,
+        cache: Optional[ResultCache] = None,
+        cost_model: Optional[ComplexityAnalysis] = None,
+    ):
+        """
+        :param datasets: the datasets to compute, with a NATIVE and a PREDS folder in input_dir
+        :param input_dir: folder with the datasets
+        :param output_dir: folder where to save the scores, one CSV per RNA
+        :param n_workers: number of RNAdvisor runs at the same time
+        :param retries: number of times a failed RNA is run again
+        :param command: the command to launch RNAdvisor (docker by default)
+        :param shard_size: maximum number of decoys per RNAdvisor run. If None, all the decoys
+            of an RNA are computed in one run.
+        :param cache: the cache of the scores of each decoy. If None, all the decoys are computed.
+        :param cost_model: the scaling of the computation times, used to order the RNAs. If None,
+            the RNAs are ordered by the size of their predictions.
+        """
+        self.datasets = datasets
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.n_workers = n_workers
+        self.retries = retries
+        self.command = RNAdvisorCommand() if command is None else command
+        self.sharding = DecoySharding(shard_size) if shard_size is not None else None
+        self.cache = cache
+        self.cost_model = cost_model
+        self.hashes: Dict[ScoreJob, Dict[str, str]] = {}
+
+    def get_jobs(self) -> List[ScoreJob]:
+        """
+        Return the jobs of all the datasets, sorted by decreasing cost
+        """
+        jobs = []
+        for dataset in self.datasets:
+            preds_dir = os.path.join(self.input_dir, dataset, "PREDS")
+            archive_dir = os.path.join(self.input_dir, dataset, ARCHIVE_DIR_NAME)
+            rnas = set(os.listdir(preds_dir)) if os.path.isdir(preds_dir) else set()
+            archived = set()
+            if os.path.isdir(archive_dir):
+                archived = {
+                    name.replace(".npz", "")
+                    for name in os.listdir(archive_dir)
+                    if name.endswith(".npz")
+                }
+            for rna in sorted(rnas | archived):
+                pred_path = os.path.join(preds_dir, rna)
+                native_path = os.path.join(self.input_dir, dataset, "NATIVE", f"{rna}.pdb")
+                archive_path = None
+                if rna not in rnas:
+                    pred_path = self.get_archive_dir(dataset, rna)
+                    archive_path = os.path.join(archive_dir, f"{rna}.npz")
+                jobs.append(
+                    ScoreJob(
+                        dataset=dataset,
+                        rna=rna,
+                        native_path=native_path,
+                        pred_path=pred_path,
+                        output_path=os.path.join(self.output_dir, dataset, f"{rna}.csv"),
+                        cost=self.get_cost(native_path, pred_path, archive_path),
+                        archive_path=archive_path,
+                    )
+                )
+        return sorted(jobs, key=lambda job: job.cost, reverse=True)
+
+    def get_archive_dir(self, dataset: str, rna: str) -> str:
+        """
+        Return the temporary folder of the decoys read from the archive of the RNA
+        """
+        return os.path.join(self.output_dir, ".decoys", dataset, rna)
+
+    def get_cost(
+        self, native_path: str, pred_path: str, archive_path: Optional[str] = None
+    ) -> float:
+        """
+        Estimate the cost of an RNA: the predicted computation time of its decoys with the cost
+        model or, by default, the size of its predictions (it grows with both the number of
+        decoys and the number of atoms).
+        :param archive_path: the archive of the decoys, read instead of pred_path
+        """
+        if archive_path is not None:
+            sizes = list(DecoyArchive.get_sizes(archive_path).values())
+        elif os.path.isdir(pred_path):
+            sizes = [
+                os.path.getsize(os.path.join(pred_path, pred)) for pred in os.listdir(pred_path)
+            ]
+        else:
+            return 0
+        if self.cost_model is not None and os.path.exists(native_path):
+            return self.cost_model.predict_total_runtime(get_rna_length(native_path), len(sizes))
+        return sum(sizes)
+
+    def extract_decoys(self, job: ScoreJob):
+        """
+        Write the decoys of the job from its archive, if they are archived
+        """
+        if job.archive_path is not None:
+            DecoyArchive(job.archive_path).extract(job.pred_path)
+
+    def remove_decoys(self, job: ScoreJob):
+        """
+        Remove the decoys written from the archive of the job
+        """
+        if job.archive_path is not None:
+            shutil.rmtree(job.pred_path, ignore_errors=True)
+
+    def get_partial_path(self, job: ScoreJob) -> str:
+        """
+        Return the path where RNAdvisor writes the scores, before moving them to the output.
+        It prevents an interrupted run from being seen as completed.
+        """
+        return os.path.join(self.output_dir, ".partial", job.dataset, f"{job.rna}.csv")
+
+    def get_shard_dirs(self, job: ScoreJob):
+        """
+        Return the folder with the scores of the shards and the folder with their decoys
+        """
+        shard_dir = self.get_partial_path(job).replace(".csv", "")
+        staging_dir = os.path.join(self.output_dir, ".shards", job.dataset, job.rna)
+        return shard_dir, staging_dir
+
+    def get_hashes(self, job: ScoreJob) -> Dict[str, str]:
+        """
+        Return the hash of the content of each decoy of the job, and of the native (key None)
+        """
+        if job not in self.hashes:
+            self.hashes[job] = {
+                decoy: get_file_hash(os.path.join(job.pred_path, decoy))
+                for decoy in DecoySharding.get_decoys(job.pred_path)
+            }
+            self.hashes[job][None] = get_file_hash(job.native_path)
+        return self.hashes[job]
+
+    def get_cached(self, job: ScoreJob, decoy: Optional[str]) -> Optional[Dict]:
+        """
+        Return the cached scores of the decoy, or of the native structure if decoy is None
+        """
+        hashes = self.get_hashes(job)
+        return self.cache.get(  # type: ignore
+            hashes[None], hashes[decoy], ALL_SCORES, self.command.get_version()
+        )
+
+    def get_tasks(self, job: ScoreJob) -> List[ScoreTask]:
+        """
+        Return the RNAdvisor runs of the job: one per shard if the decoys are sharded.
+        The shards already computed by a previous run, and the decoys in the cache,
+        are not computed again.
+        """
+        partial_path = self.get_partial_path(job)
+        if self.sharding is None and self.cache is None:
+            return [ScoreTask(job, job.pred_path, partial_path, job.output_path, job.cost)]
+        shard_dir, staging_dir = self.get_shard_dirs(job)
+        decoys = DecoySharding.get_decoys(job.pred_path)
+        n_decoys, sharding = max(1, len(decoys)), self.sharding
+        if self.cache is not None:
+            # The computed shards are stored in the cache
+            shutil.rmtree(shard_dir, ignore_errors=True)
+            decoys = [decoy for decoy in decoys if self.get_cached(job, decoy) is None]
+            if len(decoys) == 0:
+                return []
+            sharding = sharding or DecoySharding(len(decoys))
+        shard_paths = sharding.split(job.pred_path, staging_dir, decoys)  # type: ignore
+        tasks = [
+            ScoreTask(
+                job,
+                shard_path,
+                os.path.join(shard_dir, f"shard_{i_shard}.tmp.csv"),
+                os.path.join(shard_dir, f"shard_{i_shard}.csv"),
+                job.cost * len(decoys) / n_decoys / len(shard_paths),
+            )
+            for i_shard, shard_path in enumerate(shard_paths)
+        ]
+        if self.cache is not None:
+            return tasks
+        return [task for task in tasks if not os.path.exists(task.done_path)]
+
+    def is_done(self, job: ScoreJob) -> bool:
+        return os.path.exists(job.output_path) and os.path.getsize(job.output_path) > 0
+
+    def run(self) -> Dict[str, List[ScoreJob]]:
+        """
+        Run all the jobs that are not already done. A job is scheduled (and its archived
+        decoys extracted) only when a worker is free, so that the decoys of at most a few
+        jobs are on disk at the same time.
+        :return: the jobs that were skipped, done and failed
+        """
+        jobs = self.get_jobs()
+        report: Dict = {
+            "skipped": [job for job in jobs if self.is_done(job)],
+            "done": [],
+            "failed": [],
+        }
+        pending = [job for job in jobs if not self.is_done(job)]
+        remaining: Dict[ScoreJob, int] = {}
+        failed = set()
+        with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+            futures: Dict = {}
+            while pending or futures:
+                while pending and len(futures) < self.n_workers:
+                    job = pending.pop(0)
+                    self.extract_decoys(job)
+                    tasks = self.get_tasks(job)
+                    remaining[job] = len(tasks)
+                    if len(tasks) == 0:
+                        # All the shards were computed by a previous run
+                        report["done"].append(job)
+                        self.finish_job(job)
+                    for task in sorted(tasks, key=lambda task: task.cost, reverse=True):
+                        futures[executor.submit(self.run_task, task)] = task
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = futures.pop(future)
+                    job = task.job
+                    remaining[job] -= 1
+                    if not future.result():
+                        failed.add(job)
+                    elif self.cache is not None:
+                        self.cache_task(task)
+                    if remaining[job] == 0:
+                        if job in failed:
+                            report["failed"].append(job)
+                            self.remove_decoys(job)
+                        else:
+                            report["done"].append(job)
+                            self.finish_job(job)
+        print(
+            f"{len(report['done'])} done, {len(report['skipped'])} skipped, "
+            f"{len(report['failed'])} failed"
+        )
+        for job in report["failed"]:
+            print(f"Failed: {job.dataset}/{job.rna}")
+        return report
+
+    def run_task(self, task: ScoreTask) -> bool:
+        """
+        Run RNAdvisor for the task, retrying if it fails
+        :return: whether the scores were computed
+        """
+        job = task.job
+        os.makedirs(os.path.dirname(task.result_path), exist_ok=True)
+        os.makedirs(os.path.dirname(task.done_path), exist_ok=True)
+        command = self.command.build(job.native_path, task.pred_path, task.result_path)
+        for _ in range(self.retries + 1):
+            print(f"{job.native_path} {task.pred_path} {job.output_path}")
+            process = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            if process.returncode == 0 and os.path.exists(task.result_path):
+                os.replace(task.result_path, task.done_path)
+                return True
+        return False
+
+    def cache_task(self, task: ScoreTask):
+        """
+        Add the scores computed by the task to the cache
+        """
+        hashes = self.get_hashes(task.job)
+        native = os.path.basename(task.job.native_path)
+        df = pd.read_csv(task.done_path, index_col=[0], float_precision="round_trip")
+        results = []
+        for name, scores in df.to_dict(orient="index").items():
+            row_file = get_row_file(name)
+            if row_file == native:
+                decoy = None
+            elif row_file in hashes:
+                decoy = row_file
+            else:
+                continue
+            results.append(
+                (
+                    hashes[None],
+                    hashes[decoy],
+                    ALL_SCORES,
+                    self.command.get_version(),
+                    {"name": name, "scores": scores},
+                )
+            )
+        # All the scores of the run in one transaction
+        self.cache.put_many(results)  # type: ignore
+
+    def finish_job(self, job: ScoreJob):
+        """
+        Write the output of the job from the cache or from the scores of its shards,
+        and remove the shards and the decoys written from its archive
+        """
+        shard_dir, staging_dir = self.get_shard_dirs(job)
+        decoys = DecoySharding.get_decoys(job.pred_path)
+        if self.cache is not None:
+            results = [self.get_cached(job, decoy) for decoy in [None, *decoys]]
+            results = [result for result in results if result is not None]
+            df = pd.DataFrame.from_records(
+                [result["scores"] for result in results],
+                index=[result["name"] for result in results],
+            )
+            DecoySharding.write(df, job.output_path, decoys)
+        elif self.sharding is not None:
+            n_shards = self.sharding.get_n_shards(len(decoys))
+            shard_csvs = [os.path.join(shard_dir, f"shard_{i}.csv") for i in range(n_shards)]
+            self.sharding.merge(shard_csvs, job.output_path, decoys)
+        shutil.rmtree(shard_dir, ignore_errors=True)
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        self.remove_decoys(job)
+
+
+def get_rna_length(pdb_path: str) -> int:
+    """
+    Return the number of residues of a PDB file
+    """
+    residues = set()
+    with open(pdb_path) as file:
+        for line in file:
+            if line.startswith(("ATOM", "HETATM")):
+                residues.add(line[21:27])
+    return len(residues)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--datasets", nargs="+", default=DATASETS)
+    parser.add_argument("--input_dir", default=INPUT_DIR)
+    parser.add_argument("--output_dir", default=OUTPUT_DIR)
+    parser.add_argument("--n_workers", type=int, default=1, help="Number of concurrent runs")
+    parser.add_argument("--retries", type=int, default=1, help="Retries of a failed RNA")
+    parser.add_argument("--image", default=DOCKER_IMAGE, help="Docker image of RNAdvisor")
+    parser.add_argument(
+        "--executable", default=None, help="Local RNAdvisor command to use instead of docker"
+    )
+    parser.add_argument(
+        "--shard_size", type=int, default=None, help="Maximum number of decoys per run"
+    )
+    parser.add_argument(
+        "--cache", action="store_true", help="Reuse the scores of the unchanged decoys"
+    )
+    parser.add_argument(
+        "--cost_model",
+        action="store_true",
+        help="Order the RNAs by the computation time predicted from the time benchmark",
+    )
+    args = parser.parse_args()
+    score_scheduler = ScoreScheduler(
+        args.datasets,
+        args.input_dir,
+        args.output_dir,
+        n_workers=args.n_workers,
+        retries=args.retries,
+        command=RNAdvisorCommand(args.image, args.executable),
+        shard_size=args.shard_size,
+        cache=ResultCache() if args.cache else None,
+        cost_model=ComplexityAnalysis() if args.cost_model else None,
+    )
+    score_scheduler.run()
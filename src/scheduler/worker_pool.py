@@ -0,0 +1,126 @@
+import json
+import queue
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+
+class RNAdvisorWorker:
+    """
+    Long-lived RNAdvisor process (a docker container or a local process), which receives the
+    jobs on its stdin and answers on its stdout, one JSON per line.
+    The process is started again if it died.
+    """
+
+    def __init__(self, command: List[str]):
+        """
+        :param command: the command that starts the worker
+        """
+        self.command = command
+        self.process: Optional[subprocess.Popen] = None
+
+    def start(self):
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+
+    def run(self, job: Dict) -> Dict:
+        """
+        Send the job to the worker and wait for its response
+        :return: the response, with the status, the error and the resource usage of the job
+        """
+        if self.process is None or self.process.poll() is not None:
+            self.start()
+        try:
+            self.process.stdin.write(json.dumps(job) + "\n")  # type: ignore
+            self.process.stdin.flush()  # type: ignore
+            line = self.process.stdout.readline()  # type: ignore
+        except BrokenPipeError:
+            line = ""
+        if not line:
+            self.close()
+            return {"status": "error", "error": "The worker stopped"}
+        return json.loads(line)
+
+    def close(self):
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            self.process.stdin.close()  # type: ignore
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+
+class WorkerPool:
+    """
+    Fixed number of long-lived RNAdvisor workers, to avoid starting a container for each
+    (native, prediction, score).
+    The workers are started at the first job, and a job is sent to the first idle worker.
+    """
+
+    def __init__(self, command: List[str], n_workers: int = 1):
+        """
+        :param command: the command that starts a worker, like
+            `RNAdvisorCommand(image).get_worker_command()`. It has no default, so that the
+            workers run the image whose version is recorded with the results.
+        :param n_workers: number of workers
+        """
+        self.workers = [RNAdvisorWorker(command) for _ in range(n_workers)]
+        self.idle_workers: queue.Queue = queue.Queue()
+        for worker in self.workers:
+            self.idle_workers.put(worker)
+        self.lock = threading.Lock()
+
+    def run(
+        self,
+        native_path: str,
+        pred_path: str,
+        result_path: str,
+        all_scores: str = "ALL",
+        time_path: Optional[str] = None,
+    ) -> Dict:
+        """
+        Compute the scores on an idle worker. It has the same arguments as RNAdvisor.
+        :return: the response of the worker
+        """
+        job = {
+            "native_path": native_path,
+            "pred_path": pred_path,
+            "result_path": result_path,
+            "all_scores": all_scores,
+            "time_path": time_path,
+        }
+        return self.run_job(job)
+
+    def run_job(self, job: Dict) -> Dict:
+        worker = self.idle_workers.get()
+        try:
+            return worker.run(job)
+        finally:
+            self.idle_workers.put(worker)
+
+    def map(self, jobs: List[Dict]) -> List[Dict]:
+        """
+        Run the jobs on all the workers, and return the responses in the order of the jobs
+        """
+        with ThreadPoolExecutor(max_workers=len(self.workers)) as executor:
+            return list(executor.map(self.run_job, jobs))
+
+    def close(self):
+        with self.lock:
+            for worker in self.workers:
+                worker.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -1,48 +1,45 @@
 from typing import List
 
-import pandas as pd
+import numpy as np
 
 from src.scores.score_abstract import ScoreAbstract
+from src.scores.score_matrix import ScoreMatrix
 
 
 class EnrichmentScore(ScoreAbstract):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-    def _compute_score(self, metric: str, energy: str, df: pd.DataFrame, name: str) -> float:
+    def _compute_scores(
+        self, metrics_list: List, energy_list: List, score_matrix: ScoreMatrix
+    ) -> np.ndarray:
         """
-        Compute the Enrichment Score for the given metric and energy
-        :param metric:
-        :param energy:
-        :return:
+        Compute the Enrichment Score between each energy and each metric.
+        It is the percentage of decoys in common between the top 10% of the energy and
+        the top 10% of the metric.
         """
-        sorted_metrics = df.sort_values(
-            by=metric, ascending=(metric not in self.ascending_metrics)
-        ).index.tolist()
-        sorted_energy = df.sort_values(
-            by=energy, ascending=(energy not in self.ascending_energies)
-        ).index.tolist()
-        top_n_metrics = self.get_top_n(sorted_metrics, 0.1)
-        top_n_energy = self.get_top_n(sorted_energy, 0.1)
-        if top_n_energy == top_n_metrics:
-            return 10
-        intersection = self.get_intersection(top_n_metrics, top_n_energy)
-        n_total = len(df) - 1  # remove the native
-        es = 100 * intersection / n_total
-        return es
+        top_metrics, metrics_present = score_matrix.rank_index.get_top_n(
+            metrics_list, self.get_ascending(metrics_list, self.ascending_metrics), 0.1
+        )
+        top_energies, energies_present = score_matrix.rank_index.get_top_n(
+            energy_list, self.get_ascending(energy_list, self.ascending_energies), 0.1
+        )
+        intersection = self.get_membership(top_energies, score_matrix.n_rows).T.astype(
+            int
+        ) @ self.get_membership(top_metrics, score_matrix.n_rows).astype(int)
+        n_total = score_matrix.n_rows - 1  # remove the native
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scores = 100 * intersection / n_total
+        same_top = (top_energies[:, :, None] == top_metrics[:, None, :]).all(axis=0)
+        scores[same_top] = 10
+        scores[~energies_present, :] = np.nan
+        scores[:, ~metrics_present] = np.nan
+        return scores
 
-    def get_top_n(self, inputs: List, top_n: float) -> List:
+    def get_membership(self, top: np.ndarray, n_rows: int) -> np.ndarray:
         """
-        Return the top n% of the list
-        :param inputs:
-        :param top_n:
-        :return:
+        Return the (n_rows, n_columns) mask of the decoys that are in the top of each column
         """
-        return inputs[: int(len(inputs) * top_n)]
-
-    def get_intersection(self, lst1: List, lst2: List) -> int:
-        """
-        Return the number of intersected elements
-        """
-        common_lst = list(set(lst1) & set(lst2))
-        return len(common_lst)
+        membership = np.zeros((n_rows, top.shape[1]), dtype=bool)
+        membership[top, np.arange(top.shape[1])] = True
+        return membership
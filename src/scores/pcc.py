@@ -1,43 +1,58 @@
-from typing import Tuple
+from typing import List
 
 import numpy as np
-import pandas as pd
-from scipy.stats import pearsonr
 
 from src.scores.score_abstract import ScoreAbstract
+from src.scores.score_matrix import ScoreMatrix
 
 
 class PCC(ScoreAbstract):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-    def _compute_score(self, metric: str, energy: str, df: pd.DataFrame, name: str) -> float:
+    def _compute_scores(
+        self, metrics_list: List, energy_list: List, score_matrix: ScoreMatrix
+    ) -> np.ndarray:
         """
-        Compute the Enrichment Score for the given metric and energy
-        :param metric:
-        :param energy:
-        :return:
+        Compute the absolute Pearson correlation between each energy and each metric.
+        The INF and NaN values are removed for each pair (energy, metric).
         """
-        sorted_metrics, sorted_energy = df[metric].values, df[energy].values
-        sorted_metrics, sorted_energy = self.filter_inf(sorted_metrics, sorted_energy)
-        try:
-            pearson_corr, _ = pearsonr(sorted_metrics, sorted_energy)
-        except ValueError:
-            return np.nan
-        return abs(pearson_corr)
+        metrics, metrics_present = score_matrix.get_columns(metrics_list)
+        energies, energies_present = score_matrix.get_columns(energy_list)
+        metrics_valid, energies_valid = self.get_valid(metrics), self.get_valid(energies)
+        scores = np.full((len(energy_list), len(metrics_list)), np.nan)
+        for i_energy in np.flatnonzero(energies_present):
+            mask = metrics_valid & energies_valid[:, [i_energy]]
+            energy = np.broadcast_to(energies[:, [i_energy]], mask.shape)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                scores[i_energy] = self.masked_pearson(metrics, energy, mask)
+        scores[:, ~metrics_present] = np.nan
+        return np.abs(scores)
 
-    def filter_inf(
-        self, matrix1: np.ndarray, matrix2: np.ndarray
-    ) -> Tuple[np.ndarray, np.ndarray]:
+    def get_valid(self, matrix: np.ndarray) -> np.ndarray:
         """
-        Remove the INF values from the matrix
-        :param matrix1:
-        :param matrix2:
-        :return:
+        Return the mask of the values that are neither NaN nor INF
         """
-        matrix1 = np.nan_to_num(matrix1, nan=1e301)
-        matrix2 = np.nan_to_num(matrix2, nan=1e301)
-        indices = np.where((matrix1 < 1e300) & (matrix2 < 1e300))
-        new_matrix1 = matrix1[indices]
-        new_matrix2 = matrix2[indices]
-        return new_matrix1, new_matrix2
+        return np.nan_to_num(matrix, nan=1e301) < 1e300
+
+    def masked_pearson(self, matrix1: np.ndarray, matrix2: np.ndarray, mask: np.ndarray):
+        """
+        Compute the Pearson correlation between the columns of two matrices, only
+        on the values of the mask.
+        :return: the correlation for each column, NaN if there is less than two values
+            or if one of the columns is constant
+        """
+        n_values = mask.sum(axis=0)
+        centered = []
+        for matrix in [matrix1, matrix2]:
+            values = np.where(mask, matrix, 0)
+            values = np.where(mask, values - values.sum(axis=0) / n_values, 0)
+            constant = np.where(mask, matrix, np.inf).min(axis=0) == np.where(
+                mask, matrix, -np.inf
+            ).max(axis=0)
+            centered.append((values, constant))
+        (values1, constant1), (values2, constant2) = centered
+        norm = np.sqrt((values1**2).sum(axis=0)) * np.sqrt((values2**2).sum(axis=0))
+        corr = np.clip((values1 * values2).sum(axis=0) / norm, -1, 1)
+        corr[(n_values < 2) | constant1 | constant2] = np.nan
+        return corr
@@ -0,0 +1,83 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def sort_indexes(values: np.ndarray, ascending: bool) -> np.ndarray:
+    """
+    Return the indexes that sort the given column, with the NaN values at the end.
+    It gives the same order as `df.sort_values(by=column, ascending=ascending)`.
+    :param values: 1D array of the values to sort
+    :param ascending: whether to sort in ascending order
+    :return: the positions of the sorted values
+    """
+    mask = np.isnan(values)
+    indexes = np.arange(len(values))
+    non_nans, non_nan_indexes = values[~mask], indexes[~mask]
+    if not ascending:
+        non_nans, non_nan_indexes = non_nans[::-1], non_nan_indexes[::-1]
+    sorted_indexes = non_nan_indexes[non_nans.argsort(kind="quicksort")]
+    if not ascending:
+        sorted_indexes = sorted_indexes[::-1]
+    return np.concatenate([sorted_indexes, indexes[mask]])
+
+
+class RankIndex:
+    """
+    Cache of the sorted positions of the columns of one RNA.
+    Each column is sorted only once for a given order, and shared between the scores.
+    """
+
+    def __init__(self, columns: Dict[str, int], values: np.ndarray):
+        """
+        :param columns: position of each column in the values
+        :param values: the (n_rows, n_columns) values to sort
+        """
+        self.columns = columns
+        self.values = values
+        self._sort_indexes: Dict[Tuple[str, bool], np.ndarray] = {}
+        self._ranks: Dict[Tuple[str, bool], np.ndarray] = {}
+
+    def get_sort_indexes(self, column: str, ascending: bool) -> Optional[np.ndarray]:
+        """
+        Return the positions of the rows sorted by the given column.
+        :return: the sorted positions, None if the column is missing
+        """
+        if column not in self.columns:
+            return None
+        key = (column, ascending)
+        if key not in self._sort_indexes:
+            self._sort_indexes[key] = sort_indexes(self.values[:, self.columns[column]], ascending)
+        return self._sort_indexes[key]
+
+    def get_ranks(self, column: str, ascending: bool) -> Optional[np.ndarray]:
+        """
+        Return the rank (starting at 0) of each row when sorting by the given column.
+        :return: the ranks, None if the column is missing
+        """
+        key = (column, ascending)
+        if key not in self._ranks:
+            sorted_indexes = self.get_sort_indexes(column, ascending)
+            if sorted_indexes is None:
+                return None
+            ranks = np.empty_like(sorted_indexes)
+            ranks[sorted_indexes] = np.arange(len(sorted_indexes))
+            self._ranks[key] = ranks
+        return self._ranks[key]
+
+    def get_top_n(
+        self, columns: List[str], ascending: List[bool], top_n: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the positions of the top n% of the rows for each column
+        :return: the (n_top, n_columns) positions of the best rows and the mask of
+            the columns that are present
+        """
+        n_top = int(len(self.values) * top_n)
+        top = np.zeros((n_top, len(columns)), dtype=int)
+        present = np.zeros(len(columns), dtype=bool)
+        for i, (column, is_ascending) in enumerate(zip(columns, ascending)):
+            sorted_indexes = self.get_sort_indexes(column, is_ascending)
+            if sorted_indexes is not None:
+                top[:, i], present[i] = sorted_indexes[:n_top], True
+        return top, present
@@ -1,38 +1,33 @@
-from typing import Dict
+from typing import Dict, List
 
 import numpy as np
 import pandas as pd
 
 from src.scores.score_abstract import ScoreAbstract
+from src.scores.score_matrix import ScoreMatrix
 
 
 class Ranker(ScoreAbstract):
+    uses_metric = False
+
     def __init__(self, normalize: bool, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.agg_fn = np.mean
         self.normalize = normalize
 
-    def _compute_score(self, metric: str, energy: str, df: pd.DataFrame, name: str) -> float:
+    def _compute_scores(
+        self, metrics_list: List, energy_list: List, score_matrix: ScoreMatrix
+    ) -> np.ndarray:
         """
-        Compute the Enrichment Score for the given metric and energy
-        :param metric:
-        :param energy:
-        :return:
+        Compute the rank of the native structure for each energy.
+        It does not depend on the metric.
         """
-        native_name = f"normalized_{name}.pdb"
-        sorted_energy = df.sort_values(
-            by=energy, ascending=(energy not in self.ascending_energies)
-        )[energy]
-        sorted_names = sorted_energy.index.tolist()
-        try:
-            rank = sorted_names.index(native_name)
-        except ValueError:
-            rank = sorted_names.index(f"{name}.pdb")
+        ranks = self.get_native_ranks(energy_list, score_matrix)
         if self.normalize:
-            rank = rank / len(sorted_names)
+            ranks = ranks / score_matrix.n_rows
         else:
-            rank = rank + 1  # To ensure the first position is 1 and not 0
-        return rank
+            ranks = ranks + 1  # To ensure the first position is 1 and not 0
+        return np.repeat(ranks[:, None], len(metrics_list), axis=1)
 
     def convert_dict_to_df(self, scores: Dict, add_mean: bool = False) -> pd.DataFrame:
         """
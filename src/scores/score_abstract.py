@@ -1,13 +1,18 @@
 from abc import abstractmethod
-from typing import Dict, List
+from typing import Dict, List, Union
 
 import numpy as np
 import pandas as pd
 
+from src.scores.score_matrix import ScoreMatrix, to_score_matrices
+
 
 class ScoreAbstract:
     """Abstract class for the computation and iteration over the dfs of scores and metrics"""
 
+    # Whether the score of a pair (energy, metric) reads the metric, or only the energy
+    uses_metric = True
+
     def __init__(self, ascending_metrics: List[str], ascending_energies: List[str]):
         self.ascending_metrics = ascending_metrics
         self.ascending_energies = ascending_energies
@@ -17,30 +22,83 @@ class ScoreAbstract:
         self,
         energy_list: List,
         metrics_list: List,
-        dfs: Dict[str, pd.DataFrame],
+        dfs: Dict[str, Union[pd.DataFrame, ScoreMatrix]],
         add_mean: bool = False,
     ) -> pd.DataFrame:
         """
-        Loop to compute the score
+        Compute the score for all the pairs (energy, metric) of each RNA
+        :param dfs: the scores of each RNA, either as dataframes or as score matrices
+            (to share the sorted columns between the different scores)
         :return:
         """
+        rna_scores = self.compute_rna_scores(energy_list, metrics_list, to_score_matrices(dfs))
+        return self.aggregate_scores(energy_list, metrics_list, rna_scores, add_mean)
+
+    def compute_rna_scores(
+        self, energy_list: List, metrics_list: List, score_matrices: Dict[str, ScoreMatrix]
+    ) -> np.ndarray:
+        """
+        Compute the score of every pair (energy, metric) for each RNA
+        :return: an array of shape (n_rna, len(energy_list), len(metrics_list))
+        """
+        return np.array(
+            [
+                self._compute_scores(metrics_list, energy_list, score_matrix)
+                for score_matrix in score_matrices.values()
+            ]
+        ).reshape(len(score_matrices), len(energy_list), len(metrics_list))
+
+    def aggregate_scores(
+        self, energy_list: List, metrics_list: List, rna_scores: np.ndarray, add_mean: bool = False
+    ) -> pd.DataFrame:
+        """
+        Aggregate the scores of the RNAs, ignoring the scores that could not be computed
+        :param rna_scores: an array of shape (n_rna, len(energy_list), len(metrics_list))
+        """
         scores: Dict = {energy: {metric: [] for metric in metrics_list} for energy in energy_list}
-        for energy in energy_list:
-            for metric in metrics_list:
-                for name, df in dfs.items():
-                    try:
-                        current_score = (self._compute_score(metric, energy, df, name),)
-                    except KeyError:
-                        current_score = np.nan  # type: ignore
-                    if not np.isnan(current_score):
-                        scores[energy][metric].append(current_score)
+        for i_energy, energy in enumerate(energy_list):
+            for i_metric, metric in enumerate(metrics_list):
+                current_scores = rna_scores[:, i_energy, i_metric]
+                scores[energy][metric] = current_scores[~np.isnan(current_scores)]
         new_scores = self.convert_dict_to_df(scores, add_mean=add_mean)
         return new_scores
 
     @abstractmethod
-    def _compute_score(self, metric: str, energy: str, df: pd.DataFrame, name: str) -> float:
+    def _compute_scores(
+        self, metrics_list: List, energy_list: List, score_matrix: ScoreMatrix
+    ) -> np.ndarray:
+        """
+        Compute the score of every pair (energy, metric) for one RNA
+        :param metrics_list: the metrics to compare to
+        :param energy_list: the energies to evaluate
+        :param score_matrix: the values of the metrics and energies for the RNA
+        :return: an array of shape (len(energy_list), len(metrics_list)) with NaN when the
+            score can not be computed
+        """
         raise NotImplementedError
 
+    def get_ascending(self, columns: List, ascending_columns: List) -> List[bool]:
+        """
+        Return whether each column should be sorted in ascending order
+        """
+        return [column not in ascending_columns for column in columns]
+
+    def get_native_ranks(self, energy_list: List, score_matrix: ScoreMatrix) -> np.ndarray:
+        """
+        Return the position (starting at 0) of the native structure when sorting by each energy
+        :return: the rank for each energy, NaN for the missing energies
+        """
+        ranks = np.full(len(energy_list), np.nan)
+        if not any(energy in score_matrix.columns for energy in energy_list):
+            return ranks
+        native_indexes = score_matrix.get_native_indexes()
+        ascending = self.get_ascending(energy_list, self.ascending_energies)
+        for i_energy, (energy, is_ascending) in enumerate(zip(energy_list, ascending)):
+            energy_ranks = score_matrix.rank_index.get_ranks(energy, is_ascending)
+            if energy_ranks is not None:
+                ranks[i_energy] = energy_ranks[native_indexes].min()
+        return ranks
+
     def convert_dict_to_df(self, scores: Dict, add_mean: bool = False) -> pd.DataFrame:
         """
         Convert the dictionary of scores to a dataframe by using the mean
@@ -0,0 +1,65 @@
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.scores.rank_index import RankIndex
+
+
+class ScoreMatrix:
+    """Dense NumPy view of the metrics and energies of one RNA"""
+
+    def __init__(self, df: pd.DataFrame, name: str):
+        """
+        :param df: dataframe with the decoys as index and the metrics/energies as columns
+        :param name: name of the RNA
+        """
+        self.name = name
+        self.names = df.index.to_numpy()
+        self.columns = {column: i for i, column in reversed(list(enumerate(df.columns)))}
+        self.values = df.to_numpy(dtype=float)
+        self.n_rows = len(df)
+        self._rank_index: Optional[RankIndex] = None
+
+    @property
+    def rank_index(self) -> RankIndex:
+        """
+        Return the sorted positions of the columns, shared by all the scores
+        """
+        if self._rank_index is None:
+            self._rank_index = RankIndex(self.columns, self.values)
+        return self._rank_index
+
+    def get_columns(self, columns: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the values of the given columns.
+        :param columns: names of the columns
+        :return: the (n_rows, n_columns) values, with NaN for the missing columns, and
+            the mask of the columns that are present
+        """
+        present = np.array([column in self.columns for column in columns], dtype=bool)
+        values = np.full((self.n_rows, len(columns)), np.nan)
+        values[:, present] = self.values[
+            :, [self.columns[column] for column in columns if column in self.columns]
+        ]
+        return values, present
+
+    def get_native_indexes(self) -> np.ndarray:
+        """
+        Return the positions of the native structure in the rows
+        """
+        for native_name in [f"normalized_{self.name}.pdb", f"{self.name}.pdb"]:
+            indexes = np.flatnonzero(self.names == native_name)
+            if len(indexes) > 0:
+                return indexes
+        raise ValueError(f"No native structure found for {self.name}")
+
+
+def to_score_matrices(dfs: Dict[str, Union[pd.DataFrame, ScoreMatrix]]) -> Dict[str, ScoreMatrix]:
+    """
+    Convert the dataframe of each RNA to a score matrix, keeping the existing score matrices
+    """
+    return {
+        name: df if isinstance(df, ScoreMatrix) else ScoreMatrix(df, name)
+        for name, df in dfs.items()
+    }
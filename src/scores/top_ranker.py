@@ -1,43 +1,41 @@
-from typing import Dict
+from typing import Dict, List
 
 import numpy as np
 import pandas as pd
 
 from src.scores.score_abstract import ScoreAbstract
+from src.scores.score_matrix import ScoreMatrix
 
 
 class TopRanker(ScoreAbstract):
+    uses_metric = False
+
     def __init__(self, top_n: int, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.agg_fn = np.sum
         self.top_n = top_n
 
-    def _compute_score(self, metric: str, energy: str, df: pd.DataFrame, name: str) -> float:
+    def _compute_scores(
+        self, metrics_list: List, energy_list: List, score_matrix: ScoreMatrix
+    ) -> np.ndarray:
         """
-        Compute the Enrichment Score for the given metric and energy
-        :param metric:
-        :param energy:
-        :return:
+        Return 1 if the native structure is in the top n for each energy, 0 otherwise.
+        It does not depend on the metric.
         """
-        native_name = f"normalized_{name}.pdb"
-        sorted_energy = df.sort_values(
-            by=energy, ascending=(energy not in self.ascending_energies)
-        )[energy]
-        sorted_names = sorted_energy.index.tolist()
-        try:
-            rank = sorted_names.index(native_name)
-        except ValueError:
-            rank = sorted_names.index(f"{name}.pdb")
-        if rank < self.top_n:
-            return 1
-        return 0
+        ranks = self.get_native_ranks(energy_list, score_matrix)
+        is_top = (ranks < self.top_n).astype(float)
+        is_top[np.isnan(ranks)] = np.nan
+        return np.repeat(is_top[:, None], len(metrics_list), axis=1)
 
     def convert_dict_to_df(self, scores: Dict, add_mean: bool = False) -> pd.DataFrame:
         """
         Convert the dictionary of scores to a dataframe by using the mean
         """
         new_scores = {
-            energy: [self.agg_fn(scores[energy][metric]) for metric in list(scores[energy].keys())]
+            energy: [
+                self.agg_fn([int(score) for score in scores[energy][metric]])
+                for metric in list(scores[energy].keys())
+            ]
             for energy in list(scores.keys())
         }
         new_scores = pd.DataFrame(new_scores).iloc[0, :]
@@ -1,5 +1,14 @@
+import argparse
 import os
 import shutil
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+from src.scheduler.rnadvisor_command import RNAdvisorCommand
+from src.scheduler.worker_pool import WorkerPool
+from src.utils.benchmark_history import BenchmarkHistory
+from src.utils.workload_generator import read_manifest
 
 COMMAND = (
     "docker run -it -v ${PWD}/docker_data/:/app/docker_data -v ${PWD}/tmp:/tmp rnadvisor"
@@ -9,25 +18,79 @@ COMMAND = (
 
 
 class Benchmark:
-    def __init__(self, input_path: str, output_path: str):
+    def __init__(
+        self,
+        input_path: str,
+        output_path: str,
+        worker_pool: Optional[WorkerPool] = None,
+        history: Optional[BenchmarkHistory] = None,
+        manifest_path: Optional[str] = None,
+        command: Optional[RNAdvisorCommand] = None,
+    ):
+        """
+        :param input_path: folder with the decoys of each length
+        :param output_path: folder where to save the computation times
+        :param worker_pool: long-lived RNAdvisor workers. If None, a container is started
+            for each length.
+        :param history: where to add the computation times, with the version of RNAdvisor
+        :param manifest_path: manifest of the workload generator, to use its decoys instead
+            of the ones of the input folder. The times are saved in a folder by native.
+        :param command: the RNAdvisor image whose version is recorded (`rnadvisor` by
+            default). A given worker_pool should run the same image.
+        """
         self.input_path = input_path
         self.output_path = output_path
+        self.worker_pool = worker_pool
+        self.history = history
+        self.manifest_path = manifest_path
+        self.command = RNAdvisorCommand("rnadvisor") if command is None else command
 
     def run(self):
-        dirs = os.listdir(os.path.join(self.input_path, "decoys"))
         time_dir, tmp_dir = self.output_path, os.path.join(
             self.input_path, "tmp"
         )
         os.makedirs(time_dir, exist_ok=True)
-        for dir in dirs:
-            pred_dirs = os.path.join(self.input_path, "decoys", dir)
-            native_path = os.path.join(pred_dirs, os.listdir(pred_dirs)[0])
+        run_id = None
+        version = self.command.get_version() if self.history is not None else ""
+        for dir, native_path, pred_dirs in self.get_groups():
             out_path = tmp_dir
             time_path = os.path.join(time_dir, f"{dir}.csv")
+            os.makedirs(os.path.dirname(time_path), exist_ok=True)
             self.run_docker(native_path, pred_dirs, out_path, time_path)
+            if self.history is not None and os.path.exists(time_path):
+                run_id = self.history.record(
+                    "time",
+                    version,
+                    dir,
+                    pd.read_csv(time_path, index_col=[0]),
+                    run_id,
+                )
         shutil.rmtree(tmp_dir)
 
+    def get_groups(self) -> List[Tuple[str, str, str]]:
+        """
+        Return the name, the native and the folder of decoys of each group of decoys
+        """
+        if self.manifest_path is None:
+            groups = []
+            for dir in os.listdir(os.path.join(self.input_path, "decoys")):
+                pred_dirs = os.path.join(self.input_path, "decoys", dir)
+                groups.append((dir, os.path.join(pred_dirs, os.listdir(pred_dirs)[0]), pred_dirs))
+            return groups
+        manifest = read_manifest(self.manifest_path)
+        return [
+            (
+                os.path.join(rna, f"decoy_{length}"),
+                df["native_path"].iloc[0],
+                os.path.dirname(df["pred_path"].iloc[0]),
+            )
+            for (rna, length), df in manifest.groupby(["rna", "length"], sort=False)
+        ]
+
     def run_docker(self, native_path: str, pred_path: str, out_path: str, time_path: str):
+        if self.worker_pool is not None:
+            self.worker_pool.run(native_path, pred_path, out_path, time_path=time_path)
+            return
         command = (
             COMMAND.replace("$path_to_native", native_path)
             .replace("$path_to_pred", pred_path)
@@ -38,7 +101,14 @@ class Benchmark:
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--manifest_path", default=None, help="Manifest of decoys of the workload generator"
+    )
+    args = parser.parse_args()
     input_path = os.path.join("docker_data", "input", "time")
     output_path = os.path.join("docker_data", "output", "time")
-    benchmark = Benchmark(input_path, output_path)
+    benchmark = Benchmark(
+        input_path, output_path, history=BenchmarkHistory(), manifest_path=args.manifest_path
+    )
     benchmark.run()
@@ -0,0 +1,258 @@
+import argparse
+import os
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from src.utils.csv_cache import CsvCache
+
+TIME_PATH = os.path.join("docker_data", "output", "time")
+
+
+class ScalingModel(NamedTuple):
+    """Scaling model of the computation time, linear in its parameters after a transformation"""
+
+    name: str
+    # Features of the linear regression from the RNA lengths
+    features: Callable[[np.ndarray], np.ndarray]
+    # Whether the regression is done on the logarithm of the times
+    log_time: bool
+
+
+SCALING_MODELS = [
+    ScalingModel(
+        "power law",
+        lambda n: np.stack([np.ones_like(n), np.log(n)], axis=1),
+        True,
+    ),
+    ScalingModel(
+        "n log n",
+        lambda n: np.stack([np.ones_like(n), n * np.log(n)], axis=1),
+        False,
+    ),
+    ScalingModel(
+        "quadratic",
+        lambda n: np.stack([np.ones_like(n), n, n**2], axis=1),
+        False,
+    ),
+]
+
+
+class FittedModel:
+    """Scaling model fitted by ordinary least squares on the times of one score"""
+
+    def __init__(self, model: ScalingModel, n_nt: np.ndarray, times: np.ndarray):
+        """
+        :param model: the scaling model
+        :param n_nt: the RNA length of each measure
+        :param times: the computation time of each measure, in seconds
+        """
+        self.model = model
+        x = model.features(n_nt)
+        y = np.log(times) if model.log_time else times
+        self.params, _, _, _ = np.linalg.lstsq(x, y, rcond=None)
+        self.n_samples, self.n_params = x.shape
+        self.dof = max(self.n_samples - self.n_params, 1)
+        residuals = y - x @ self.params
+        self.sigma2 = residuals @ residuals / self.dof
+        self.xtx_inv = np.linalg.pinv(x.T @ x)
+        # The AIC is computed on the times for all the models, so that they can be compared
+        rss = np.sum((times - self.predict_mean(n_nt)) ** 2)
+        self.aic = self.n_samples * np.log(max(rss, 1e-300) / self.n_samples) + 2 * self.n_params
+
+    @property
+    def name(self) -> str:
+        return self.model.name
+
+    def predict_mean(self, n_nt: np.ndarray) -> np.ndarray:
+        prediction = self.model.features(np.asarray(n_nt, dtype=float)) @ self.params
+        return np.exp(prediction) if self.model.log_time else prediction
+
+    def predict(
+        self, n_nt: np.ndarray, confidence: float = 0.95
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Return the predicted time with the bounds of its confidence interval
+        :param n_nt: the RNA lengths
+        :param confidence: the level of the confidence interval
+        :return: the prediction, and its lower and upper bounds
+        """
+        x = self.model.features(np.atleast_1d(np.asarray(n_nt, dtype=float)))
+        prediction = x @ self.params
+        std_error = np.sqrt(self.sigma2 * np.einsum("ij,jk,ik->i", x, self.xtx_inv, x))
+        margin = stats.t.ppf((1 + confidence) / 2, self.dof) * std_error
+        bounds = prediction, prediction - margin, prediction + margin
+        if self.model.log_time:
+            return tuple(np.exp(bound) for bound in bounds)  # type: ignore
+        return bounds
+
+    def get_params_ci(self, confidence: float = 0.95) -> pd.DataFrame:
+        """
+        Return the parameters with the bounds of their confidence intervals
+        """
+        std_error = np.sqrt(self.sigma2 * np.diag(self.xtx_inv))
+        margin = stats.t.ppf((1 + confidence) / 2, self.dof) * std_error
+        return pd.DataFrame(
+            {"value": self.params, "low": self.params - margin, "high": self.params + margin}
+        )
+
+
+class ComplexityAnalysis:
+    """
+    Fit the scaling models of each score to the times of the time benchmark, and select the
+    best model with the Akaike information criterion.
+    """
+
+    def __init__(
+        self,
+        benchmark_path: str = TIME_PATH,
+        confidence: float = 0.95,
+        dfs: Optional[Dict[str, pd.DataFrame]] = None,
+    ):
+        """
+        :param benchmark_path: folder with the CSV of each length (`decoy_<length>.csv`), with
+            the time of each score for each decoy
+        :param confidence: the level of the confidence intervals
+        :param dfs: the times of each length, instead of reading the benchmark folder
+        """
+        self.confidence = confidence
+        dfs = CsvCache().read_csv_folder(benchmark_path) if dfs is None else dfs
+        self.df = self.get_times(dfs)
+        self.fits: Dict[str, List[FittedModel]] = {}
+
+    @staticmethod
+    def get_times(dfs: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """
+        Return the time of each score for each decoy, with the length of the decoys
+        :return: a long-format dataframe with the columns nt_length, score and time
+        """
+        df = pd.concat(
+            [
+                df.melt(var_name="score", value_name="time").assign(
+                    nt_length=int(name.replace("decoy_", ""))
+                )
+                for name, df in dfs.items()
+            ],
+            ignore_index=True,
+        )
+        return df[np.isfinite(df["time"]) & (df["time"] > 0)]
+
+    @property
+    def scores(self) -> List[str]:
+        return list(dict.fromkeys(self.df["score"]))
+
+    def fit(self, score: str) -> List[FittedModel]:
+        """
+        Fit all the scaling models to the times of the score
+        :return: the fitted models, from the best to the worst AIC
+        """
+        if score not in self.fits:
+            df = self.df[self.df["score"] == score]
+            if len(df) == 0:
+                raise ValueError(f"No time for the score {score}")
+            n_nt, times = df["nt_length"].to_numpy(dtype=float), df["time"].to_numpy()
+            fits = [FittedModel(model, n_nt, times) for model in SCALING_MODELS]
+            self.fits[score] = sorted(fits, key=lambda fit: fit.aic)
+        return self.fits[score]
+
+    def get_best_model(self, score: str) -> FittedModel:
+        return self.fit(score)[0]
+
+    def predict_runtime(
+        self, score: str, n_nt: int, n_decoys: int = 1
+    ) -> Tuple[float, float, float]:
+        """
+        Predict the time to compute the score for decoys of the given length, with the best
+        scaling model
+        :param score: the name of the score, as in the time benchmark
+        :param n_nt: the length of the RNA
+        :param n_decoys: the number of decoys
+        :return: the predicted time (in seconds), and the bounds of its confidence interval
+        """
+        prediction, low, high = self.get_best_model(score).predict(n_nt, self.confidence)
+        return float(prediction[0] * n_decoys), float(low[0] * n_decoys), float(high[0] * n_decoys)
+
+    def predict_total_runtime(self, n_nt: int, n_decoys: int = 1) -> float:
+        """
+        Predict the time to compute all the scores for decoys of the given length.
+        The outputs of a same tool (with the same times, like RASP-ENERGY and RASP-NB-CONTACTS)
+        are counted once.
+        """
+        return sum(
+            max(self.predict_runtime(score, n_nt, n_decoys)[0], 0)
+            for score in self.get_unique_scores()
+        )
+
+    def get_unique_scores(self) -> List[str]:
+        """
+        Return the scores, without the ones with the same times as a previous score
+        """
+        times = self.df.groupby("score", sort=False)["time"].apply(tuple)
+        return times[~times.duplicated()].index.tolist()
+
+    def summarize(self) -> pd.DataFrame:
+        """
+        Return the best model of each score with its AIC and its parameters
+        """
+        rows = []
+        for score in self.scores:
+            fits = self.fit(score)
+            rows.append(
+                {
+                    "score": score,
+                    "model": fits[0].name,
+                    "aic": fits[0].aic,
+                    "delta_aic": fits[1].aic - fits[0].aic,
+                    "params": [float(f"{param:.4g}") for param in fits[0].params],
+                }
+            )
+        return pd.DataFrame(rows)
+
+    def flag_sla(
+        self, sla: float, n_nt: int, n_decoys: int = 1, scores: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Return the scores that could exceed the time budget for the given RNA
+        :param sla: the time budget, in seconds
+        :param n_nt: the length of the RNA
+        :param n_decoys: the number of decoys
+        :param scores: the scores to check (all the scores by default)
+        :return: the scores whose upper bound of the predicted time exceeds the budget, with
+            their prediction, sorted by decreasing prediction
+        """
+        rows = []
+        for score in self.scores if scores is None else scores:
+            prediction, low, high = self.predict_runtime(score, n_nt, n_decoys)
+            if high > sla:
+                rows.append(
+                    {
+                        "score": score,
+                        "model": self.get_best_model(score).name,
+                        "time": prediction,
+                        "time_low": low,
+                        "time_high": high,
+                        "exceeds": prediction > sla,
+                    }
+                )
+        df = pd.DataFrame(
+            rows, columns=["score", "model", "time", "time_low", "time_high", "exceeds"]
+        )
+        return df.sort_values(by="time", ascending=False, ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--benchmark_path", default=TIME_PATH)
+    parser.add_argument("--sla", type=float, default=None, help="Time budget, in seconds")
+    parser.add_argument("--n_nt", type=int, default=2850, help="RNA length to check")
+    parser.add_argument("--n_decoys", type=int, default=1, help="Number of decoys to check")
+    args = parser.parse_args()
+    complexity_analysis = ComplexityAnalysis(args.benchmark_path)
+    print(complexity_analysis.summarize().to_string(index=False))
+    if args.sla is not None:
+        print(
+            f"\nScores that could exceed {args.sla}s for {args.n_decoys} decoys of {args.n_nt} nt:"
+        )
+        print(complexity_analysis.flag_sla(args.sla, args.n_nt, args.n_decoys).to_string())
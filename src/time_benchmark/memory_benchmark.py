@@ -0,0 +1,127 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.scheduler.rnadvisor_command import WORKER_PATH, RNAdvisorCommand
+from src.time_benchmark.timing_harness import MEASURES, SCORES, TimingHarness
+
+
+class MemoryBenchmark(TimingHarness):
+    """
+    Measure the peak memory of each score for each decoy of the different lengths.
+    Each (score, decoy) is run once, in a new process, and its maximum resident set size is
+    saved in MB, with one CSV per length (decoys as rows, scores as columns).
+    When RNAdvisor is run in-process (without docker), the peak of the memory allocated by
+    Python is also measured with tracemalloc, in the `tracemalloc` folder.
+    """
+
+    def __init__(
+        self,
+        input_path: str,
+        output_path: str,
+        scores: Optional[List[str]] = None,
+        n_decoys: Optional[int] = None,
+        command: Optional[RNAdvisorCommand] = None,
+        main: Optional[str] = None,
+    ):
+        """
+        :param input_path: folder with a `decoys` folder of decoys for each length
+        :param output_path: folder where to save the peak memory, one CSV per length
+        :param scores: the scores to measure
+        :param n_decoys: maximum number of decoys measured for each length
+        :param command: the command to launch RNAdvisor (docker by default)
+        :param main: the main script of RNAdvisor, to run it in-process with tracemalloc.
+            If None, the command is used.
+        """
+        super().__init__(
+            input_path, output_path, scores, warmup=0, repeats=1, n_decoys=n_decoys, command=command
+        )
+        self.main = main
+        if main is not None:
+            self.measures = MEASURES + ["tracemalloc_peak"]
+
+    def run(self):
+        decoys_path = os.path.join(self.input_path, "decoys")
+        tmp_dir = os.path.join(self.input_path, "tmp_memory")
+        os.makedirs(self.output_path, exist_ok=True)
+        os.makedirs(tmp_dir, exist_ok=True)
+        for length_dir in sorted(os.listdir(decoys_path)):
+            df = self.run_length(os.path.join(decoys_path, length_dir), tmp_dir)
+            df = df[df["returncode"] == 0]
+            to_save = {self.output_path: "max_rss"}
+            if self.main is not None:
+                to_save[os.path.join(self.output_path, "tracemalloc")] = "tracemalloc_peak"
+            for output_path, measure in to_save.items():
+                os.makedirs(output_path, exist_ok=True)
+                df_memory = df.pivot(index="decoy", columns="score", values=measure)
+                # The resident set size is in KB and the tracemalloc peak in bytes
+                df_memory = df_memory / (1024 if measure == "max_rss" else 1024**2)
+                df_memory = df_memory.reindex(
+                    columns=[score for score in self.scores if score in df_memory.columns]
+                )
+                df_memory.to_csv(os.path.join(output_path, f"{length_dir}.csv"))
+        shutil.rmtree(tmp_dir)
+
+    def get_argv(self, native_path: str, pred_path: str, out_path: str, score: str) -> List[str]:
+        if self.main is None:
+            return super().get_argv(native_path, pred_path, out_path, score)
+        job = {
+            "native_path": native_path,
+            "pred_path": pred_path,
+            "result_path": out_path,
+            "all_scores": score,
+        }
+        response_path = os.path.join(os.path.dirname(out_path), "response.json")
+        return [
+            sys.executable,
+            WORKER_PATH,
+            f"--main={self.main}",
+            "--tracemalloc",
+            f"--job={json.dumps(job)}",
+            f"--response_path={response_path}",
+        ]
+
+    def run_once(self, argv: List[str], tmp_dir: str) -> Dict:
+        measure = super().run_once(argv, tmp_dir)
+        if self.main is None:
+            return measure
+        response_path = os.path.join(tmp_dir, "response.json")
+        response: Dict = {"status": "error", "tracemalloc_peak": np.nan}
+        if os.path.exists(response_path):
+            with open(response_path) as file:
+                response = json.load(file)
+            os.remove(response_path)
+        if response["status"] != "ok":
+            measure["returncode"] = measure["returncode"] or 1
+        measure["tracemalloc_peak"] = response["tracemalloc_peak"]
+        return measure
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input_path", default=os.path.join("docker_data", "input", "time"))
+    parser.add_argument("--output_path", default=os.path.join("docker_data", "output", "memory"))
+    parser.add_argument("--scores", nargs="+", default=SCORES)
+    parser.add_argument("--n_decoys", type=int, default=None, help="Decoys per length")
+    parser.add_argument("--image", default="rnadvisor", help="Docker image of RNAdvisor")
+    parser.add_argument(
+        "--executable", default=None, help="Local RNAdvisor command to use instead of docker"
+    )
+    parser.add_argument(
+        "--main", default=None, help="Main script of RNAdvisor, to run it with tracemalloc"
+    )
+    args = parser.parse_args()
+    memory_benchmark = MemoryBenchmark(
+        args.input_path,
+        args.output_path,
+        scores=args.scores,
+        n_decoys=args.n_decoys,
+        command=RNAdvisorCommand(args.image, args.executable),
+        main=args.main,
+    )
+    memory_benchmark.run()
@@ -0,0 +1,367 @@
+import argparse
+import os
+import shutil
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+import pandas as pd
+
+from src.scheduler.rnadvisor_command import RNAdvisorCommand
+
+SCORES = [
+    "RMSD",
+    "P-VALUE",
+    "INF",
+    "DI",
+    "MCQ",
+    "TM-SCORE",
+    "CAD",
+    "BARNABA",
+    "CLASH",
+    "GDT-TS",
+    "lDDT",
+    "QS-SCORE",
+    "DFIRE",
+    "rsRNASP",
+    "RASP",
+]
+CGROUP_ROOT = "/sys/fs/cgroup"
+# Parent cgroup of the measured containers: it keeps their CPU times once they are removed
+CGROUP_PARENT = "rnadvisor_harness.slice"
+MEASURES = ["wall", "user", "sys", "max_rss", "returncode"]
+
+
+class TimingHarness:
+    """
+    Measure the computation time of each score for each decoy, in isolated runs.
+    Each (score, decoy) is run a few times to warm up the caches, then measured several times
+    on a fixed set of CPUs. A run records the wall-clock time, the user and system CPU times
+    and the maximum resident set size of RNAdvisor.
+    With docker, the resource usage of the container is read from the cgroups (v2), as the
+    resource usage of the `docker` client does not include the container.
+    """
+
+    def __init__(
+        self,
+        input_path: str,
+        output_path: str,
+        scores: Optional[List[str]] = None,
+        warmup: int = 1,
+        repeats: int = 5,
+        cpus: Optional[Set[int]] = None,
+        n_decoys: Optional[int] = None,
+        command: Optional[RNAdvisorCommand] = None,
+    ):
+        """
+        :param input_path: folder with a `decoys` folder of decoys for each length
+        :param output_path: folder where to save the measures, one CSV per length
+        :param scores: the scores to measure
+        :param warmup: number of runs before the measures
+        :param repeats: number of measured runs
+        :param cpus: the CPUs where RNAdvisor runs. If None, all the CPUs are used.
+        :param n_decoys: maximum number of decoys measured for each length
+        :param command: the command to launch RNAdvisor (docker by default)
+        """
+        self.input_path = input_path
+        self.output_path = output_path
+        self.scores = SCORES if scores is None else scores
+        self.warmup = warmup
+        self.repeats = repeats
+        self.cpus = cpus
+        self.n_decoys = n_decoys
+        self.command = RNAdvisorCommand("rnadvisor") if command is None else command
+        self.measures = MEASURES
+
+    def run(self):
+        decoys_path = os.path.join(self.input_path, "decoys")
+        tmp_dir = os.path.join(self.input_path, "tmp_harness")
+        os.makedirs(self.output_path, exist_ok=True)
+        os.makedirs(tmp_dir, exist_ok=True)
+        summaries = []
+        for length_dir in sorted(os.listdir(decoys_path)):
+            df = self.run_length(os.path.join(decoys_path, length_dir), tmp_dir)
+            df.to_csv(os.path.join(self.output_path, f"{length_dir}.csv"), index=False)
+            summaries.append(self.summarize(df).assign(length=length_dir))
+        if summaries:
+            pd.concat(summaries, ignore_index=True).to_csv(
+                os.path.join(self.output_path, "summary.csv"), index=False
+            )
+        shutil.rmtree(tmp_dir)
+
+    def run_length(self, pred_dir: str, tmp_dir: str) -> pd.DataFrame:
+        """
+        Measure all the scores for the decoys of one length
+        :return: one row per measured run
+        """
+        decoys = sorted(os.listdir(pred_dir))
+        native_path = os.path.join(pred_dir, decoys[0])
+        decoys = decoys if self.n_decoys is None else decoys[: self.n_decoys]
+        measures: Dict = {key: [] for key in ["decoy", "score", "repeat"] + self.measures}
+        for decoy in decoys:
+            for score in self.scores:
+                argv = self.get_argv(
+                    native_path,
+                    os.path.join(pred_dir, decoy),
+                    os.path.join(tmp_dir, "out.csv"),
+                    score,
+                )
+                for i_run in range(self.warmup + self.repeats):
+                    measure = self.run_once(argv, tmp_dir)
+                    if i_run < self.warmup:
+                        continue
+                    measures["decoy"].append(decoy)
+                    measures["score"].append(score)
+                    measures["repeat"].append(i_run - self.warmup)
+                    for key in self.measures:
+                        measures[key].append(measure[key])
+        return pd.DataFrame(measures)
+
+    def get_argv(self, native_path: str, pred_path: str, out_path: str, score: str) -> List[str]:
+        argv = self.command.build(native_path, pred_path, out_path, all_scores=score)
+        if self.command.executable is not None:
+            return argv
+        # Docker: pin the container and keep its id to read its cgroup
+        options = ["--cidfile", "$CIDFILE", "--cgroup-parent", CGROUP_PARENT]
+        if self.cpus is not None:
+            options += ["--cpuset-cpus", ",".join(map(str, sorted(self.cpus)))]
+        return argv[:3] + options + argv[3:]
+
+    def run_once(self, argv: List[str], tmp_dir: str) -> Dict:
+        """
+        Run RNAdvisor once
+        :return: the wall-clock time and user/system CPU times (in seconds), the maximum
+            resident set size (in KB) and the return code
+        """
+        cid_path = os.path.join(tmp_dir, "container.cid")
+        if os.path.exists(cid_path):
+            os.remove(cid_path)
+        argv = [cid_path if arg == "$CIDFILE" else arg for arg in argv]
+        # The CPU times of the parent cgroup are read before the container starts
+        cgroup_monitor = CgroupMonitor(cid_path) if "--cidfile" in argv else None
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            argv,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            preexec_fn=self.pin_cpus if self.command.executable is not None else None,
+        )
+        monitor = ProcMonitor(process.pid) if cgroup_monitor is None else cgroup_monitor
+        monitor.start()
+        _, status, rusage = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        measure = {
+            "returncode": process.returncode,
+            "wall": wall,
+            "user": rusage.ru_utime,
+            "sys": rusage.ru_stime,
+            "max_rss": rusage.ru_maxrss,
+        }
+        measure.update(monitor.stop())
+        return measure
+
+    def pin_cpus(self):
+        if self.cpus is not None:
+            os.sched_setaffinity(0, self.cpus)
+
+    @staticmethod
+    def summarize(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Return the mean, standard deviation, median, minimum and maximum of each measure
+        for each score, over the successful runs
+        """
+        successful = df[df["returncode"] == 0]
+        summary = successful.groupby("score")[["wall", "user", "sys", "max_rss"]].agg(
+            ["mean", "std", "median", "min", "max", "count"]
+        )
+        summary.columns = [f"{measure}_{stat}" for measure, stat in summary.columns]
+        return summary.reset_index()
+
+
+class ProcMonitor:
+    """
+    Read the peak resident set size of a process and of its descendants in /proc while they
+    run: the largest sum of their resident set sizes (VmRSS) over the samples.
+    The maximum resident set size of `os.wait4` can not be used alone: it includes the memory
+    of this process, copied when the child is forked, and it is the peak of a single process.
+    """
+
+    def __init__(self, pid: int, interval: float = 0.01):
+        self.pid = pid
+        self.interval = interval
+        self.measure: Dict = {}
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.monitor, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self) -> Dict:
+        self.stopped.set()
+        self.thread.join()
+        return self.measure
+
+    def monitor(self):
+        while not self.stopped.is_set():
+            max_rss = sum(self.read_rss(pid) for pid in self.get_pids(self.pid))
+            if max_rss > self.measure.get("max_rss", 0):
+                self.measure["max_rss"] = max_rss
+            time.sleep(self.interval)
+
+    @staticmethod
+    def get_pids(pid: int) -> List[int]:
+        """
+        Return the process and its descendants
+        """
+        pids, children_path = [pid], f"/proc/{pid}/task/{pid}/children"
+        try:
+            with open(children_path) as file:
+                children = [int(child) for child in file.read().split()]
+        except OSError:
+            return pids
+        for child in children:
+            pids.extend(ProcMonitor.get_pids(child))
+        return pids
+
+    @staticmethod
+    def read_rss(pid: int) -> int:
+        """
+        Return the resident set size of the process, in KB (0 if it stopped)
+        """
+        try:
+            with open(f"/proc/{pid}/status") as file:
+                for line in file:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        return 0
+
+
+class CgroupMonitor(ProcMonitor):
+    """
+    Read the CPU times and the peak memory of a docker container in its cgroup (v2) while it
+    runs. The cgroup of the container is removed when it stops, before its last CPU times
+    can be read: the CPU times are then taken from the parent cgroup of the containers
+    (`--cgroup-parent`), read before the container starts and after it stops.
+    The peak memory is the last value of `memory.peak` read in the cgroup of the container.
+    """
+
+    def __init__(
+        self,
+        cid_path: str,
+        interval: float = 0.05,
+        parent_path: str = os.path.join(CGROUP_ROOT, CGROUP_PARENT),
+    ):
+        """
+        :param cid_path: the file where docker writes the id of the container
+        :param interval: time between two reads, in seconds
+        :param parent_path: the parent cgroup of the container
+        """
+        super().__init__(0, interval)
+        self.cid_path = cid_path
+        self.parent_path = parent_path
+        # The parent is created with the first container
+        self.start_cpu = self.read_cpu(parent_path) or {"user": 0.0, "sys": 0.0}
+
+    def stop(self) -> Dict:
+        super().stop()
+        end_cpu = self.read_cpu(self.parent_path)
+        if end_cpu is not None:
+            self.measure.update({key: end_cpu[key] - self.start_cpu[key] for key in end_cpu})
+        return self.measure
+
+    def get_cgroup_path(self) -> Optional[str]:
+        if not os.path.exists(self.cid_path):
+            return None
+        with open(self.cid_path) as file:
+            container_id = file.read().strip()
+        for cgroup_path in [
+            # With the systemd and the cgroupfs drivers of docker
+            os.path.join(self.parent_path, f"docker-{container_id}.scope"),
+            os.path.join(self.parent_path, container_id),
+        ]:
+            if os.path.isdir(cgroup_path):
+                return cgroup_path
+        return None
+
+    def monitor(self):
+        cgroup_path = None
+        while not self.stopped.is_set():
+            cgroup_path = cgroup_path or self.get_cgroup_path()
+            if cgroup_path is not None:
+                try:
+                    self.measure.update(self.read(cgroup_path))
+                except OSError:
+                    # The container stopped
+                    return
+            time.sleep(self.interval)
+
+    @staticmethod
+    def read_cpu(cgroup_path: str) -> Optional[Dict]:
+        """
+        Return the user and system CPU times of the cgroup and of its descendants, in seconds
+        (None if it does not exist)
+        """
+        try:
+            with open(os.path.join(cgroup_path, "cpu.stat")) as file:
+                cpu_stat = dict(line.split() for line in file)
+        except OSError:
+            return None
+        return {
+            "user": int(cpu_stat["user_usec"]) / 1e6,
+            "sys": int(cpu_stat["system_usec"]) / 1e6,
+        }
+
+    @staticmethod
+    def read(cgroup_path: str) -> Dict:
+        measure = CgroupMonitor.read_cpu(cgroup_path)
+        if measure is None:
+            raise FileNotFoundError(cgroup_path)
+        peak_path = os.path.join(cgroup_path, "memory.peak")
+        if os.path.exists(peak_path):
+            with open(peak_path) as file:
+                measure["max_rss"] = int(file.read()) // 1024
+        return measure
+
+
+def parse_cpus(cpus: str) -> Set[int]:
+    """
+    Parse a list of CPUs like `0-3,6`
+    """
+    parsed = set()
+    for part in cpus.split(","):
+        start, _, end = part.partition("-")
+        parsed.update(range(int(start), int(end or start) + 1))
+    return parsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input_path", default=os.path.join("docker_data", "input", "time"))
+    parser.add_argument(
+        "--output_path", default=os.path.join("docker_data", "output", "time_harness")
+    )
+    parser.add_argument("--scores", nargs="+", default=SCORES)
+    parser.add_argument("--warmup", type=int, default=1, help="Runs before the measures")
+    parser.add_argument("--repeats", type=int, default=5, help="Measured runs")
+    parser.add_argument("--cpus", default=None, help="CPUs where to run, like 0-3,6")
+    parser.add_argument("--n_decoys", type=int, default=None, help="Decoys per length")
+    parser.add_argument("--image", default="rnadvisor", help="Docker image of RNAdvisor")
+    parser.add_argument(
+        "--executable", default=None, help="Local RNAdvisor command to use instead of docker"
+    )
+    args = parser.parse_args()
+    timing_harness = TimingHarness(
+        args.input_path,
+        args.output_path,
+        scores=args.scores,
+        warmup=args.warmup,
+        repeats=args.repeats,
+        cpus=parse_cpus(args.cpus) if args.cpus is not None else None,
+        n_decoys=args.n_decoys,
+        command=RNAdvisorCommand(args.image, args.executable),
+    )
+    timing_harness.run()
@@ -1,3 +1,4 @@
+import argparse
 import os
 from typing import Dict, List, Optional
 
@@ -5,6 +6,8 @@ import pandas as pd
 import plotly.express as px
 import plotly.io as pio
 
+from src.utils.csv_cache import CsvCache
+
 LIST_ENERGIES = ["RASP-ENERGY", "BARNABA-eSCORE", "DFIRE", "rsRNASP"]
 LIST_METRICS = [
     "RMSD",
@@ -17,6 +20,9 @@ LIST_METRICS = [
     "BARNABA-eRMSD",
     "lDDT",
 ]
+# Scores of the memory benchmark, as given to RNAdvisor
+MEMORY_ENERGIES = ["RASP", "BARNABA", "DFIRE", "rsRNASP"]
+MEMORY_METRICS = ["RMSD", "INF", "DI", "MCQ", "TM-SCORE", "GDT-TS", "CAD", "lDDT"]
 
 COLORS_ENERGIES = {
     "RASP": "#6499E9",
@@ -27,20 +33,37 @@ COLORS_ENERGIES = {
 
 
 class Vizualisation:
-    def __init__(self, benchmark_path: str):
+    def __init__(
+        self,
+        benchmark_path: str,
+        name: str = "time",
+        y_title: str = "Time (s)",
+        list_energies: Optional[List[str]] = None,
+        list_metrics: Optional[List[str]] = None,
+    ):
+        """
+        :param benchmark_path: folder with one CSV per RNA length
+        :param name: name of the benchmark, used for the folder and names of the plots
+        :param y_title: title of the y axis
+        :param list_energies: the energies to plot
+        :param list_metrics: the metrics to plot
+        """
         self.benchmark_path = benchmark_path
+        self.name = name
+        self.y_title = y_title
+        self.list_energies = LIST_ENERGIES if list_energies is None else list_energies
+        self.list_metrics = LIST_METRICS if list_metrics is None else list_metrics
         self.dfs = {
-            name.replace("decoy_", "").replace(".csv", ""): pd.read_csv(
-                os.path.join(benchmark_path, name), index_col=[0]
-            )
-            for name in [x for x in os.listdir(benchmark_path) if not x.endswith("50.csv")]
+            name.replace("decoy_", ""): df
+            for name, df in CsvCache().read_csv_folder(benchmark_path).items()
+            if not name.endswith("50")
         }
 
     def plot_energies(self):
-        self.plot(LIST_ENERGIES)
+        self.plot(self.list_energies)
 
     def plot_metrics(self):
-        self.plot(LIST_METRICS)
+        self.plot(self.list_metrics)
 
     def convert_df_to_plot(self, list_scores: List[str]):
         new_df: Dict = {"method": [], "time": [], "nt_length": [], "time_std": []}
@@ -57,10 +80,11 @@ class Vizualisation:
         return df
 
     def plot_all(self):
+        save_dir = os.path.join("docker_data", "plots", self.name)
         self.plot(
-            LIST_ENERGIES, save_path=os.path.join("docker_data", "plots", "time", "time_energies.png")
+            self.list_energies, save_path=os.path.join(save_dir, f"{self.name}_energies.png")
         )
-        self.plot(LIST_METRICS, save_path=os.path.join("docker_data", "plots", "time", "time_metrics.png"))
+        self.plot(self.list_metrics, save_path=os.path.join(save_dir, f"{self.name}_metrics.png"))
 
     def _change_names(self, df: pd.DataFrame):
         dict_to_change = {
@@ -111,7 +135,7 @@ class Vizualisation:
         param_marker = dict(opacity=1, line=dict(width=0.5, color="DarkSlateGrey"), size=6)
         fig.update_traces(marker=param_marker, selector=dict(mode="markers"))
         fig.update_xaxes(title_text="RNA length (nt)")
-        fig.update_yaxes(title_text="Time (s)")
+        fig.update_yaxes(title_text=self.y_title)
         fig.update_layout(
             font=dict(
                 family="Computer Modern",
@@ -136,5 +160,17 @@ class Vizualisation:
 
 
 if __name__ == "__main__":
-    viz = Vizualisation(os.path.join("docker_data", "output", "time"))
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--benchmark", choices=["time", "memory"], default="time")
+    args = parser.parse_args()
+    if args.benchmark == "memory":
+        viz = Vizualisation(
+            os.path.join("docker_data", "output", "memory"),
+            name="memory",
+            y_title="Peak memory (MB)",
+            list_energies=MEMORY_ENERGIES,
+            list_metrics=MEMORY_METRICS,
+        )
+    else:
+        viz = Vizualisation(os.path.join("docker_data", "output", "time"))
     viz.plot_all()
@@ -0,0 +1,183 @@
+import argparse
+import datetime
+import os
+import socket
+import sqlite3
+import uuid
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+HISTORY_PATH = os.path.join("docker_data", "history", "benchmarks.sqlite")
+
+
+class BenchmarkHistory:
+    """
+    Append-only log of the results of the benchmarks (time, carbon), for each version of
+    RNAdvisor (the digest of the docker image), host and date.
+    The measures of two versions can be compared to find the slowdowns.
+    """
+
+    def __init__(self, db_path: str = HISTORY_PATH):
+        """
+        :param db_path: path to the SQLite database
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS measures ("
+            "run_id TEXT NOT NULL, benchmark TEXT NOT NULL, version TEXT NOT NULL, "
+            "host TEXT NOT NULL, date TEXT NOT NULL, grp TEXT NOT NULL, name TEXT NOT NULL, "
+            "score TEXT NOT NULL, value REAL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS measures_version ON measures (benchmark, version)"
+        )
+        self.connection.commit()
+
+    def record(
+        self,
+        benchmark: str,
+        version: str,
+        group: str,
+        df: pd.DataFrame,
+        run_id: Optional[str] = None,
+    ) -> str:
+        """
+        Add the results of a benchmark
+        :param benchmark: name of the benchmark (like `time` or `carbon`)
+        :param version: version of RNAdvisor
+        :param group: the group of the results (like the RNA length or the dataset)
+        :param df: the results, with one row per structure (as index) and one column per score
+        :param run_id: the run of the benchmark. If None, a new run is created.
+        :return: the run id
+        """
+        run_id = uuid.uuid4().hex if run_id is None else run_id
+        host, date = socket.gethostname(), datetime.datetime.now().isoformat(timespec="seconds")
+        df_long = df.rename_axis("name").reset_index().melt(id_vars="name", var_name="score")
+        df_long = df_long[pd.to_numeric(df_long["value"], errors="coerce").notna()]
+        self.connection.executemany(
+            "INSERT INTO measures VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (run_id, benchmark, version, host, date, group, str(name), str(score), float(value))
+                for name, score, value in df_long[["name", "score", "value"]].itertuples(
+                    index=False
+                )
+            ],
+        )
+        self.connection.commit()
+        return run_id
+
+    def get_versions(self, benchmark: str) -> pd.DataFrame:
+        """
+        Return the versions of the benchmark, with their hosts and dates, from the oldest
+        """
+        return pd.read_sql_query(
+            "SELECT version, host, MIN(date) AS first_date, MAX(date) AS last_date, "
+            "COUNT(DISTINCT run_id) AS n_runs FROM measures WHERE benchmark = ? "
+            "GROUP BY version, host ORDER BY MAX(rowid)",
+            self.connection,
+            params=(benchmark,),
+        )
+
+    def get_measures(
+        self, benchmark: str, version: str, host: Optional[str] = None
+    ) -> pd.DataFrame:
+        query = "SELECT * FROM measures WHERE benchmark = ? AND version = ?"
+        params: List = [benchmark, version]
+        if host is not None:
+            query += " AND host = ?"
+            params.append(host)
+        return pd.read_sql_query(query, self.connection, params=params)
+
+    def compare(
+        self,
+        benchmark: str,
+        baseline: str,
+        version: str,
+        alpha: float = 0.05,
+        min_ratio: float = 1.1,
+        host: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """
+        Compare the measures of two versions for each group and score, with a one-sided
+        Welch t-test (the new version is slower).
+        :param benchmark: name of the benchmark
+        :param baseline: the reference version
+        :param version: the new version
+        :param alpha: the significance level
+        :param min_ratio: the minimum ratio between the means to report a slowdown
+        :param host: only compare the measures of this host
+        :return: the comparison of each (group, score), with the slowdowns first
+        """
+        df_baseline = self.get_measures(benchmark, baseline, host)
+        df_version = self.get_measures(benchmark, version, host)
+        rows = []
+        for (group, score), new in df_version.groupby(["grp", "score"]):
+            old = df_baseline[(df_baseline["grp"] == group) & (df_baseline["score"] == score)]
+            if len(old) == 0:
+                continue
+            old_values, new_values = old["value"].to_numpy(), new["value"].to_numpy()
+            if len(old_values) > 1 and len(new_values) > 1:
+                p_value = stats.ttest_ind(
+                    new_values, old_values, equal_var=False, alternative="greater"
+                ).pvalue
+            else:
+                p_value = np.nan
+            ratio = new_values.mean() / old_values.mean() if old_values.mean() else np.nan
+            rows.append(
+                {
+                    "group": group,
+                    "score": score,
+                    "baseline_mean": old_values.mean(),
+                    "mean": new_values.mean(),
+                    "ratio": ratio,
+                    "p_value": p_value,
+                    "slowdown": bool(p_value < alpha and ratio >= min_ratio),
+                }
+            )
+        df = pd.DataFrame(
+            rows,
+            columns=["group", "score", "baseline_mean", "mean", "ratio", "p_value", "slowdown"],
+        )
+        return df.sort_values(by=["slowdown", "ratio"], ascending=[False, False], ignore_index=True)
+
+    def close(self):
+        self.connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--benchmark",
+        default="time",
+        choices=["time", "carbon", "carbon_single", "carbon_model", "carbon_rapl"],
+    )
+    parser.add_argument("--db_path", default=HISTORY_PATH)
+    parser.add_argument(
+        "--baseline", default=None, help="Reference version (the previous version by default)"
+    )
+    parser.add_argument("--version", default=None, help="New version (the last by default)")
+    parser.add_argument("--host", default=None, help="Only compare the measures of this host")
+    parser.add_argument("--alpha", type=float, default=0.05, help="Significance level")
+    parser.add_argument("--min_ratio", type=float, default=1.1, help="Minimum slowdown ratio")
+    args = parser.parse_args()
+    history = BenchmarkHistory(args.db_path)
+    versions = list(dict.fromkeys(history.get_versions(args.benchmark)["version"][::-1]))
+    if len(versions) < 2 and (args.baseline is None or args.version is None):
+        print(f"Less than two versions in the history of the {args.benchmark} benchmark")
+    else:
+        version = versions[0] if args.version is None else args.version
+        baseline = args.baseline
+        if baseline is None:
+            baseline = [previous for previous in versions if previous != version][0]
+        df = history.compare(
+            args.benchmark, baseline, version, args.alpha, args.min_ratio, args.host
+        )
+        print(f"{version} compared to {baseline}")
+        print(df.to_string(index=False))
+        n_slowdowns = int(df["slowdown"].sum())
+        print(f"{n_slowdowns} significant slowdown(s)")
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover
+    pa = None
+
+CACHE_DIR = os.path.join("docker_data", "cache")
+RNA_COLUMN, NAME_COLUMN = "__rna__", "__name__"
+
+
+class CsvCache:
+    """
+    Columnar cache of the CSV files of a folder (like `docker_data/output/<dataset>`).
+    All the CSV files of the folder are stored in one Arrow IPC file, memory-mapped when read.
+    Only the CSV files whose modification time and content changed are parsed again.
+    If pyarrow is not installed, the CSV files are read directly.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def read_csv_folder(
+        self, csv_folder: str, rename: Optional[Dict] = None
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Read all the CSV files of the folder.
+        :param csv_folder: folder with the CSV files
+        :param rename: columns to rename in each dataframe
+        :return: a dictionary with the name of the file (without .csv) and its dataframe
+        """
+        csv_names = [name for name in os.listdir(csv_folder) if name.endswith(".csv")]
+        if pa is None:
+            dfs = {name: self.read_csv(os.path.join(csv_folder, name)) for name in csv_names}
+        else:
+            dfs = self._read_from_cache(csv_folder, csv_names)
+        return {
+            name.replace(".csv", ""): df.rename(columns=rename) if rename else df
+            for name, df in dfs.items()
+        }
+
+    def read_csv(self, csv_path: str) -> pd.DataFrame:
+        return pd.read_csv(csv_path, index_col=[0])
+
+    def get_cache_paths(self, csv_folder: str):
+        """
+        Return the paths of the Arrow file and its manifest for the given folder
+        """
+        folder = os.path.abspath(csv_folder)
+        key = hashlib.sha1(folder.encode()).hexdigest()[:12]
+        prefix = os.path.join(self.cache_dir, f"{os.path.basename(folder)}_{key}")
+        return f"{prefix}.arrow", f"{prefix}.json"
+
+    def _read_from_cache(self, csv_folder: str, csv_names: List[str]) -> Dict[str, pd.DataFrame]:
+        """
+        Read the dataframes from the cache, and update the cache with the changed files
+        """
+        arrow_path, manifest_path = self.get_cache_paths(csv_folder)
+        manifest = self._read_manifest(arrow_path, manifest_path)
+        new_manifest, to_parse = {}, []
+        for name in csv_names:
+            csv_path = os.path.join(csv_folder, name)
+            stat = os.stat(csv_path)
+            entry = manifest.get(name)
+            if entry is not None and (entry["mtime_ns"], entry["size"]) != (
+                stat.st_mtime_ns,
+                stat.st_size,
+            ):
+                # Only the modification time changed: keep the cached values
+                entry = entry if entry["sha256"] == get_file_hash(csv_path) else None
+            if entry is None:
+                to_parse.append(name)
+                entry = {"sha256": get_file_hash(csv_path)}
+            new_manifest[name] = {**entry, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+        cached = [name for name in csv_names if name not in to_parse]
+        dfs = self._read_arrow(arrow_path, {name: manifest[name] for name in cached})
+        dfs.update({name: self.read_csv(os.path.join(csv_folder, name)) for name in to_parse})
+        if new_manifest != manifest:
+            self._write_cache(dfs, new_manifest, arrow_path, manifest_path)
+        return {name: dfs[name] for name in csv_names}
+
+    def _read_manifest(self, arrow_path: str, manifest_path: str) -> Dict:
+        if not (os.path.exists(arrow_path) and os.path.exists(manifest_path)):
+            return {}
+        with open(manifest_path) as file:
+            return json.load(file)
+
+    def _read_arrow(self, arrow_path: str, manifest: Dict) -> Dict[str, pd.DataFrame]:
+        """
+        Read the given files from the memory-mapped Arrow file
+        """
+        if len(manifest) == 0:
+            return {}
+        table = pa.ipc.open_file(pa.memory_map(arrow_path)).read_all()
+        df_all = table.to_pandas()
+        dfs = {}
+        for name, entry in manifest.items():
+            df = df_all.iloc[entry["start"] : entry["stop"]].set_index(NAME_COLUMN)  # noqa: E203
+            df = df[entry["columns"]]
+            df.index.name = entry["index_name"]
+            dtypes = df.dtypes.astype(str).to_dict()
+            to_cast = {
+                column: dtype
+                for column, dtype in entry["dtypes"].items()
+                if dtypes[column] != dtype
+            }
+            dfs[name] = df.astype(to_cast) if to_cast else df
+        return dfs
+
+    def _write_cache(
+        self, dfs: Dict[str, pd.DataFrame], manifest: Dict, arrow_path: str, manifest_path: str
+    ):
+        """
+        Write all the dataframes one after the other in the Arrow file
+        """
+        start = 0
+        for name, df in dfs.items():
+            manifest[name].update(
+                {
+                    "columns": [str(column) for column in df.columns],
+                    "dtypes": {str(column): str(dtype) for column, dtype in df.dtypes.items()},
+                    "index_name": df.index.name,
+                    "start": start,
+                    "stop": start + len(df),
+                }
+            )
+            start += len(df)
+        df_all = pd.concat(
+            [
+                df.rename_axis(NAME_COLUMN).reset_index().assign(**{RNA_COLUMN: name})
+                for name, df in dfs.items()
+            ],
+            axis=0,
+            ignore_index=True,
+        )
+        try:
+            table = pa.Table.from_pandas(df_all, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Columns with mixed types can not be stored: keep reading the CSV files
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with pa.OSFile(f"{arrow_path}.tmp", "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        with open(f"{manifest_path}.tmp", "w") as file:
+            json.dump(manifest, file)
+        os.replace(f"{arrow_path}.tmp", arrow_path)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+
+
+def get_file_hash(path: str) -> str:
+    """
+    Return the SHA-256 of the content of the file
+    """
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
@@ -0,0 +1,321 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import tarfile
+import urllib.request
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+from src.utils.csv_cache import get_file_hash
+from src.utils.rna_puzzles_prepare import RNAPuzzlesPrepare
+
+INPUT_DIR = os.path.join("docker_data", "input")
+ARCHIVE_DIR = os.path.join("docker_data", "archives")
+MANIFEST_NAME = "install_manifest.json"
+MODES = ["hardlink", "copy"]
+
+
+class DatasetSource(NamedTuple):
+    """Raw archive of a dataset, with the way to reorganise it into NATIVE and PREDS"""
+
+    url: str
+    # Name of the archive in the archive folder
+    archive_name: str
+    # Return the (source, destination) of each file, from the extracted archive
+    layout: Callable[[str], List[Tuple[str, str]]]
+
+
+def find_dir(root: str, predicate: Callable[[str, List[str]], bool]) -> str:
+    """
+    Return the first folder (top-down) that matches the predicate on its path and subfolders
+    """
+    for dir_path, dir_names, _ in os.walk(root):
+        dir_names.sort()
+        if predicate(dir_path, dir_names):
+            return dir_path
+    raise FileNotFoundError(f"No dataset found in {root}")
+
+
+def list_pdbs(dir_path: str) -> List[str]:
+    return sorted(name for name in os.listdir(dir_path) if name.endswith(".pdb"))
+
+
+def layout_modeller(root: str) -> List[Tuple[str, str]]:
+    """
+    Test Set I: `decoys/<rna>/` with the native `<rna>.pdb` and the decoys
+    """
+    decoys = find_dir(root, lambda path, _: os.path.basename(path) == "decoys")
+    files = []
+    for rna in sorted(os.listdir(decoys)):
+        rna_dir = os.path.join(decoys, rna)
+        files.append((os.path.join(rna_dir, f"{rna}.pdb"), os.path.join("NATIVE", f"{rna}.pdb")))
+        files.extend(
+            (os.path.join(rna_dir, pdb), os.path.join("PREDS", rna, pdb))
+            for pdb in list_pdbs(rna_dir)
+        )
+    return files
+
+
+def layout_rsrnasp(root: str) -> List[Tuple[str, str]]:
+    """
+    Test Set II: `PM_decoy_set/<rna>/` with the native `<rna>.pdb` and the decoys
+    """
+    decoy_set = find_dir(root, lambda path, _: os.path.basename(path) == "PM_decoy_set")
+    files = []
+    for rna in sorted(os.listdir(decoy_set)):
+        rna_dir = os.path.join(decoy_set, rna)
+        if not os.path.isdir(rna_dir) or "DI" in rna or "RMSD" in rna:
+            continue
+        files.append((os.path.join(rna_dir, f"{rna}.pdb"), os.path.join("NATIVE", f"{rna}.pdb")))
+        files.extend(
+            (os.path.join(rna_dir, pdb), os.path.join("PREDS", rna, pdb))
+            for pdb in list_pdbs(rna_dir)
+        )
+    return files
+
+
+def layout_rna_puzzles(root: str) -> List[Tuple[str, str]]:
+    """
+    Test Set III: `rpXX/` with the solution (renamed `rpXX.pdb`) and the predictions
+    """
+    dataset = find_dir(root, lambda _, dir_names: any("rp" in name for name in dir_names))
+    files = []
+    for rp in sorted(os.listdir(dataset)):
+        rp_dir = os.path.join(dataset, rp)
+        if not os.path.isdir(rp_dir) or "rp" not in rp or rp == "rp16_TBA":
+            continue
+        pdbs = list_pdbs(rp_dir)
+        natives = [pdb for pdb in pdbs if re.search("solution|soluton", pdb)]
+        if not natives:
+            continue
+        files.append((os.path.join(rp_dir, natives[0]), os.path.join("NATIVE", f"{rp}.pdb")))
+        for pdb in pdbs:
+            name = f"{rp}.pdb" if pdb == natives[0] else pdb
+            files.append((os.path.join(rp_dir, pdb), os.path.join("PREDS", rp, name)))
+    return files
+
+
+DATASETS = {
+    "TestSetI": DatasetSource(
+        "http://melolab.org/supmat/RNApot/Sup._Data_files/randstr.tar.gz",
+        "randstr.tar.gz",
+        layout_modeller,
+    ),
+    "TestSetII": DatasetSource(
+        "https://github.com/Tan-group/rsRNASP/archive/HEAD.tar.gz",
+        "rsRNASP.tar.gz",
+        layout_rsrnasp,
+    ),
+    "TestSetIII": DatasetSource(
+        "https://github.com/RNA-Puzzles/standardized_dataset/archive/HEAD.tar.gz",
+        "standardized_dataset.tar.gz",
+        layout_rna_puzzles,
+    ),
+}
+
+
+class DatasetInstaller:
+    """
+    Install the datasets from their raw archives, in `NATIVE` and `PREDS` folders.
+    The files are hard linked (or copied) in parallel, and listed with their checksums in
+    a manifest: a new run only updates the files that changed, and does nothing if the
+    archive did not change.
+    The archives are downloaded in the archive folder if they are not already there.
+    """
+
+    def __init__(
+        self,
+        input_dir: str = INPUT_DIR,
+        archive_dir: str = ARCHIVE_DIR,
+        mode: str = "hardlink",
+        offline: bool = False,
+        n_jobs: int = 8,
+    ):
+        """
+        :param input_dir: folder where to install the datasets
+        :param archive_dir: folder with the raw archives (downloaded if missing), and where
+            they are extracted
+        :param mode: `hardlink` to link the files of the extracted archives (copied if not
+            possible), or `copy`
+        :param offline: whether to fail instead of downloading a missing archive
+        :param n_jobs: number of threads to hash and place the files
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode {mode}, should be one of {MODES}")
+        self.input_dir = input_dir
+        self.archive_dir = archive_dir
+        self.mode = mode
+        self.offline = offline
+        self.n_jobs = n_jobs
+
+    def run(self, datasets: List[str]):
+        for dataset in datasets:
+            n_files = self.install(dataset)
+            print(f"{dataset}: {n_files} file(s) updated")
+
+    def install(self, dataset: str) -> int:
+        """
+        Install the dataset, if its archive changed since the last installation
+        :return: the number of files updated
+        """
+        source = DATASETS[dataset]
+        dataset_dir = os.path.join(self.input_dir, dataset)
+        archive_path = self.get_archive(source)
+        archive_key = self.get_key(archive_path)
+        manifest = self.read_manifest(dataset_dir)
+        if manifest.get("archive") == archive_key and self.is_installed(dataset_dir, manifest):
+            n_files = 0
+        else:
+            root = self.extract(archive_path, archive_key, os.path.join(self.archive_dir, dataset))
+            n_files = self.place_files(dataset_dir, source.layout(root), manifest, archive_key)
+        if dataset == "TestSetIII":
+            self.prepare_rna_puzzles(dataset_dir, force=n_files > 0)
+        return n_files
+
+    def get_archive(self, source: DatasetSource) -> str:
+        archive_path = os.path.join(self.archive_dir, source.archive_name)
+        if os.path.exists(archive_path):
+            return archive_path
+        if self.offline:
+            raise FileNotFoundError(f"Missing archive {archive_path} (offline installation)")
+        os.makedirs(self.archive_dir, exist_ok=True)
+        tmp_path = f"{archive_path}.part"
+        urllib.request.urlretrieve(source.url, tmp_path)
+        os.replace(tmp_path, archive_path)
+        return archive_path
+
+    @staticmethod
+    def get_key(path: str) -> Dict:
+        stat = os.stat(path)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    @staticmethod
+    def read_manifest(dataset_dir: str) -> Dict:
+        manifest_path = os.path.join(dataset_dir, MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            return {}
+        with open(manifest_path) as file:
+            return json.load(file)
+
+    @staticmethod
+    def is_installed(dataset_dir: str, manifest: Dict) -> bool:
+        """
+        Return whether all the files of the manifest are installed, with the same size
+        """
+        for path, entry in manifest.get("files", {}).items():
+            full_path = os.path.join(dataset_dir, path)
+            if not os.path.exists(full_path) or os.path.getsize(full_path) != entry["size"]:
+                return False
+        return True
+
+    @staticmethod
+    def extract(archive_path: str, archive_key: Dict, extract_dir: str) -> str:
+        """
+        Extract the archive, if it changed since the last extraction
+        :return: the folder of the extracted archive
+        """
+        marker_path = os.path.join(extract_dir, ".extracted")
+        if os.path.exists(marker_path):
+            with open(marker_path) as file:
+                if json.load(file) == archive_key:
+                    return extract_dir
+        shutil.rmtree(extract_dir, ignore_errors=True)
+        os.makedirs(extract_dir)
+        if zipfile.is_zipfile(archive_path):
+            with zipfile.ZipFile(archive_path) as archive:
+                archive.extractall(extract_dir)
+        else:
+            with tarfile.open(archive_path) as archive:
+                if hasattr(tarfile, "data_filter"):
+                    archive.extractall(extract_dir, filter="data")
+                else:
+                    archive.extractall(extract_dir)
+        with open(marker_path, "w") as file:
+            json.dump(archive_key, file)
+        return extract_dir
+
+    def place_files(
+        self, dataset_dir: str, files: List[Tuple[str, str]], manifest: Dict, archive_key: Dict
+    ) -> int:
+        """
+        Place the files of the layout in the dataset folder, and write the manifest
+        :param files: the (source, destination) of each file
+        :param manifest: the manifest of the last installation
+        :return: the number of files placed
+        """
+        old_files = manifest.get("files", {})
+        with ThreadPoolExecutor(max_workers=self.n_jobs) as executor:
+            hashes = list(executor.map(get_file_hash, [src for src, _ in files]))
+            to_place = [
+                (src, os.path.join(dataset_dir, dst))
+                for (src, dst), sha256 in zip(files, hashes)
+                if not self.is_placed(dataset_dir, dst, sha256, old_files)
+            ]
+            list(executor.map(lambda args: self.place(*args), to_place))
+        new_files = {
+            dst: {"source": src, "size": os.path.getsize(src), "sha256": sha256}
+            for (src, dst), sha256 in zip(files, hashes)
+        }
+        for path in set(old_files) - set(new_files):
+            if os.path.exists(os.path.join(dataset_dir, path)):
+                os.remove(os.path.join(dataset_dir, path))
+        os.makedirs(dataset_dir, exist_ok=True)
+        manifest_path = os.path.join(dataset_dir, MANIFEST_NAME)
+        with open(f"{manifest_path}.tmp", "w") as file:
+            json.dump({"archive": archive_key, "files": new_files}, file, indent=1)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+        return len(to_place)
+
+    @staticmethod
+    def is_placed(dataset_dir: str, path: str, sha256: str, old_files: Dict) -> bool:
+        full_path = os.path.join(dataset_dir, path)
+        return (
+            path in old_files
+            and old_files[path]["sha256"] == sha256
+            and os.path.exists(full_path)
+            and os.path.getsize(full_path) == old_files[path]["size"]
+        )
+
+    def place(self, src: str, dst: str):
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        if os.path.lexists(dst):
+            os.remove(dst)
+        if self.mode == "hardlink":
+            try:
+                os.link(src, dst)
+                return
+            except OSError:
+                # Other file system
+                pass
+        shutil.copy2(src, dst)
+
+    def prepare_rna_puzzles(self, dataset_dir: str, force: bool):
+        """
+        Clean the RNA Puzzles predictions, if the files changed or were never cleaned
+        """
+        clean_dir = f"{os.path.normpath(dataset_dir)}_clean"
+        if not force and os.path.isdir(os.path.join(dataset_dir, os.path.basename(clean_dir))):
+            return
+        RNAPuzzlesPrepare(dataset_dir, clean_dir, n_jobs=self.n_jobs).run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--datasets", nargs="+", default=list(DATASETS), choices=list(DATASETS))
+    parser.add_argument("--input_dir", default=INPUT_DIR)
+    parser.add_argument(
+        "--archive_dir", default=ARCHIVE_DIR, help="Folder with the (pre-downloaded) archives"
+    )
+    parser.add_argument("--mode", default="hardlink", choices=MODES)
+    parser.add_argument(
+        "--offline", action="store_true", help="Fail instead of downloading a missing archive"
+    )
+    parser.add_argument("--n_jobs", type=int, default=8, help="Number of threads")
+    args = parser.parse_args()
+    dataset_installer = DatasetInstaller(
+        args.input_dir, args.archive_dir, args.mode, args.offline, args.n_jobs
+    )
+    dataset_installer.run(args.datasets)
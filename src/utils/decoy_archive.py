@@ -0,0 +1,229 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+INPUT_DIR = os.path.join("docker_data", "input")
+ARCHIVE_DIR_NAME = "ARCHIVE"
+COORD_RECORDS = (b"ATOM  ", b"HETATM")
+
+
+def split_pdb(content: bytes) -> Tuple[bytes, np.ndarray]:
+    """
+    Split a PDB file into its topology (the lines without the coordinates) and its coordinates
+    :return: the topology, and the coordinates of each atom
+    """
+    template, coords = [], []
+    for line in content.splitlines(keepends=True):
+        if line[:6] in COORD_RECORDS:
+            if len(line) < 54:
+                raise ValueError(f"Atom without coordinates: {line!r}")
+            template.append(line[:30] + line[54:])
+            coords.append((float(line[30:38]), float(line[38:46]), float(line[46:54])))
+        else:
+            template.append(line)
+    return b"".join(template), np.array(coords, dtype=np.float32).reshape(-1, 3)
+
+
+def get_format(template: bytes) -> bytes:
+    """
+    Return the topology as a format string, with the place of the coordinates of each atom
+    """
+    lines = []
+    for line in template.splitlines(keepends=True):
+        line = line.replace(b"%", b"%%")
+        if line[:6] in COORD_RECORDS:
+            line = line[:30] + b"%8.3f%8.3f%8.3f" + line[30:]
+        lines.append(line)
+    return b"".join(lines)
+
+
+def render_pdb(template_format: bytes, coords: np.ndarray) -> bytes:
+    """
+    Write the coordinates back into the topology (formatted by `get_format`)
+    """
+    return template_format % tuple(coords.ravel().tolist())
+
+
+def pack_coords(coords: np.ndarray) -> np.ndarray:
+    """
+    Store the float32 coordinates byte plane by byte plane, which compresses much better
+    (the exponents and high bytes of the coordinates are close)
+    """
+    return np.ascontiguousarray(coords.astype("<f4").view(np.uint8).reshape(-1, 4).T)
+
+
+def unpack_coords(planes: np.ndarray) -> np.ndarray:
+    return np.ascontiguousarray(planes.T).view("<f4").reshape(-1, 3)
+
+
+class DecoyArchive:
+    """
+    Decoys of one RNA in a compressed numpy archive (`.npz`).
+    The coordinates of all the decoys are stored as float32, and the topologies (the lines
+    without the coordinates) are stored once for the decoys that share them. The decoys are
+    written back byte for byte: a decoy that can not be (non standard coordinates) is stored
+    as it is.
+    """
+
+    def __init__(self, archive_path: str):
+        """
+        :param archive_path: path to the archive, read at once
+        """
+        self.archive_path = archive_path
+        with np.load(archive_path) as data:
+            self.names: List[str] = data["names"].tolist()
+            self.decoy_templates = data["decoy_templates"]
+            self.coord_offsets = data["coord_offsets"]
+            self.coords = unpack_coords(data["coords"])
+            template_data, template_offsets = data["templates"], data["template_offsets"]
+        self.templates = [
+            template_data[start:end].tobytes()
+            for start, end in zip(template_offsets[:-1], template_offsets[1:])
+        ]
+        self.formats: Dict[int, bytes] = {}
+        self.indexes = {name: i for i, name in enumerate(self.names)}
+
+    @staticmethod
+    def get_sizes(archive_path: str) -> Dict[str, int]:
+        """
+        Return the size of the PDB file of each decoy, without reading the coordinates
+        """
+        with np.load(archive_path) as data:
+            names = data["names"].tolist()
+            decoy_templates, coord_offsets = data["decoy_templates"], data["coord_offsets"]
+            template_sizes = np.diff(data["template_offsets"])
+        sizes = {}
+        for i, name in enumerate(names):
+            i_template = decoy_templates[i]
+            if i_template < 0:
+                sizes[name] = int(template_sizes[-i_template - 1])
+            else:
+                # Each atom has its 3 coordinates written on 8 characters
+                n_atoms = coord_offsets[i + 1] - coord_offsets[i]
+                sizes[name] = int(template_sizes[i_template] + 24 * n_atoms)
+        return sizes
+
+    def get_pdb(self, name: str) -> bytes:
+        """
+        Return the content of the PDB file of the decoy
+        """
+        i = self.indexes[name]
+        i_template = self.decoy_templates[i]
+        if i_template < 0:
+            # Decoy stored as it is
+            return self.templates[-i_template - 1]
+        if i_template not in self.formats:
+            self.formats[i_template] = get_format(self.templates[i_template])
+        start, end = self.coord_offsets[i], self.coord_offsets[i + 1]
+        return render_pdb(self.formats[i_template], self.coords[start:end])
+
+    def extract(self, out_dir: str, names: Optional[List[str]] = None):
+        """
+        Write the PDB files of the decoys (all the decoys if names is None)
+        """
+        os.makedirs(out_dir, exist_ok=True)
+        for name in self.names if names is None else names:
+            with open(os.path.join(out_dir, name), "wb") as file:
+                file.write(self.get_pdb(name))
+
+    @staticmethod
+    def write(pred_dir: str, archive_path: str, names: Optional[List[str]] = None):
+        """
+        Write the decoys of a folder in an archive
+        :param pred_dir: folder with the PDB files of the decoys
+        :param archive_path: path of the archive (`.npz`)
+        :param names: the decoys to store (all the PDB files of the folder if None)
+        """
+        names = sorted(os.listdir(pred_dir)) if names is None else names
+        templates: Dict[bytes, int] = {}
+        decoy_templates, coord_offsets, all_coords = [], [0], []
+        for name in names:
+            with open(os.path.join(pred_dir, name), "rb") as file:
+                content = file.read()
+            try:
+                template, coords = split_pdb(content)
+                is_exact = render_pdb(get_format(template), coords) == content
+            except (ValueError, TypeError):
+                is_exact = False
+            if is_exact:
+                decoy_templates.append(templates.setdefault(template, len(templates)))
+            else:
+                # Stored as it is, with a negative index
+                template, coords = content, np.zeros((0, 3), dtype=np.float32)
+                decoy_templates.append(-templates.setdefault(template, len(templates)) - 1)
+            all_coords.append(coords)
+            coord_offsets.append(coord_offsets[-1] + len(coords))
+        template_offsets = np.cumsum([0] + [len(template) for template in templates])
+        os.makedirs(os.path.dirname(os.path.abspath(archive_path)), exist_ok=True)
+        tmp_path = archive_path.replace(".npz", ".tmp.npz")
+        np.savez_compressed(
+            tmp_path,
+            names=np.array(names),
+            decoy_templates=np.array(decoy_templates, dtype=np.int32),
+            coord_offsets=np.array(coord_offsets, dtype=np.int64),
+            coords=pack_coords(np.concatenate(all_coords or [np.zeros((0, 3))])),
+            templates=np.frombuffer(b"".join(templates), dtype=np.uint8),
+            template_offsets=template_offsets.astype(np.int64),
+        )
+        os.replace(tmp_path, archive_path)
+
+
+def get_archive_path(input_dir: str, dataset: str, rna: str) -> str:
+    return os.path.join(input_dir, dataset, ARCHIVE_DIR_NAME, f"{rna}.npz")
+
+
+def pack_rna(input_dir: str, dataset: str, rna: str, remove: bool):
+    """
+    Archive the decoys of an RNA, and remove its folder of decoys if asked (once the archive
+    is checked)
+    """
+    pred_dir = os.path.join(input_dir, dataset, "PREDS", rna)
+    archive_path = get_archive_path(input_dir, dataset, rna)
+    DecoyArchive.write(pred_dir, archive_path)
+    if remove:
+        archive = DecoyArchive(archive_path)
+        for name in archive.names:
+            with open(os.path.join(pred_dir, name), "rb") as file:
+                if file.read() != archive.get_pdb(name):
+                    raise ValueError(f"{name} differs in the archive {archive_path}")
+        for name in archive.names:
+            os.remove(os.path.join(pred_dir, name))
+        os.rmdir(pred_dir)
+
+
+def unpack_rna(input_dir: str, dataset: str, rna: str, out_dir: str):
+    DecoyArchive(get_archive_path(input_dir, dataset, rna)).extract(out_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--datasets", nargs="+", default=["TestSetI", "TestSetII", "TestSetIII"])
+    parser.add_argument("--input_dir", default=INPUT_DIR)
+    parser.add_argument(
+        "--unpack", action="store_true", help="Write back the PREDS folder from the archives"
+    )
+    parser.add_argument(
+        "--remove", action="store_true", help="Remove the PREDS folder once archived"
+    )
+    parser.add_argument("--n_jobs", type=int, default=1, help="Number of processes")
+    args = parser.parse_args()
+    to_run = []
+    for dataset in args.datasets:
+        if args.unpack:
+            archive_dir = os.path.join(args.input_dir, dataset, ARCHIVE_DIR_NAME)
+            rnas = [name.replace(".npz", "") for name in sorted(os.listdir(archive_dir))]
+            preds_dir = os.path.join(args.input_dir, dataset, "PREDS")
+            to_run.extend(
+                (unpack_rna, args.input_dir, dataset, rna, os.path.join(preds_dir, rna))
+                for rna in rnas
+            )
+        else:
+            rnas = sorted(os.listdir(os.path.join(args.input_dir, dataset, "PREDS")))
+            to_run.extend((pack_rna, args.input_dir, dataset, rna, args.remove) for rna in rnas)
+    with ProcessPoolExecutor(max_workers=args.n_jobs) as executor:
+        futures = [executor.submit(*run_args) for run_args in to_run]
+        for future in futures:
+            future.result()
@@ -1,13 +1,20 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from typing import Dict, List, Optional
 
+import numpy as np
 import pandas as pd
 import plotly.express as px
 
 from src.scores.enrichment_score import EnrichmentScore
 from src.scores.pcc import PCC
 from src.scores.ranker import Ranker
+from src.scores.score_abstract import ScoreAbstract
+from src.scores.score_matrix import ScoreMatrix
 from src.scores.top_ranker import TopRanker
+from src.utils.score_cache import SCORES_CACHE_DIR, ScoreCache, get_hash
+from src.utils.score_store import ScoreStore
 
 ASCENDING_METRICS = [
     "CAD-score",
@@ -39,6 +46,22 @@ DICT_TO_CHANGE = {
 }
 
 
+def compute_rna_scores(
+    evaluation_scores: Dict[str, ScoreAbstract],
+    energy_list: List,
+    metrics_list: List,
+    score_matrices: Dict[str, ScoreMatrix],
+) -> Dict[str, np.ndarray]:
+    """
+    Compute the scores of each RNA for all the evaluation scores
+    :return: for each evaluation score, an array of shape (n_rna, n_energies, n_metrics)
+    """
+    return {
+        score_name: score_helper.compute_rna_scores(energy_list, metrics_list, score_matrices)
+        for score_name, score_helper in evaluation_scores.items()
+    }
+
+
 class EvaluationHelper:
     def __init__(
         self,
@@ -47,16 +70,30 @@ class EvaluationHelper:
         csv_folder: str,
         save_path: Optional[str] = None,
         metrics_to_metrics: bool = False,
+        n_jobs: int = 1,
+        store: Optional[ScoreStore] = None,
+        incremental: bool = False,
+        renderer=None,
     ):
+        """
+        :param n_jobs: number of processes used to compute the scores of the RNAs
+        :param store: the already loaded scores of the csv folder, renamed with DICT_TO_CHANGE
+        :param incremental: whether to reuse the scores of each (RNA, energy, metric) from the
+            previous run, and only compute the ones whose values changed
+        :param renderer: a FigureRenderer where to add the heatmaps to save. If None, they
+            are saved at once.
+        """
         self.metrics_list = metrics_list
         self.energy_list = energy_list
-        self.dfs = {
-            name.replace(".csv", ""): pd.read_csv(
-                os.path.join(csv_folder, name), index_col=[0]
-            ).rename(columns=DICT_TO_CHANGE)
-            for name in os.listdir(csv_folder)
-        }
+        self.store = (
+            ScoreStore.from_csv_folder(csv_folder, rename=DICT_TO_CHANGE)
+            if store is None
+            else store
+        )
         self.save_path = save_path
+        self.n_jobs = n_jobs
+        self.incremental = incremental
+        self.renderer = renderer
         if not os.path.exists(self.save_path):  # type: ignore
             os.makedirs(self.save_path, exist_ok=True)  # type: ignore
         self.ascending_energies = ASCENDING_METRICS if metrics_to_metrics else ASCENDING_ENERGIES
@@ -75,9 +112,10 @@ class EvaluationHelper:
 
     def compute_all_scores(self, add_mean: bool = False, paper_format: bool = True) -> Dict:
         all_scores = {}
+        rna_scores = self.compute_rna_scores()
         for score_name, score_helper in self.evaluation_scores.items():
-            all_scores[score_name] = score_helper.compute_score(
-                self.energy_list, self.metrics_list, self.dfs, add_mean
+            all_scores[score_name] = score_helper.aggregate_scores(
+                self.energy_list, self.metrics_list, rna_scores[score_name], add_mean
             )
             if self.save_path is not None:
                 line_term = "\\ \n" if paper_format else "\n"  # type: ignore
@@ -92,6 +130,62 @@ class EvaluationHelper:
                 )
         return all_scores
 
+    def compute_rna_scores(self) -> Dict[str, np.ndarray]:
+        """
+        Compute the scores of each RNA, split by chunks of RNAs between the processes.
+        The chunks are merged in the order of the RNAs, so the result is the same as the
+        serial computation.
+        :return: for each evaluation score, an array of shape (n_rna, n_energies, n_metrics)
+        """
+        # The columns are sorted once per RNA and shared between the scores
+        score_matrices = self.store.get_score_matrices()
+        if self.incremental:
+            return self.compute_rna_scores_incremental(score_matrices)
+        if self.n_jobs <= 1 or len(score_matrices) <= 1:
+            return compute_rna_scores(
+                self.evaluation_scores, self.energy_list, self.metrics_list, score_matrices
+            )
+        names = list(score_matrices.keys())
+        n_chunks = min(len(names), 4 * self.n_jobs)
+        chunks = [
+            {name: score_matrices[name] for name in chunk_names}
+            for chunk_names in np.array_split(np.array(names, dtype=object), n_chunks)
+        ]
+        with ProcessPoolExecutor(max_workers=self.n_jobs) as executor:
+            chunk_scores = list(
+                executor.map(
+                    compute_rna_scores,
+                    repeat(self.evaluation_scores),
+                    repeat(self.energy_list),
+                    repeat(self.metrics_list),
+                    chunks,
+                )
+            )
+        return {
+            score_name: np.concatenate([scores[score_name] for scores in chunk_scores])
+            for score_name in self.evaluation_scores
+        }
+
+    def compute_rna_scores_incremental(
+        self, score_matrices: Dict[str, ScoreMatrix]
+    ) -> Dict[str, np.ndarray]:
+        """
+        Compute the scores of each RNA, reusing the cells of the previous run that did not change
+        :return: for each evaluation score, an array of shape (n_rna, n_energies, n_metrics)
+        """
+        rna_scores = {}
+        save_path = os.path.abspath(self.save_path)  # type: ignore
+        cache_dir = os.path.join(
+            SCORES_CACHE_DIR, f"{os.path.basename(save_path)}_{get_hash(save_path.encode())}"
+        )
+        for score_name, score_helper in self.evaluation_scores.items():
+            score_cache = ScoreCache(os.path.join(cache_dir, f"{score_name}.csv"))
+            rna_scores[score_name] = score_cache.compute_rna_scores(
+                score_helper, self.energy_list, self.metrics_list, score_matrices
+            )
+            score_cache.save()
+        return rna_scores
+
     def show_all_scores(
         self, all_scores: Optional[Dict] = None, show: bool = False, add_mean: bool = False
     ):
@@ -115,4 +209,8 @@ class EvaluationHelper:
             if show:
                 fig.show()
             if self.save_path:
-                fig.write_image(os.path.join(self.save_path, f"{score_name}.png"), scale=2)
+                save_path = os.path.join(self.save_path, f"{score_name}.png")
+                if self.renderer is not None:
+                    self.renderer.add(fig, save_path, scale=2)
+                else:
+                    fig.write_image(save_path, scale=2)
@@ -1,17 +1,77 @@
+import argparse
 import os
 import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple, Union
 
 import numpy as np
 from Bio import PDB
 
+from src.utils.pdb_stream import PdbIndex
+
 np.random.seed(77)
 random.seed(77)
 
+WRITERS = ["biopython", "stream"]
+# Length of the chain used to draw the windows, as in the published decoys
+CHAIN_LEN = 2850
+
+# Structure parsed (or indexed) once by each worker of the process pool
+_STRUCTURE: Optional[Union[PDB.Structure.Structure, PdbIndex]] = None
+
+
+class WindowSelect(PDB.Select):
+    """Keep only a window of residues of one chain, and all the other chains"""
+
+    def __init__(self, chain_id: str, residue_ids: frozenset):
+        self.chain_id = chain_id
+        self.residue_ids = residue_ids
+
+    def accept_residue(self, residue):
+        return residue.get_parent().id != self.chain_id or residue.id in self.residue_ids
+
 
 class ExtractPDB:
-    def __init__(self, input_path: str, output_path: str):
+    def __init__(
+        self,
+        input_path: str,
+        output_path: str,
+        chain_id: str = "A",
+        n_jobs: int = 1,
+        chain_len: Optional[int] = CHAIN_LEN,
+        writer: str = "biopython",
+        renumber: bool = False,
+    ):
+        """
+        :param input_path: path to the native structure
+        :param output_path: folder where to save the decoys, in a folder for each length
+        :param chain_id: the chain to truncate
+        :param n_jobs: number of processes to write the decoys
+        :param chain_len: number of residues of the chain, from which the windows are drawn.
+            If None, it is read from the native. The lengths longer than the chain are skipped.
+        :param writer: `biopython` to write the decoys with PDBIO, or `stream` to copy the
+            lines of the native
+        :param renumber: whether to renumber the atom serials with the `stream` writer
+            (PDBIO always renumbers them)
+        """
+        if writer not in WRITERS:
+            raise ValueError(f"Unknown writer {writer}, should be one of {WRITERS}")
         self.input_path = input_path
         self.output_path = output_path
+        self.chain_id = chain_id
+        self.n_jobs = n_jobs
+        self.writer = writer
+        self.renumber = renumber
+        self.chain_len = self.get_chain_len() if chain_len is None else chain_len
+
+    def get_chain_len(self) -> int:
+        if self.writer == "stream":
+            pdb_index = PdbIndex(self.input_path)
+            chain_len = pdb_index.get_n_residues(self.chain_id)
+            pdb_index.close()
+            return chain_len
+        structure = PDB.PDBParser().get_structure("structure", self.input_path)
+        return len(structure[0][self.chain_id])
 
     def select_chain_indexes(self, chain_len: float, chain_step: float, n_decoys: int):
         if chain_len == chain_step:
@@ -21,33 +81,120 @@ class ExtractPDB:
         chain_indexes = [(start_i, start_i + chain_step) for start_i in start_indexes]
         return chain_indexes
 
+    def get_windows(self, new_length: int, n_decoys: int) -> List[Tuple[int, int, int, int]]:
+        """
+        Draw the windows of the decoys of one length
+        :return: the length, the index of the decoy and the first and last residue positions
+        """
+        indexes = self.select_chain_indexes(self.chain_len, new_length, n_decoys)
+        return [(new_length, i, start, end) for i, (start, end) in enumerate(indexes)]
+
     def extract(self, new_length: int, n_decoys: int, step: int):
-        # Load the PDB structure
-        # Select a chain (replace 'A' with the chain ID you want to modify)
-        indexes = self.select_chain_indexes(2850, new_length, n_decoys)
-        for i, index in enumerate(indexes):
-            parser = PDB.PDBParser()
-            structure = parser.get_structure("structure", self.input_path)
-            chain_id = "A"
-            chain = structure[0][chain_id]
-            # Truncate the chain's residues to the new length
-            chain.child_list = chain.child_list[index[0] : index[1]]  # noqa: E203
-            # Save the modified structure to a new PDB file
-            io = PDB.PDBIO()
-            io.set_structure(structure)
-            out_dir = os.path.join(self.output_path, f"decoy_{new_length}")
-            os.makedirs(out_dir, exist_ok=True)
-            path_to_save = os.path.join(out_dir, f"decoy_{new_length}.pdb")
-            io.save(path_to_save.replace(".pdb", f"_{i}.pdb"))
+        self.write_windows(self.get_windows(new_length, n_decoys))
 
     def run(self, min_len: int, max_len: int, step: int, n_decoys: int):
-        for i in range(min_len, max_len + 1, step):
-            self.extract(i, n_decoys, step)
+        # The windows are drawn in the same order as the lengths, so that the random
+        # generator gives the same decoys whatever the number of processes
+        windows = [
+            window
+            for i in range(min_len, min(max_len, self.chain_len) + 1, step)
+            for window in self.get_windows(i, n_decoys)
+        ]
+        self.write_windows(windows)
+
+    def write_windows(self, windows: List[Tuple[int, int, int, int]]):
+        if self.n_jobs == 1:
+            _init_worker(self.input_path, self.writer)
+            _write_windows(self.output_path, self.chain_id, self.renumber, windows)
+            return
+        n_chunks = min(self.n_jobs * 4, len(windows))
+        chunks = [chunk.tolist() for chunk in np.array_split(np.arange(len(windows)), n_chunks)]
+        with ProcessPoolExecutor(
+            max_workers=self.n_jobs,
+            initializer=_init_worker,
+            initargs=(self.input_path, self.writer),
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _write_windows,
+                    self.output_path,
+                    self.chain_id,
+                    self.renumber,
+                    [windows[i] for i in chunk],
+                )
+                for chunk in chunks
+            ]
+            for future in futures:
+                future.result()
+
+
+def _init_worker(input_path: str, writer: str = "biopython"):
+    """
+    Parse (or index) the native structure once for the process
+    """
+    global _STRUCTURE
+    if writer == "stream":
+        _STRUCTURE = PdbIndex(input_path)
+    else:
+        _STRUCTURE = PDB.PDBParser().get_structure("structure", input_path)
+
+
+def _write_windows(
+    output_path: str, chain_id: str, renumber: bool, windows: List[Tuple[int, int, int, int]]
+):
+    for window in windows:
+        _write_window(output_path, chain_id, renumber, window)
+
+
+def _write_window(
+    output_path: str, chain_id: str, renumber: bool, window: Tuple[int, int, int, int]
+):
+    """
+    Save the structure with only a window of residues of the chain
+    """
+    new_length, i, start, end = window
+    out_dir = os.path.join(output_path, f"decoy_{new_length}")
+    os.makedirs(out_dir, exist_ok=True)
+    path_to_save = os.path.join(out_dir, f"decoy_{new_length}.pdb")
+    path_to_save = path_to_save.replace(".pdb", f"_{i}.pdb")
+    if isinstance(_STRUCTURE, PdbIndex):
+        _STRUCTURE.write_window(path_to_save, chain_id, start, end, renumber)
+        return
+    residues = tuple(_STRUCTURE[0][chain_id].child_list)  # type: ignore
+    residue_ids = frozenset(residue.id for residue in residues[start:end])
+    io = PDB.PDBIO()
+    io.set_structure(_STRUCTURE)
+    io.save(path_to_save, WindowSelect(chain_id, residue_ids))
 
 
 if __name__ == "__main__":
-    input_path = os.path.join("docker_data", "input",  "TestSetI", "NATIVE", "3f1hA.pdb")
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--n_jobs", type=int, default=1, help="Number of processes to write the decoys"
+    )
+    parser.add_argument(
+        "--writer", default="biopython", choices=WRITERS, help="How to write the decoys"
+    )
+    parser.add_argument(
+        "--renumber", action="store_true", help="Renumber the atoms with the stream writer"
+    )
+    parser.add_argument("--max_len", type=int, default=2850, help="Length of the longest decoys")
+    parser.add_argument(
+        "--chain_len",
+        type=int,
+        default=CHAIN_LEN,
+        help="Length of the chain to draw the windows from, read from the native if 0",
+    )
+    args = parser.parse_args()
+    input_path = os.path.join("docker_data", "input", "TestSetI", "NATIVE", "3f1hA.pdb")
     output_path = os.path.join("docker_data", "input", "time", "decoys")
-    extract_pdb = ExtractPDB(input_path, output_path)
-    MIN_LEN, MAX_LEN, STEP, N_DECOYS = 50, 2850, 50, 5
-    extract_pdb.run(MIN_LEN, MAX_LEN, STEP, N_DECOYS)
+    extract_pdb = ExtractPDB(
+        input_path,
+        output_path,
+        n_jobs=args.n_jobs,
+        chain_len=args.chain_len or None,
+        writer=args.writer,
+        renumber=args.renumber,
+    )
+    MIN_LEN, STEP, N_DECOYS = 50, 50, 5
+    extract_pdb.run(MIN_LEN, args.max_len, STEP, N_DECOYS)
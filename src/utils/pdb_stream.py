@@ -0,0 +1,139 @@
+import mmap
+import os
+from typing import Dict, List, Optional, Tuple
+
+ATOM_RECORDS = (b"ATOM  ", b"HETATM", b"ANISOU")
+
+
+class PdbIndex:
+    """
+    Byte offsets of the residues of each chain of a PDB file, to write windows of residues
+    by copying the lines of the file instead of parsing and writing the structure with
+    Biopython. The file should have a single model.
+    """
+
+    def __init__(self, pdb_path: str):
+        """
+        :param pdb_path: path to the PDB file, indexed once
+        """
+        self.pdb_path = pdb_path
+        self.file = open(pdb_path, "rb")
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.residues = self.get_residues()
+
+    def get_residues(self) -> Dict[str, List[Tuple[int, int]]]:
+        """
+        Return the (start, end) byte offsets of the atom lines of each residue, by chain,
+        in the order of the file
+        """
+        residues: Dict[str, List[Tuple[int, int]]] = {}
+        previous, start = None, 0
+        while start < self.size:
+            end = self.mmap.find(b"\n", start)
+            end = self.size if end == -1 else end + 1
+            line = self.mmap[start:end]
+            if line[:6] in ATOM_RECORDS:
+                # Residue name, chain, residue number and insertion code
+                key = line[17:27]
+                chain_residues = residues.setdefault(line[21:22].decode(), [])
+                if key == previous and chain_residues[-1][1] == start:
+                    chain_residues[-1] = (chain_residues[-1][0], end)
+                else:
+                    chain_residues.append((start, end))
+                previous = key
+            else:
+                previous = None
+            start = end
+        return residues
+
+    def get_n_residues(self, chain_id: str) -> int:
+        return len(self.residues[chain_id])
+
+    def get_chains_residues(self, chain_ids: Optional[List[str]] = None) -> List[Tuple[int, int]]:
+        """
+        Return the byte offsets of the residues of the chains (all the chains if None), in the
+        order of the file
+        """
+        chain_ids = list(self.residues) if chain_ids is None else chain_ids
+        return sorted(residue for chain_id in chain_ids for residue in self.residues[chain_id])
+
+    def read(self, offset: int, count: int) -> bytes:
+        return self.mmap[offset : offset + count]  # noqa: E203
+
+    def get_ranges(self, chain_id: str, start: int, end: int) -> List[Tuple[int, int]]:
+        """
+        Return the byte ranges of the file without the residues of the chain outside the
+        window
+        :param chain_id: the chain to truncate
+        :param start: position of the first residue of the window in the chain
+        :param end: position after the last residue of the window
+        :return: the (offset, count) of each range to copy
+        """
+        chain_residues = self.residues[chain_id]
+        ranges, offset = [], 0
+        for residue_start, residue_end in chain_residues[:start] + chain_residues[end:]:
+            if residue_start > offset:
+                ranges.append((offset, residue_start - offset))
+            offset = residue_end
+        if offset < self.size:
+            ranges.append((offset, self.size - offset))
+        return ranges
+
+    def write_window(
+        self, output_path: str, chain_id: str, start: int, end: int, renumber: bool = False
+    ):
+        """
+        Write the structure with only a window of residues of the chain
+        :param output_path: path where to save the PDB file
+        :param chain_id: the chain to truncate
+        :param start: position of the first residue of the window in the chain
+        :param end: position after the last residue of the window
+        :param renumber: whether to renumber the atom serials from 1. The CONECT records
+            are then removed.
+        """
+        ranges = self.get_ranges(chain_id, start, end)
+        with open(output_path, "wb") as file:
+            if renumber:
+                file.writelines(self.renumber(ranges))
+                return
+            for offset, count in ranges:
+                self.copy(file, offset, count)
+
+    def copy(self, file, offset: int, count: int):
+        """
+        Copy a byte range of the indexed file at the end of the file, in the kernel if
+        possible
+        """
+        file.flush()
+        try:
+            while count > 0:
+                sent = os.sendfile(file.fileno(), self.file.fileno(), offset, count)
+                if sent == 0:
+                    break
+                offset, count = offset + sent, count - sent
+        except (AttributeError, OSError):
+            pass
+        if count > 0:
+            file.write(self.mmap[offset : offset + count])  # noqa: E203
+
+    def renumber(self, ranges: List[Tuple[int, int]]):
+        """
+        Yield the lines of the ranges, with the atom serials renumbered from 1
+        """
+        serial = 0
+        for offset, count in ranges:
+            for line in self.mmap[offset : offset + count].splitlines(keepends=True):  # noqa: E203
+                record = line[:6]
+                if record == b"CONECT":
+                    continue
+                is_ter = record.startswith(b"TER")
+                if record in (b"ATOM  ", b"HETATM") or is_ter:
+                    serial += 1
+                if (record in ATOM_RECORDS or is_ter) and len(line.rstrip()) > 6:
+                    line = line[:6] + f"{serial:>5}".encode() + line[11:]
+                yield line
+
+    def close(self):
+        self.mmap.close()
+        self.file.close()
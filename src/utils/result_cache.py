@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from src.utils.csv_cache import CACHE_DIR
+
+RESULT_CACHE_PATH = os.path.join(CACHE_DIR, "results.sqlite")
+MAX_SIZE = 1 << 30
+
+
+class ResultCache:
+    """
+    Persistent cache of the results of RNAdvisor, shared by the benchmarks.
+    A result is addressed by the content of the native and decoy PDB files, the name of the
+    score and the version of RNAdvisor (the digest of the docker image), so that a renamed
+    file is still found and a modified file is computed again.
+    The least recently used results are removed when the cache exceeds its maximum size.
+    The cache can be used from several threads: its connection is shared behind a lock.
+    """
+
+    def __init__(self, db_path: str = RESULT_CACHE_PATH, max_size: int = MAX_SIZE):
+        """
+        :param db_path: path to the SQLite database
+        :param max_size: maximum size of the stored results, in bytes
+        """
+        self.db_path = db_path
+        self.max_size = max_size
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "last_access REAL NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)"
+        )
+        self.connection.commit()
+        # Size of the stored results, updated as they are added
+        self.size = self.get_size()
+        # Access times of the results read, not written yet
+        self.accesses: Dict[str, float] = {}
+
+    @staticmethod
+    def get_key(native_hash: str, decoy_hash: str, score: str, version: str) -> str:
+        return hashlib.sha256(
+            "\n".join([native_hash, decoy_hash, score, version]).encode()
+        ).hexdigest()
+
+    def get(self, native_hash: str, decoy_hash: str, score: str, version: str) -> Optional[Dict]:
+        """
+        Return the result of the score for the decoy, or None if it is not in the cache.
+        The access time is written with the next results added (or when the cache is closed).
+        :param native_hash: hash of the content of the native structure
+        :param decoy_hash: hash of the content of the decoy
+        :param score: name of the score (or of the group of scores)
+        :param version: version of the tool that computes the score
+        """
+        key = self.get_key(native_hash, decoy_hash, score, version)
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.accesses[key] = time.time()
+        return json.loads(row[0])
+
+    def put(self, native_hash: str, decoy_hash: str, score: str, version: str, value: Dict):
+        """
+        Add the result of the score for the decoy, and evict the least recently used results
+        if the cache is too large
+        """
+        self.put_many([(native_hash, decoy_hash, score, version, value)])
+
+    def put_many(self, results: List[Tuple[str, str, str, str, Dict]]):
+        """
+        Add several results in one transaction, like the scores of all the decoys of a run
+        :param results: the (native_hash, decoy_hash, score, version, value) of each result
+        """
+        now = time.time()
+        rows = {}
+        for native_hash, decoy_hash, score, version, value in results:
+            content = json.dumps(value)
+            rows[self.get_key(native_hash, decoy_hash, score, version)] = content
+        with self.lock:
+            replaced = self.get_sizes(list(rows))
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO results (key, value, size, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                [(key, content, len(content), now) for key, content in rows.items()],
+            )
+            self.size += sum(len(content) for content in rows.values()) - sum(replaced)
+            self.write_accesses()
+            self.evict()
+            self.connection.commit()
+
+    def get_sizes(self, keys: List[str]) -> List[int]:
+        """
+        Return the size of the results of the keys that are in the cache
+        """
+        sizes = []
+        for i in range(0, len(keys), 500):
+            chunk = keys[i : i + 500]  # noqa: E203
+            sizes.extend(
+                size
+                for size, in self.connection.execute(
+                    f"SELECT size FROM results WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+            )
+        return sizes
+
+    def get_size(self) -> int:
+        return self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def write_accesses(self):
+        """
+        Write the access times of the results read since the last write
+        """
+        if self.accesses:
+            self.connection.executemany(
+                "UPDATE results SET last_access = ? WHERE key = ?",
+                [(last_access, key) for key, last_access in self.accesses.items()],
+            )
+            self.accesses = {}
+
+    def evict(self):
+        """
+        Remove the least recently used results until the cache fits in its maximum size.
+        The size is kept up to date as the results are added: it is only computed again
+        (to count the results added by other processes) when it exceeds the maximum size.
+        """
+        if self.size <= self.max_size:
+            return
+        self.size = self.get_size()
+        excess = self.size - self.max_size
+        if excess <= 0:
+            return
+        to_delete = []
+        for key, size in self.connection.execute(
+            "SELECT key, size FROM results ORDER BY last_access"
+        ):
+            if excess <= 0:
+                break
+            to_delete.append((key,))
+            excess -= size
+            self.size -= size
+        self.connection.executemany("DELETE FROM results WHERE key = ?", to_delete)
+
+    def close(self):
+        with self.lock:
+            self.write_accesses()
+            self.connection.commit()
+            self.connection.close()
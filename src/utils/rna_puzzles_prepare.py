@@ -1,5 +1,8 @@
+import argparse
 import os
 import shutil
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
 
 """
 Clean the rp02 by removing the gap between nt 10-13 in chain G.
@@ -21,28 +24,32 @@ Clean the rp24 by extracting the A:1-34+36-112 from the native and predictions.
 See https://github.com/RNA-Puzzles/standardized_dataset/tree/master/rp24 for more details.
 """
 
+# Action (`extract` or `delete` the residues) and selection of residues, as the options
+# of rna_pdb_tools.py
 RNA_PUZZLES_COMMANDS = {
-    "rp02.pdb": "rna_pdb_tools.py --delete G:11-12 $PATH_IN > $PATH_OUT",
-    "rp06.pdb": "rna_pdb_tools.py --delete A:18-23+111-114 $PATH_IN > $PATH_OUT",
-    "rp10.pdb": "rna_pdb_tools.py --extract 'A:1-96+B:6-66' $PATH_IN > $PATH_OUT",
-    "rp12.pdb": "rna_pdb_tools.py --extract 'A:2-16+34+39-123' $PATH_IN > $PATH_OUT",
-    "rp13.pdb": "rna_pdb_tools.py --extract 'A:1-45+57-71' $PATH_IN > $PATH_OUT",
-    "rp14_free.pdb": "rna_pdb_tools.py --extract 'A:1-21+25-61' $PATH_IN > $PATH_OUT",
-    "rp17.pdb": "rna_pdb_tools.py --extract 'A:1-47+52-62' $PATH_IN > $PATH_OUT",
-    "rp24.pdb": "rna_pdb_tools.py --extract 'A:1-34+36-112' $PATH_IN > $PATH_OUT",
+    "rp02.pdb": ("delete", "G:11-12"),
+    "rp06.pdb": ("delete", "A:18-23+111-114"),
+    "rp10.pdb": ("extract", "A:1-96+B:6-66"),
+    "rp12.pdb": ("extract", "A:2-16+34+39-123"),
+    "rp13.pdb": ("extract", "A:1-45+57-71"),
+    "rp14_free.pdb": ("extract", "A:1-21+25-61"),
+    "rp17.pdb": ("extract", "A:1-47+52-62"),
+    "rp24.pdb": ("extract", "A:1-34+36-112"),
 }
 
 
 class RNAPuzzlesPrepare:
-    def __init__(self, input_path: str, output_path: str):
+    def __init__(self, input_path: str, output_path: str, n_jobs: int = 1):
         """
         Clean the RNA Puzzles dataset that is standardized.
         It applies different transformation for each RNA Puzzles dataset.
         :param input_path: input path where are located the dataset
         :param output_path: where to save the new files.
+        :param n_jobs: number of processes to clean the structures
         """
         self.input_path = input_path
         self.output_path = output_path
+        self.n_jobs = n_jobs
         self._init_output_path()
 
     def _init_output_path(self):
@@ -55,15 +62,28 @@ class RNAPuzzlesPrepare:
 
     def run(self):
         list_rp = os.listdir(os.path.join(self.input_path, "NATIVE"))
+        to_clean = []
         for challenge in list_rp:
-            self._clean_challenge(challenge)
+            to_clean.extend(self._clean_challenge(challenge))
+        if self.n_jobs == 1:
+            for args in to_clean:
+                clean_structure(*args)
+        else:
+            with ProcessPoolExecutor(max_workers=self.n_jobs) as executor:
+                list(executor.map(clean_structure, *zip(*to_clean)))
+        # Replace the cleaned dataset of a previous run
+        destination = os.path.join(
+            self.input_path, os.path.basename(os.path.normpath(self.output_path))
+        )
+        if os.path.exists(destination):
+            shutil.rmtree(destination)
         shutil.move(self.output_path, self.input_path)
 
-    def _clean_challenge(self, challenge: str):
+    def _clean_challenge(self, challenge: str) -> List[Tuple]:
         """
         Clean the data for the given challenge.
         :param challenge: rpX with X the number of the challenge
-        :return:
+        :return: the arguments of `clean_structure` for each structure to clean
         """
         native_in, native_out = os.path.join(self.input_path, "NATIVE", challenge), os.path.join(
             self.output_path, "NATIVE", challenge
@@ -72,37 +92,98 @@ class RNAPuzzlesPrepare:
             self.input_path, "PREDS", challenge.replace(".pdb", "")
         ), os.path.join(self.output_path, "PREDS", challenge.replace(".pdb", ""))
         if challenge in RNA_PUZZLES_COMMANDS:
-            self.clean_rp(challenge, native_in, native_out, pred_in, pred_out)
-        else:
-            shutil.copy(native_in, native_out)
-            shutil.copytree(pred_in, pred_out, dirs_exist_ok=True)
+            return self.clean_rp(challenge, native_in, native_out, pred_in, pred_out)
+        shutil.copy(native_in, native_out)
+        shutil.copytree(pred_in, pred_out, dirs_exist_ok=True)
+        return []
 
-    def clean_rp(self, rp_name: str, native_in: str, native_out, pred_in: str, pred_out: str):
+    def clean_rp(
+        self, rp_name: str, native_in: str, native_out, pred_in: str, pred_out: str
+    ) -> List[Tuple]:
         """
         Clean the rpX using the commands from RNA_PUZZLES_COMMANDS.
         :param rp_name: the name of the current puzzle.
-        :return:
+        :return: the arguments of `clean_structure` for the native and each prediction
         """
         os.makedirs(pred_out, exist_ok=True)
-        self.launch_command(rp_name, native_in, native_out)
+        action, selection = RNA_PUZZLES_COMMANDS[rp_name]
+        to_clean = [(native_in, native_out, action, selection)]
         for rna in os.listdir(pred_in):
             rna_in, rna_out = os.path.join(pred_in, rna), os.path.join(pred_out, rna)
-            self.launch_command(rp_name, rna_in, rna_out)
+            to_clean.append((rna_in, rna_out, action, selection))
+        return to_clean
 
-    def launch_command(self, rp_name: str, in_path: str, out_path: str):
-        """
-        Launch the os command to clean the structure
-        """
-        command = (
-            RNA_PUZZLES_COMMANDS[rp_name]
-            .replace("$PATH_IN", in_path)
-            .replace("$PATH_OUT", out_path)
-        )
-        os.system(command)
+
+def parse_selection(selection: str) -> Dict[str, List[Tuple[int, int]]]:
+    """
+    Parse a selection of residues like `A:1-96+B:6-66` or `A:2-16+34+39-123`.
+    A range without chain is in the chain of the previous range.
+    :return: the ranges of residue numbers (with both bounds included) of each chain
+    """
+    ranges: Dict[str, List[Tuple[int, int]]] = {}
+    chain = None
+    for part in selection.split("+"):
+        if ":" in part:
+            chain, part = part.split(":")
+        if chain is None:
+            raise ValueError(f"No chain for the residues {part} in the selection {selection}")
+        start, _, end = part.partition("-")
+        ranges.setdefault(chain, []).append((int(start), int(end or start)))
+    return ranges
+
+
+def get_residue_number(line: str) -> int:
+    """
+    Return the residue number of an ATOM line (columns 23-26), in decimal or, from 10000, in
+    hybrid-36 (`A000` is 10000 and `a000` follows `ZZZZ`). The insertion code is not read:
+    like rna_pdb_tools.py, the residue 10A is selected with the residue 10.
+    """
+    field = line[22:26].strip()
+    try:
+        if field[:1].isalpha():
+            number = int(field, 36) - int("A000", 36) + 10000
+            return number + 26 * 36**3 if field[0].islower() else number
+        return int(field)
+    except ValueError:
+        raise ValueError(f"Invalid residue number {line[22:26]!r} in {line!r}") from None
+
+
+def clean_structure(in_path: str, out_path: str, action: str, selection: str):
+    """
+    Extract or delete a selection of residues of a structure, with the same output as
+    `rna_pdb_tools.py --no-hr --extract/--delete`: only the ATOM lines of the first model
+    are written, without renumbering.
+    :param in_path: path to the structure
+    :param out_path: where to save the cleaned structure
+    :param action: `extract` to keep only the residues of the selection, `delete` to remove them
+    :param selection: the selection of residues, like `A:1-96+B:6-66`
+    """
+    if action not in ["extract", "delete"]:
+        raise ValueError(f"Unknown action {action}, should be extract or delete")
+    ranges = parse_selection(selection)
+    with open(in_path) as file:
+        lines = file.read().split("\n")
+    kept = []
+    for line in lines:
+        if line.startswith("ENDMDL"):
+            break
+        if not line.startswith("ATOM"):
+            continue
+        number = get_residue_number(line)
+        selected = any(start <= number <= end for start, end in ranges.get(line[21], []))
+        if selected == (action == "extract"):
+            kept.append(line + "\n")
+    with open(out_path, "w") as file:
+        file.writelines(kept)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--n_jobs", type=int, default=1, help="Number of processes to clean the structures"
+    )
+    args = parser.parse_args()
     input_path = os.path.join("docker_data", "input", "TestSetIII")
     output_path = os.path.join("docker_data", "input", "TestSetIII_clean")
-    rna_puzzles_prepare = RNAPuzzlesPrepare(input_path, output_path)
+    rna_puzzles_prepare = RNAPuzzlesPrepare(input_path, output_path, n_jobs=args.n_jobs)
     rna_puzzles_prepare.run()
@@ -0,0 +1,132 @@
+import hashlib
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.scores.score_abstract import ScoreAbstract
+from src.scores.score_matrix import ScoreMatrix
+from src.utils.csv_cache import CACHE_DIR
+
+SCORES_CACHE_DIR = os.path.join(CACHE_DIR, "scores")
+
+
+class ScoreCache:
+    """
+    Persistent cache of the score of each (RNA, energy, metric) for one evaluation score.
+    Each cell is stored with a key built from the parameters of the evaluation score,
+    the decoys of the RNA and the values of the columns it reads: the energy and the metric,
+    or only the energy for the scores that do not read the metric (Rank, TOP-1).
+    Only the cells whose key changed are computed again.
+    """
+
+    def __init__(self, cache_path: str):
+        """
+        :param cache_path: path to the CSV file of the cache
+        """
+        self.cache_path = cache_path
+        self.cells = self._read_cells()
+
+    def _read_cells(self) -> Dict[Tuple[str, str, str], Tuple[str, float]]:
+        if not os.path.exists(self.cache_path):
+            return {}
+        df = pd.read_csv(
+            self.cache_path,
+            dtype={"rna": str, "energy": str, "metric": str, "key": str},
+            float_precision="round_trip",
+        )
+        cells = zip(df["rna"].tolist(), df["energy"].tolist(), df["metric"].tolist())
+        return dict(zip(cells, zip(df["key"].tolist(), df["score"].tolist())))
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        df = pd.DataFrame(
+            [(*cell, key, score) for cell, (key, score) in self.cells.items()],
+            columns=["rna", "energy", "metric", "key", "score"],
+        )
+        df.to_csv(self.cache_path, index=False)
+
+    def compute_rna_scores(
+        self,
+        score_helper: ScoreAbstract,
+        energy_list: List,
+        metrics_list: List,
+        score_matrices: Dict[str, ScoreMatrix],
+    ) -> np.ndarray:
+        """
+        Return the score of every pair (energy, metric) for each RNA, from the cache when the
+        key of the cell did not change, otherwise computed and added to the cache.
+        :return: an array of shape (n_rna, len(energy_list), len(metrics_list))
+        """
+        score_key = get_hash(repr(sorted(self.get_parameters(score_helper).items())).encode())
+        rna_scores = np.full((len(score_matrices), len(energy_list), len(metrics_list)), np.nan)
+        for i_rna, (rna, score_matrix) in enumerate(score_matrices.items()):
+            fingerprints = self.get_fingerprints(score_matrix, energy_list + metrics_list)
+            keys = [
+                [
+                    score_key
+                    + fingerprints[None]
+                    + fingerprints[energy]
+                    + (fingerprints[metric] if score_helper.uses_metric else "")
+                    for metric in metrics_list
+                ]
+                for energy in energy_list
+            ]
+            missing = np.zeros((len(energy_list), len(metrics_list)), dtype=bool)
+            for i_energy, energy in enumerate(energy_list):
+                for i_metric, metric in enumerate(metrics_list):
+                    key, score = self.cells.get((rna, energy, metric), (None, np.nan))
+                    missing[i_energy, i_metric] = key != keys[i_energy][i_metric]
+                    rna_scores[i_rna, i_energy, i_metric] = score
+            # The energies with the same missing metrics are computed together
+            blocks: Dict[Tuple[int, ...], List[int]] = {}
+            for i_energy in np.flatnonzero(missing.any(axis=1)):
+                blocks.setdefault(tuple(np.flatnonzero(missing[i_energy])), []).append(i_energy)
+            for i_metrics, i_energies in blocks.items():
+                rna_scores[i_rna][np.ix_(i_energies, i_metrics)] = score_helper.compute_rna_scores(
+                    [energy_list[i] for i in i_energies],
+                    [metrics_list[i] for i in i_metrics],
+                    {rna: score_matrix},
+                )[0]
+            for i_energy, energy in enumerate(energy_list):
+                for i_metric, metric in enumerate(metrics_list):
+                    self.cells[(rna, energy, metric)] = (
+                        keys[i_energy][i_metric],
+                        rna_scores[i_rna, i_energy, i_metric],
+                    )
+        self.cells = {
+            cell: value for cell, value in self.cells.items() if cell[0] in score_matrices
+        }
+        return rna_scores
+
+    def get_parameters(self, score_helper: ScoreAbstract) -> Dict:
+        """
+        Return the parameters of the evaluation score that change its results
+        """
+        return {
+            "name": score_helper.__class__.__name__,
+            **{key: value for key, value in vars(score_helper).items() if key != "agg_fn"},
+        }
+
+    def get_fingerprints(self, score_matrix: ScoreMatrix, columns: List) -> Dict:
+        """
+        Return a hash of the values of each column, and of the decoy names (with the key None)
+        """
+        fingerprints = {
+            column: get_hash(
+                column.encode()
+                + (
+                    score_matrix.values[:, score_matrix.columns[column]].tobytes()
+                    if column in score_matrix.columns
+                    else b"missing"
+                )
+            )
+            for column in columns
+        }
+        fingerprints[None] = get_hash("\n".join(map(str, score_matrix.names)).encode())
+        return fingerprints
+
+
+def get_hash(content: bytes) -> str:
+    return hashlib.sha1(content).hexdigest()[:12]
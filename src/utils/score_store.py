@@ -0,0 +1,144 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.scores.score_matrix import ScoreMatrix
+from src.utils.csv_cache import CsvCache
+
+RNA_COLUMN, NATIVE_COLUMN = "rna", "is_native"
+
+
+class ScoreStore:
+    """
+    Metrics and energies of all the RNAs of a dataset in a single long-format dataframe.
+    The rows of each RNA are contiguous, with a categorical `rna` column, a flag for the
+    native structure and the scores stored as float32.
+    """
+
+    def __init__(self, df: pd.DataFrame, columns: Dict[str, List[str]]):
+        """
+        :param df: the long-format dataframe, with the decoys as index
+        :param columns: the score columns that are available for each RNA
+        """
+        self.df = df
+        self.columns = columns
+        self.score_columns = [
+            column for column in df.columns if column not in [RNA_COLUMN, NATIVE_COLUMN]
+        ]
+        codes = df[RNA_COLUMN].cat.codes.to_numpy()
+        categories = np.arange(len(df[RNA_COLUMN].cat.categories))
+        starts = np.searchsorted(codes, categories, side="left")
+        stops = np.searchsorted(codes, categories, side="right")
+        self.slices = {
+            rna: slice(int(start), int(stop))
+            for rna, start, stop in zip(df[RNA_COLUMN].cat.categories, starts, stops)
+            if stop > start
+        }
+
+    @classmethod
+    def from_dfs(cls, dfs: Dict[str, pd.DataFrame], dtype=np.float32) -> "ScoreStore":
+        """
+        Build the store from the dataframe of each RNA.
+        The scores are copied once in a preallocated array, without intermediate concatenation.
+        """
+        columns = {rna: list(dict.fromkeys(df.columns)) for rna, df in dfs.items()}
+        score_columns = list(
+            dict.fromkeys(col for rna_cols in columns.values() for col in rna_cols)
+        )
+        positions = {column: i for i, column in enumerate(score_columns)}
+        n_rows = sum(len(df) for df in dfs.values())
+        values = np.full((n_rows, len(score_columns)), np.nan, dtype=dtype)
+        names, is_native, start = [], np.zeros(n_rows, dtype=bool), 0
+        for rna, df in dfs.items():
+            stop = start + len(df)
+            first_columns = ~df.columns.duplicated()
+            values[start:stop, [positions[column] for column in columns[rna]]] = df.loc[
+                :, first_columns
+            ].to_numpy(dtype=dtype)
+            names.append(df.index.to_numpy())
+            is_native[start:stop] = cls.get_native_mask(df.index.to_numpy(), rna)
+            start = stop
+        df_all = pd.DataFrame(
+            values,
+            index=np.concatenate(names) if names else [],
+            columns=score_columns,
+            copy=False,
+        )
+        rnas = np.repeat(list(dfs.keys()), [len(df) for df in dfs.values()])
+        df_all.insert(0, NATIVE_COLUMN, is_native)
+        df_all.insert(0, RNA_COLUMN, pd.Categorical(rnas, categories=list(dfs.keys())))
+        return cls(df_all, columns)
+
+    @classmethod
+    def from_csv_folder(
+        cls, csv_folder: str, rename: Optional[Dict] = None, dtype=np.float32
+    ) -> "ScoreStore":
+        """
+        Build the store from the CSV files of the folder (one file per RNA)
+        """
+        return cls.from_dfs(CsvCache().read_csv_folder(csv_folder, rename=rename), dtype)
+
+    @staticmethod
+    def get_native_mask(names: np.ndarray, rna: str) -> np.ndarray:
+        """
+        Return the mask of the native structure scored by RNAdvisor, `normalized_<rna>.pdb`.
+        A `<rna>.pdb` row is not flagged: the plots keep it, as they did before the store.
+        """
+        return names == f"normalized_{rna}.pdb"
+
+    @property
+    def rna_names(self) -> List[str]:
+        return list(self.slices.keys())
+
+    def get_rna(self, rna: str) -> pd.DataFrame:
+        """
+        Return the rows of the RNA (a view of the store)
+        """
+        return self.df.iloc[self.slices[rna]]
+
+    def groups(self) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        Iterate over the RNAs and their rows (views of the store)
+        """
+        for rna in self.slices:
+            yield rna, self.get_rna(rna)
+
+    def get_score_matrix(self, rna: str) -> ScoreMatrix:
+        """
+        Return the scores of the RNA as a score matrix, with only the columns of the RNA
+        """
+        return ScoreMatrix(self.get_rna(rna)[self.columns[rna]], rna)
+
+    def get_score_matrices(self) -> Dict[str, ScoreMatrix]:
+        return {rna: self.get_score_matrix(rna) for rna in self.slices}
+
+    def get_frame(
+        self,
+        rna_names: Optional[List[str]] = None,
+        remove_native: bool = True,
+        max_rows: Optional[int] = None,
+        seed: int = 0,
+    ) -> pd.DataFrame:
+        """
+        Return the scores of the given RNAs (all the RNAs by default) in one dataframe.
+        :param rna_names: the RNAs to keep
+        :param remove_native: whether to remove the native structures
+        :param max_rows: if not None, keep about max_rows rows, drawn at random with the same
+            fraction in each RNA
+        :param seed: seed of the drawn rows
+        """
+        mask = np.ones(len(self.df), dtype=bool)
+        if rna_names is not None:
+            mask &= self.df[RNA_COLUMN].isin(rna_names).to_numpy()
+        if remove_native:
+            mask &= ~self.df[NATIVE_COLUMN].to_numpy()
+        n_rows = int(mask.sum())
+        if max_rows is not None and n_rows > max_rows:
+            rng = np.random.default_rng(seed)
+            for rna_slice in self.slices.values():
+                rows = np.flatnonzero(mask[rna_slice]) + rna_slice.start
+                n_kept = int(round(len(rows) * max_rows / n_rows))
+                mask[rows] = False
+                mask[rng.choice(rows, n_kept, replace=False)] = True
+        return self.df.loc[mask, self.score_columns]
@@ -0,0 +1,281 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.utils.pdb_stream import PdbIndex
+
+NOISE_MODELS = ["none", "atom", "residue"]
+MANIFEST_NAME = "manifest.csv"
+MANIFEST_COLUMNS = [
+    "rna",
+    "length",
+    "decoy",
+    "native_path",
+    "pred_path",
+    "start",
+    "end",
+    "noise_model",
+    "noise",
+    "seed",
+]
+
+
+class WorkloadGenerator:
+    """
+    Generate decoys of different lengths from natives, for the scaling studies of the
+    benchmarks.
+    For each native and length, a window of consecutive residues of the selected chains is
+    drawn: it is the native of the group, and its decoys are copies of the window with
+    perturbed coordinates (so that the metrics are not trivially 0).
+    Each group is drawn from its own seeded generator: the workload is the same whatever
+    the number of processes.
+    The decoys are listed in a manifest, read by the time and carbon benchmarks.
+    """
+
+    def __init__(
+        self,
+        natives: Dict[str, Optional[List[str]]],
+        output_path: str,
+        min_len: int = 50,
+        max_len: int = 2850,
+        step: int = 50,
+        n_decoys: int = 5,
+        noise_model: str = "atom",
+        noise: float = 1.0,
+        seed: int = 77,
+        n_jobs: int = 1,
+    ):
+        """
+        :param natives: the path of each native, with the chains to use (all the chains
+            if None)
+        :param output_path: folder where to save the decoys, with a folder by native
+        :param min_len: length of the shortest decoys
+        :param max_len: length of the longest decoys. The lengths longer than the selected
+            chains of a native are skipped.
+        :param step: step between the lengths
+        :param n_decoys: number of decoys for each native and length
+        :param noise_model: `atom` to move each atom, `residue` to move each residue as a
+            block, or `none`
+        :param noise: standard deviation of the moves, in angstroms
+        :param seed: the seed of the random generators
+        :param n_jobs: number of processes to write the decoys
+        """
+        if noise_model not in NOISE_MODELS:
+            raise ValueError(f"Unknown noise model {noise_model}, should be one of {NOISE_MODELS}")
+        self.natives = natives
+        self.output_path = output_path
+        self.lengths = list(range(min_len, max_len + 1, step))
+        self.n_decoys = n_decoys
+        self.noise_model = noise_model
+        self.noise = noise
+        self.seed = seed
+        self.n_jobs = n_jobs
+
+    def get_groups(self) -> List[Tuple]:
+        """
+        Return the arguments of `generate_group` for each native and length
+        """
+        groups = []
+        for i_native, (native_path, chain_ids) in enumerate(self.natives.items()):
+            pdb_index = PdbIndex(native_path)
+            n_residues = len(pdb_index.get_chains_residues(chain_ids))
+            pdb_index.close()
+            for length in self.lengths:
+                if length > n_residues:
+                    continue
+                groups.append(
+                    (
+                        native_path,
+                        chain_ids,
+                        length,
+                        self.output_path,
+                        self.n_decoys,
+                        self.noise_model,
+                        self.noise,
+                        [self.seed, i_native, length],
+                    )
+                )
+        return groups
+
+    def run(self) -> pd.DataFrame:
+        """
+        Write the decoys and their manifest
+        :return: the manifest, with one row per decoy
+        """
+        groups = self.get_groups()
+        if self.n_jobs == 1:
+            rows = [generate_group(*group) for group in groups]
+        else:
+            with ProcessPoolExecutor(max_workers=self.n_jobs) as executor:
+                rows = list(executor.map(generate_group, *zip(*groups)))
+        manifest = pd.DataFrame(
+            [row for group_rows in rows for row in group_rows], columns=MANIFEST_COLUMNS
+        )
+        os.makedirs(self.output_path, exist_ok=True)
+        manifest.to_csv(os.path.join(self.output_path, MANIFEST_NAME), index=False)
+        return manifest
+
+
+def generate_group(
+    native_path: str,
+    chain_ids: Optional[List[str]],
+    length: int,
+    output_path: str,
+    n_decoys: int,
+    noise_model: str,
+    noise: float,
+    seed: List[int],
+) -> List[Dict]:
+    """
+    Write the native and the decoys of one length
+    :return: the rows of the manifest
+    """
+    rna = os.path.basename(native_path).replace(".pdb", "")
+    pdb_index = PdbIndex(native_path)
+    residues = pdb_index.get_chains_residues(chain_ids)
+    rng = np.random.default_rng(seed)
+    start = int(rng.integers(0, len(residues) - length + 1))
+    window = residues[start : start + length]  # noqa: E203
+    lines = [
+        pdb_index.read(residue_start, residue_end - residue_start).splitlines(keepends=True)
+        for residue_start, residue_end in window
+    ]
+    pdb_index.close()
+    template = WindowTemplate(lines)
+    native_dir = os.path.join(output_path, rna, "native")
+    decoy_dir = os.path.join(output_path, rna, f"decoy_{length}")
+    os.makedirs(native_dir, exist_ok=True)
+    os.makedirs(decoy_dir, exist_ok=True)
+    out_native = os.path.join(native_dir, f"decoy_{length}.pdb")
+    template.write(out_native, template.coords)
+    rows = []
+    for i in range(n_decoys):
+        decoy_rng = np.random.default_rng(seed + [i])
+        out_pred = os.path.join(decoy_dir, f"decoy_{length}_{i}.pdb")
+        template.write(out_pred, template.perturb(decoy_rng, noise_model, noise))
+        rows.append(
+            {
+                "rna": rna,
+                "length": length,
+                "decoy": i,
+                "native_path": out_native,
+                "pred_path": out_pred,
+                "start": start,
+                "end": start + length,
+                "noise_model": noise_model,
+                "noise": noise,
+                "seed": "-".join(map(str, seed + [i])),
+            }
+        )
+    return rows
+
+
+class WindowTemplate:
+    """
+    Atom lines of a window of residues, split around their coordinates to write perturbed
+    copies quickly
+    """
+
+    def __init__(self, lines: List[List[bytes]]):
+        """
+        :param lines: the atom lines of each residue of the window
+        """
+        self.prefixes: List[bytes] = []
+        self.suffixes: List[bytes] = []
+        coords, residue_ids = [], []
+        serial, chain = 0, None
+        for i_residue, residue_lines in enumerate(lines):
+            for line in residue_lines:
+                if line[:6] not in (b"ATOM  ", b"HETATM"):
+                    continue
+                if chain is not None and line[21:22] != chain:
+                    # Close the previous chain
+                    serial += 1
+                    self.prefixes.append(b"TER   " + f"{serial:>5}".encode() + b"\n")
+                    self.suffixes.append(b"")
+                    coords.append((np.nan, np.nan, np.nan))
+                    residue_ids.append(i_residue)
+                serial += 1
+                chain = line[21:22]
+                self.prefixes.append(line[:6] + f"{serial:>5}".encode() + line[11:30])
+                self.suffixes.append(line[54:].rstrip(b"\r\n") + b"\n")
+                coords.append((float(line[30:38]), float(line[38:46]), float(line[46:54])))
+                residue_ids.append(i_residue)
+        self.coords = np.array(coords).reshape(-1, 3)
+        self.residue_ids = np.array(residue_ids, dtype=int)
+        self.n_residues = len(lines)
+
+    def perturb(self, rng: np.random.Generator, noise_model: str, noise: float) -> np.ndarray:
+        """
+        Return the coordinates moved by a gaussian noise
+        """
+        if noise_model == "atom":
+            return self.coords + rng.normal(0, noise, size=self.coords.shape)
+        if noise_model == "residue":
+            moves = rng.normal(0, noise, size=(self.n_residues, 3))
+            return self.coords + moves[self.residue_ids]
+        return self.coords
+
+    def write(self, output_path: str, coords: np.ndarray):
+        with open(output_path, "wb") as file:
+            for prefix, suffix, (x, y, z) in zip(self.prefixes, self.suffixes, coords):
+                if suffix:
+                    file.write(prefix + f"{x:8.3f}{y:8.3f}{z:8.3f}".encode() + suffix)
+                else:
+                    file.write(prefix)
+            file.write(b"TER\nEND\n")
+
+
+def read_manifest(manifest_path: str) -> pd.DataFrame:
+    """
+    Read a manifest of decoys, with the paths relative to the working directory
+    """
+    return pd.read_csv(manifest_path, dtype={"seed": str})
+
+
+def parse_native(native: str) -> Tuple[str, Optional[List[str]]]:
+    """
+    Parse a native like `path/to/native.pdb:A,B` (all the chains without `:`)
+    """
+    path, _, chains = native.partition(":")
+    return path, chains.split(",") if chains else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--natives",
+        nargs="+",
+        default=[os.path.join("docker_data", "input", "TestSetI", "NATIVE", "3f1hA.pdb:A")],
+        help="Natives, with the chains to use like native.pdb:A,B (all the chains by default)",
+    )
+    parser.add_argument("--output_path", default=os.path.join("docker_data", "input", "workload"))
+    parser.add_argument("--min_len", type=int, default=50)
+    parser.add_argument("--max_len", type=int, default=2850)
+    parser.add_argument("--step", type=int, default=50)
+    parser.add_argument("--n_decoys", type=int, default=5, help="Decoys per native and length")
+    parser.add_argument("--noise_model", default="atom", choices=NOISE_MODELS)
+    parser.add_argument("--noise", type=float, default=1.0, help="Standard deviation, in A")
+    parser.add_argument("--seed", type=int, default=77)
+    parser.add_argument(
+        "--n_jobs", type=int, default=1, help="Number of processes to write the decoys"
+    )
+    args = parser.parse_args()
+    workload_generator = WorkloadGenerator(
+        dict(parse_native(native) for native in args.natives),
+        args.output_path,
+        min_len=args.min_len,
+        max_len=args.max_len,
+        step=args.step,
+        n_decoys=args.n_decoys,
+        noise_model=args.noise_model,
+        noise=args.noise,
+        seed=args.seed,
+        n_jobs=args.n_jobs,
+    )
+    manifest = workload_generator.run()
+    print(f"{len(manifest)} decoys written in {args.output_path}")
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import PackageNotFoundError, version
+from typing import Dict, List, Optional, Tuple
+
+import plotly.io as pio
+
+from src.utils.csv_cache import CACHE_DIR
+
+RENDER_MANIFEST_PATH = os.path.join(CACHE_DIR, "figures.json")
+
+
+class FigureRenderer:
+    """
+    Collect the figures to save, and export them at the end in a pool of processes.
+    Each figure is addressed by the hash of its JSON (its data and its layout) and of the
+    export options: a figure whose hash did not change since the last render, and whose
+    image still exists, is not exported again.
+    """
+
+    def __init__(
+        self, n_jobs: int = 1, manifest_path: str = RENDER_MANIFEST_PATH, force: bool = False
+    ):
+        """
+        :param n_jobs: number of processes that export the figures
+        :param manifest_path: JSON file with the hash of each exported figure
+        :param force: whether to export all the figures, even the unchanged ones
+        """
+        self.n_jobs = n_jobs
+        self.manifest_path = manifest_path
+        self.force = force
+        self.specs: Dict[str, Tuple[str, Dict]] = {}
+
+    def add(self, fig, save_path: str, **kwargs):
+        """
+        Add a figure to export
+        :param fig: the plotly figure
+        :param save_path: path of the image
+        :param kwargs: the options of `write_image` (scale, width, height)
+        """
+        self.specs[save_path] = (fig.to_json(), kwargs)
+
+    @staticmethod
+    def get_hash(figure_json: str, kwargs: Dict) -> str:
+        content = figure_json + json.dumps(kwargs, sort_keys=True)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def read_manifest(self) -> Dict[str, str]:
+        if self.force or not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path) as file:
+            return json.load(file)
+
+    def write_manifest(self, manifest: Dict[str, str]):
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(manifest, file, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def render(self) -> List[str]:
+        """
+        Export the figures that changed since the last render
+        :return: the paths of the exported images
+        """
+        manifest = self.read_manifest()
+        hashes = {
+            save_path: self.get_hash(figure_json, kwargs)
+            for save_path, (figure_json, kwargs) in self.specs.items()
+        }
+        to_render = [
+            (figure_json, save_path, kwargs)
+            for save_path, (figure_json, kwargs) in self.specs.items()
+            if manifest.get(save_path) != hashes[save_path] or not os.path.exists(save_path)
+        ]
+        n_chunks = min(self.n_jobs, len(to_render))
+        if n_chunks <= 1:
+            render_figures(to_render)
+        else:
+            # Each process exports a chunk of figures, with one start of the export engine
+            chunks = [to_render[i::n_chunks] for i in range(n_chunks)]
+            with ProcessPoolExecutor(max_workers=n_chunks) as executor:
+                list(executor.map(render_figures, chunks))
+        manifest.update(hashes)
+        self.write_manifest(manifest)
+        self.specs = {}
+        return [save_path for _, save_path, _ in to_render]
+
+
+def can_write_images() -> bool:
+    """
+    Return whether the figures can be exported with the same browser: `pio.write_images`
+    needs plotly >= 6.1 and Kaleido >= 1
+    """
+    if not hasattr(pio, "write_images"):
+        return False
+    try:
+        return int(version("kaleido").split(".")[0]) >= 1
+    except (PackageNotFoundError, ValueError):
+        return False
+
+
+def render_figures(specs: List[Tuple[str, str, Dict]]):
+    """
+    Export the figures, given as (JSON of the figure, path of the image, options)
+    """
+    if len(specs) == 0:
+        return
+    figs = [pio.from_json(figure_json) for figure_json, _, _ in specs]
+    save_paths = [save_path for _, save_path, _ in specs]
+    for save_path in save_paths:
+        os.makedirs(os.path.dirname(save_path) or ".", exist_ok=True)
+    if can_write_images():
+        pio.write_images(
+            figs,
+            save_paths,
+            scale=[kwargs.get("scale") for _, _, kwargs in specs],
+            width=[kwargs.get("width") for _, _, kwargs in specs],
+            height=[kwargs.get("height") for _, _, kwargs in specs],
+        )
+        return
+    for fig, save_path, (_, _, kwargs) in zip(figs, save_paths, specs):
+        pio.write_image(fig, save_path, **kwargs)
+
+
+def write_image(fig, save_path: str, renderer: Optional[FigureRenderer] = None, **kwargs):
+    """
+    Save the figure now, or add it to the renderer if given
+    """
+    if renderer is not None:
+        renderer.add(fig, save_path, **kwargs)
+    else:
+        fig.write_image(save_path, **kwargs)
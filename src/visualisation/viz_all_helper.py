@@ -5,6 +5,8 @@ import numpy as np
 import pandas as pd
 import plotly.express as px
 
+from src.visualisation.figure_renderer import FigureRenderer, write_image
+
 DICT_TO_CHANGE = {
     "BARNABA-eRMSD": "εRMSD",
     "BARNABA-eSCORE": "εSCORE",
@@ -19,8 +21,13 @@ DICT_TO_CHANGE = {
 
 
 class VizAllHelper:
-    def __init__(self, csv_paths: List[str]):
+    def __init__(self, csv_paths: List[str], renderer: Optional[FigureRenderer] = None):
+        """
+        :param csv_paths: folders with the evaluation scores of each dataset
+        :param renderer: where to add the figures to save. If None, they are saved at once.
+        """
         self.csv_paths = csv_paths
+        self.renderer = renderer
         self.all_dfs = {
             eval_type: self.read_csv_files(
                 csv_paths,
@@ -87,7 +94,7 @@ class VizAllHelper:
                 if dataset is not None
                 else path_to_save
             )
-            fig.write_image(path_to_save, scale=2)
+            write_image(fig, path_to_save, self.renderer, scale=2)
         if to_show:
             fig.show()
 
@@ -145,7 +152,7 @@ class VizAllHelper:
 
         if save_path is not None:
             path_to_save = save_path.replace(".png", f"_{eval_type}.png")
-            fig.write_image(path_to_save, scale=2)
+            write_image(fig, path_to_save, self.renderer, scale=2)
 
     def get_max_metrics(self, metrics_scores: Dict):
         scores = list(metrics_scores.values())
@@ -1,7 +1,10 @@
+import argparse
 import os
+from typing import List, Optional
 
+from src.visualisation.figure_renderer import FigureRenderer
 from src.visualisation.viz_all_helper import VizAllHelper
-from src.visualisation.viz_helper import VizHelper
+from src.visualisation.viz_helper import MAX_POINTS, VizHelper
 
 LIST_MAIN_METRICS = [
     "RMSD",
@@ -17,27 +20,55 @@ LIST_MAIN_METRICS = [
 
 
 class VizCLI:
+    def __init__(
+        self,
+        n_jobs: int = 1,
+        incremental: bool = False,
+        force: bool = False,
+        max_points: Optional[int] = MAX_POINTS,
+    ):
+        """
+        :param n_jobs: number of processes used to compute the evaluation scores and to
+            export the figures
+        :param incremental: whether to only compute the evaluation scores that changed
+        :param force: whether to export all the figures, even the ones that did not change
+            since the last run
+        :param max_points: about the maximum number of points of the scatter plots (all the
+            decoys if None)
+        """
+        self.n_jobs = n_jobs
+        self.incremental = incremental
+        self.max_points = max_points
+        self.renderer = FigureRenderer(n_jobs=n_jobs, force=force)
+
     def test_set_i(self):
         csv_folder = os.path.join("docker_data", "output", "TestSetI")
-        viz_helper = VizHelper(csv_folder)
+        viz_helper = VizHelper(
+            csv_folder, n_jobs=self.n_jobs, incremental=self.incremental, renderer=self.renderer
+        )
         viz_helper.plot_correlation_all_energies(
             LIST_MAIN_METRICS,
             ["1ec6D"],
             to_show=False,
             save_path=os.path.join("docker_data", "plots", "1ec6D_metrics_energies.png"),
+            max_points=self.max_points,
         )
         viz_helper.compute_er_score(list_metrics=LIST_MAIN_METRICS, add_mean=True)
         viz_helper.compute_er_score_metrics()
 
     def test_set_ii(self):
         csv_folder = os.path.join("docker_data", "output", "TestSetII")
-        viz_helper = VizHelper(csv_folder)
+        viz_helper = VizHelper(
+            csv_folder, n_jobs=self.n_jobs, incremental=self.incremental, renderer=self.renderer
+        )
         viz_helper.compute_er_score(list_metrics=LIST_MAIN_METRICS, add_mean=True)
         viz_helper.compute_er_score_metrics()
 
     def test_set_iii(self):
         csv_folder = os.path.join("docker_data", "output", "TestSetIII")
-        viz_helper = VizHelper(csv_folder)
+        viz_helper = VizHelper(
+            csv_folder, n_jobs=self.n_jobs, incremental=self.incremental, renderer=self.renderer
+        )
         viz_helper.compute_er_score(list_metrics=LIST_MAIN_METRICS, add_mean=True)
         viz_helper.compute_er_score_metrics()
 
@@ -47,7 +78,7 @@ class VizCLI:
             os.path.join(in_dir, dataset)
             for dataset in ["TestSetI", "TestSetII", "TestSetIII"]
         ]
-        viz_all_helper = VizAllHelper(csv_folders)
+        viz_all_helper = VizAllHelper(csv_folders, renderer=self.renderer)
         save_path = os.path.join("docker_data", "plots", "heatmap", "all_heatmap.png")
         os.makedirs(os.path.dirname(save_path), exist_ok=True)
         viz_all_helper.plot_heat_map(eval_type="PCC", save_path=save_path)
@@ -61,10 +92,43 @@ class VizCLI:
             eval_type="ES", save_path=save_path, colorscale="viridis"
         )
 
+    def render(self) -> List[str]:
+        """
+        Export the figures collected by the visualisations
+        :return: the paths of the exported figures
+        """
+        return self.renderer.render()
+
 
 if __name__ == "__main__":
-    viz_cli = VizCLI()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--n_jobs", type=int, default=1, help="Number of processes to compute the scores"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only compute the scores of the RNAs and columns that changed since the last run",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Export all the figures, even the unchanged ones"
+    )
+    parser.add_argument(
+        "--max_points",
+        type=int,
+        default=MAX_POINTS,
+        help="Maximum number of points of the scatter plots, all of them if 0",
+    )
+    args = parser.parse_args()
+    viz_cli = VizCLI(
+        n_jobs=args.n_jobs,
+        incremental=args.incremental,
+        force=args.force,
+        max_points=args.max_points or None,
+    )
     viz_cli.test_set_i()
     viz_cli.test_set_ii()
     viz_cli.test_set_iii()
     viz_cli.test_set_all()
+    rendered = viz_cli.render()
+    print(f"{len(rendered)} figures exported")
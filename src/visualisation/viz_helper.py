@@ -1,13 +1,14 @@
 import os
-from typing import Dict, List, Optional
+from typing import List, Optional
 
 import numpy as np
 import pandas as pd
 import plotly.express as px
-import plotly.io as pio
 from sklearn import preprocessing as pre
 
 from src.utils.evaluation_helper import EvaluationHelper
+from src.utils.score_store import ScoreStore
+from src.visualisation.figure_renderer import FigureRenderer, write_image
 
 LIST_MAIN_METRICS = [
     "RMSD",
@@ -55,6 +56,9 @@ DICT_TO_CHANGE = {
     "CAD": "CAD-score",
 }
 
+# Default maximum number of points of the scatter plots
+MAX_POINTS = 50000
+
 COLORS_ENERGIES = {
     "RASP": "#6499E9",
     "εSCORE": "#B5CB99",
@@ -64,12 +68,26 @@ COLORS_ENERGIES = {
 
 
 class VizHelper:
-    def __init__(self, csv_folder: str):
+    def __init__(
+        self,
+        csv_folder: str,
+        n_jobs: int = 1,
+        incremental: bool = False,
+        renderer: Optional[FigureRenderer] = None,
+    ):
+        """
+        :param csv_folder: folder with the metrics and energies of each RNA
+        :param n_jobs: number of processes used to compute the evaluation scores
+        :param incremental: whether to only compute the evaluation scores that changed
+            since the previous run
+        :param renderer: where to add the figures to save. If None, they are saved at once.
+        """
         self.csv_folder = csv_folder
-        self.csv_paths = [
-            os.path.join(self.csv_folder, csv_file) for csv_file in os.listdir(self.csv_folder)
-        ]
-        self.df = self._init_csv(self.csv_paths)
+        self.n_jobs = n_jobs
+        self.incremental = incremental
+        self.renderer = renderer
+        self.store = ScoreStore.from_csv_folder(self.csv_folder, rename=DICT_TO_CHANGE)
+        self.df = self.store.get_frame(remove_native=True)
         self.energy_normalizer = self._init_normalizer(self.df)
 
     def _init_normalizer(self, df: pd.DataFrame):
@@ -79,72 +97,66 @@ class VizHelper:
             normalizers[energy] = new_energy
         return normalizers
 
-    def _init_csv(self, csv_path: List[str], remove_native: bool = True):
-        """Merge the different csv files into one dataframe"""
-        df = self.read_csv(csv_path[0], remove_native)
-        for csv in csv_path[1:]:
-            new_df = self.read_csv(csv, remove_native)
-            df = pd.concat([df, new_df], axis=0)
-        df = df.rename(columns=DICT_TO_CHANGE)
-        return df
-
-    def read_csv(self, csv_path: str, remove_native: bool = True):
-        """Read a csv file"""
-        df = pd.read_csv(csv_path, index_col=[0])
-        if remove_native:
-            df = self.remove_native_from_df(df, csv_path)
-        return df
-
-    def remove_native_from_df(self, df: pd.DataFrame, name: str) -> pd.DataFrame:
-        """
-        Remove the native molecules from the dataframe
-        :param df:
-        :param name: name of the csv file
-        """
-        native_name = f"normalized_{os.path.basename(name).replace('.csv', '')}.pdb"
-        return df[df.index != native_name]
-
     def _convert_df_to_plot(
-        self, energies: List, metrics: List, rna_name: List[str], normalize: bool = True
+        self,
+        energies: List,
+        metrics: List,
+        rna_name: List[str],
+        normalize: bool = True,
+        max_points: Optional[int] = None,
     ) -> pd.DataFrame:
         """
         Convert the df to plot the energy and the metrics
+        :param max_points: if not None, the decoys of each RNA are sampled (with the same
+            fraction) so that there are about max_points rows, one per (metric, energy, decoy)
         """
-        if len(rna_name) > 0:
-            df = self._init_csv(
-                [os.path.join(self.csv_folder, f"{csv_file}.csv") for csv_file in rna_name],
+        n_pairs = len(metrics) * len(energies)
+        if max_points is not None:
+            df = self.store.get_frame(
+                rna_name if len(rna_name) > 0 else None,
                 remove_native=True,
+                max_rows=max(1, max_points // n_pairs),
             )
+        elif len(rna_name) > 0:
+            df = self.store.get_frame(rna_name, remove_native=True)
         else:
-            df = self.df.copy()
-        df = df[energies + metrics]
-        new_df: Dict = {"Metric": [], "metric": [], "energy": [], "Energy": [], "RNA": []}
-        for metric in metrics:
-            for energy in energies:
-                new_df["RNA"].extend(df.index.tolist())
-                new_df["Energy"].extend(len(df) * [energy])
-                new_df["Metric"].extend(len(df) * [metric])
-                new_df["metric"].extend(df[metric].values)
-                if normalize:
-                    energy_normalized = (
-                        self.energy_normalizer[energy]
-                        .transform(df[energy].values.reshape(-1, 1))
-                        .reshape(-1)
-                    )
-                else:
-                    energy_normalized = df[energy].values
-                if energy in NEGATIVE_ENERGY:
-                    energy_normalized = 1 * normalize - energy_normalized
-                energy_normalized = np.log(1e-10 + abs(energy_normalized))
-                new_df["energy"].extend(energy_normalized)
-        new_df = pd.DataFrame(new_df)
+            df = self.df
+        # In the dtype of the scores (float32), like the transform of the MinMaxScaler
+        energy_values = df[energies].to_numpy(copy=True)
+        if normalize:
+            # Same as the transform of the MinMaxScaler of each energy, on all the columns
+            scales = np.array([self.energy_normalizer[energy].scale_[0] for energy in energies])
+            mins = np.array([self.energy_normalizer[energy].min_[0] for energy in energies])
+            energy_values *= scales
+            energy_values += mins
+        negative = np.isin(energies, NEGATIVE_ENERGY)
+        energy_values[:, negative] = 1 * normalize - energy_values[:, negative]
+        energy_values = np.log(1e-10 + np.abs(energy_values))
+        # One row per (metric, energy, decoy), in this order
+        shape = (len(metrics), len(energies), len(df))
+        metric_values = df[metrics].to_numpy().T
+        new_df = pd.DataFrame(
+            {
+                "Metric": pd.Categorical.from_codes(
+                    np.broadcast_to(np.arange(len(metrics))[:, None, None], shape).ravel(),
+                    metrics,
+                ),
+                "metric": np.broadcast_to(metric_values[:, None, :], shape).ravel(),
+                "energy": np.broadcast_to(energy_values.T[None, :, :], shape).ravel(),
+                "Energy": pd.Categorical.from_codes(
+                    np.broadcast_to(np.arange(len(energies))[None, :, None], shape).ravel(),
+                    energies,
+                ),
+                "RNA": np.tile(df.index.to_numpy(), len(metrics) * len(energies)),
+            }
+        )
         return new_df
 
     def filter_df(self, df: pd.DataFrame):
         """
         Remove NaN and infinite values from the df
         """
-        new_df = df[(df["metric"] < 1e300) & (df["energy"] < 1e300) & (df["metric"] != 0)]
+        new_df = df[np.isfinite(df["metric"]) & np.isfinite(df["energy"]) & (df["metric"] != 0)]
         return new_df
 
     def plot_correlation_energy_metrics(
@@ -159,6 +171,7 @@ class VizHelper:
             facet_col="Metric",
             facet_col_wrap=3,
             hover_data=["RNA"],
+            render_mode="webgl",
         )
         color = "#d6d6d6"
         fig.update_xaxes(matches=None, showticklabels=True)
@@ -184,16 +197,31 @@ class VizHelper:
         rna_name: List[str] = [],
         save_path: Optional[str] = None,
         to_show: bool = False,
+        max_points: Optional[int] = MAX_POINTS,
+        density: bool = False,
     ):
-        df = self._convert_df_to_plot(LIST_ENERGIES, metrics, rna_name, normalize=True)
-        df = self.filter_df(df)
-        fig = px.scatter(
-            df,
-            x="metric",
-            y="energy",
-            facet_col="Energy",
-            facet_col_wrap=5,
+        """
+        :param max_points: about the maximum number of points, drawn from a sample of the
+            decoys of each RNA (all of them if None)
+        :param density: whether to draw the number of points in 2D bins instead of the points
+        """
+        df = self._convert_df_to_plot(
+            LIST_ENERGIES, metrics, rna_name, normalize=True, max_points=max_points
         )
+        df = self.filter_df(df)
+        if density:
+            fig = px.density_heatmap(
+                df, x="metric", y="energy", facet_col="Energy", facet_col_wrap=5
+            )
+        else:
+            fig = px.scatter(
+                df,
+                x="metric",
+                y="energy",
+                facet_col="Energy",
+                facet_col_wrap=5,
+                render_mode="webgl",
+            )
         fig.show()
 
     def plot_correlation_all_energies(
@@ -202,19 +230,35 @@ class VizHelper:
         rna_name: List[str] = [],
         save_path: Optional[str] = None,
         to_show: bool = False,
+        max_points: Optional[int] = MAX_POINTS,
+        density: bool = False,
     ):
-        df = self._convert_df_to_plot(LIST_ENERGIES, metrics, rna_name, normalize=True)
+        """
+        :param max_points: about the maximum number of points, drawn from a sample of the
+            decoys of each RNA (all of them if None)
+        :param density: whether to draw the number of points in 2D bins instead of the
+            points, with a row of facets for each scoring function
+        """
+        df = self._convert_df_to_plot(
+            LIST_ENERGIES, metrics, rna_name, normalize=True, max_points=max_points
+        )
         df = self.filter_df(df)
         df = df.rename(columns={"Energy": "Scoring function"})
-        fig = px.scatter(
-            df,
-            x="metric",
-            y="energy",
-            facet_col="Metric",
-            facet_col_wrap=4,
-            color="Scoring function",
-            color_discrete_map=COLORS_ENERGIES,
-        )
+        if density:
+            fig = px.density_heatmap(
+                df, x="metric", y="energy", facet_col="Metric", facet_row="Scoring function"
+            )
+        else:
+            fig = px.scatter(
+                df,
+                x="metric",
+                y="energy",
+                facet_col="Metric",
+                facet_col_wrap=4,
+                color="Scoring function",
+                color_discrete_map=COLORS_ENERGIES,
+                render_mode="webgl",
+            )
         fig.update_xaxes(matches=None, showticklabels=True)
         params_axes = dict(
             showgrid=True,
@@ -259,7 +303,7 @@ class VizHelper:
         if to_show:
             fig.show()
         if save_path is not None:
-            pio.write_image(fig, save_path, scale=2, width=800, height=600)
+            write_image(fig, save_path, self.renderer, scale=2, width=800, height=600)
 
     def compute_er_score(self, list_metrics: List = LIST_ALL_METRICS, add_mean: bool = False):
         """
@@ -270,6 +314,10 @@ class VizHelper:
             LIST_ENERGIES,
             self.csv_folder,
             save_path=os.path.join("docker_data", "scores", os.path.basename(self.csv_folder)),
+            n_jobs=self.n_jobs,
+            store=self.store,
+            incremental=self.incremental,
+            renderer=self.renderer,
         )
         all_scores = eval_helper.compute_all_scores(add_mean=add_mean, paper_format=False)
         eval_helper.show_all_scores(all_scores=all_scores, show=False, add_mean=add_mean)
@@ -286,6 +334,10 @@ class VizHelper:
                 "docker_data", "scores", "metrics_" + os.path.basename(self.csv_folder)
             ),
             metrics_to_metrics=True,
+            n_jobs=self.n_jobs,
+            store=self.store,
+            incremental=self.incremental,
+            renderer=self.renderer,
         )
         all_scores = eval_helper.compute_all_scores(paper_format=False)
         eval_helper.show_all_scores(all_scores=all_scores, show=False)
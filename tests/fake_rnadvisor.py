@@ -0,0 +1,34 @@
+"""
+Fake RNAdvisor: writes one row per structure, named like RNAdvisor (`normalized_<file>`),
+with scores computed from the content of the file
+"""
+
+import argparse
+import os
+import zlib
+
+import pandas as pd
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--native_path")
+    parser.add_argument("--pred_path")
+    parser.add_argument("--result_path")
+    parser.add_argument("--all_scores")
+    args = parser.parse_args()
+    paths = [args.native_path] + [
+        os.path.join(args.pred_path, name) for name in sorted(os.listdir(args.pred_path))
+    ]
+    rows = {}
+    for path in paths:
+        with open(path, "rb") as file:
+            content = file.read()
+        rows[f"normalized_{os.path.basename(path)}"] = {
+            "RMSD": zlib.crc32(content) % 1000 / 10,
+            "MCQ": len(content),
+        }
+    if "FAKE_RNADVISOR_LOG" in os.environ:
+        # Number of decoys of each run
+        with open(os.environ["FAKE_RNADVISOR_LOG"], "a") as file:
+            file.write(f"{len(paths) - 1}\n")
+    pd.DataFrame.from_dict(rows, orient="index").to_csv(args.result_path)
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+from src.utils.benchmark_history import BenchmarkHistory
+
+
+def get_times(rng, scale):
+    return pd.DataFrame(
+        {"RMSD": rng.normal(1, 0.05, 10), "MCQ": rng.normal(2 * scale, 0.05, 10)},
+        index=[f"decoy_{i}.pdb" for i in range(10)],
+    )
+
+
+def test_slowdowns_between_two_versions(tmp_path):
+    rng = np.random.default_rng(0)
+    history = BenchmarkHistory(str(tmp_path / "history.sqlite"))
+    history.record("time", "v1", "50", get_times(rng, 1))
+    history.record("time", "v2", "50", get_times(rng, 1.5))
+    history.close()
+    history = BenchmarkHistory(str(tmp_path / "history.sqlite"))
+    assert history.get_versions("time")["version"].tolist() == ["v1", "v2"]
+    assert len(history.get_measures("time", "v2")) == 20
+    df = history.compare("time", "v1", "v2")
+    assert df["score"].tolist() == ["MCQ", "RMSD"]
+    assert df["slowdown"].tolist() == [True, False]
+    assert abs(df.loc[0, "ratio"] - 1.5) < 0.1
+    # A speedup is not a slowdown
+    assert not history.compare("time", "v2", "v1")["slowdown"].any()
@@ -0,0 +1,192 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+from src.carbon.carbon_benchmark import ALL_SCORES, CarbonBenchmark
+from src.carbon.energy_model import PowerModel
+from src.scheduler.rnadvisor_command import WORKER_PATH, RNAdvisorCommand
+from src.scheduler.worker_pool import WorkerPool
+from src.utils.csv_cache import get_file_hash
+from src.utils.result_cache import ResultCache
+
+# Fake RNAdvisor main: logs the score of each job
+FAKE_MAIN = """
+import argparse
+import os
+
+parser = argparse.ArgumentParser()
+for arg in ["native_path", "pred_path", "result_path", "all_scores"]:
+    parser.add_argument(f"--{arg}")
+args = parser.parse_args()
+if args.all_scores == os.environ.get("FAKE_MAIN_FAIL"):
+    raise ValueError(args.all_scores)
+with open(os.environ["FAKE_MAIN_LOG"], "a") as file:
+    file.write(f"{args.all_scores}\\n")
+"""
+
+
+def write_dataset(dataset_dir, n_preds=3):
+    os.makedirs(os.path.join(dataset_dir, "NATIVE"))
+    os.makedirs(os.path.join(dataset_dir, "PREDS", "r1"))
+    with open(os.path.join(dataset_dir, "NATIVE", "r1.pdb"), "w") as file:
+        file.write("native\n")
+    for i in range(n_preds):
+        with open(os.path.join(dataset_dir, "PREDS", "r1", f"r1_M{i}.pdb"), "w") as file:
+            file.write(f"decoy {i}\n")
+
+
+def test_model_backend_caches_the_resources(tmp_path, monkeypatch):
+    dataset_dir = str(tmp_path / "DS")
+    write_dataset(dataset_dir)
+    main_path = tmp_path / "main.py"
+    main_path.write_text(FAKE_MAIN)
+    log_path = tmp_path / "jobs.txt"
+    monkeypatch.setenv("FAKE_MAIN_LOG", str(log_path))
+    # The benchmark writes its temporary outputs in ./tmp
+    monkeypatch.chdir(tmp_path)
+    cache = ResultCache(str(tmp_path / "cache.sqlite"))
+
+    def run(power_model):
+        with WorkerPool([sys.executable, WORKER_PATH, f"--main={main_path}"]) as pool:
+            benchmark = CarbonBenchmark(
+                {"DS": dataset_dir},
+                str(tmp_path / "out"),
+                cache=cache,
+                worker_pool=pool,
+                backend="model",
+                power_model=power_model,
+            )
+            benchmark.run()
+        return pd.read_csv(tmp_path / "out" / "DS.csv").set_index("NAME")
+
+    emissions = run(PowerModel())
+    # The two first predictions are measured
+    assert len(log_path.read_text().split()) == 2 * len(ALL_SCORES)
+    assert sorted(emissions.columns) == sorted(ALL_SCORES)
+    # The emissions of another host are computed from the cached resources
+    twice = run(PowerModel(carbon_intensity=2 * 475.0))
+    assert len(log_path.read_text().split()) == 2 * len(ALL_SCORES)
+    pd.testing.assert_frame_equal(twice, 2 * emissions)
+
+
+def test_model_backend_with_workers_and_cache(tmp_path, monkeypatch):
+    dataset_dir = str(tmp_path / "DS")
+    write_dataset(dataset_dir)
+    main_path = tmp_path / "main.py"
+    main_path.write_text(FAKE_MAIN)
+    log_path = tmp_path / "jobs.txt"
+    monkeypatch.setenv("FAKE_MAIN_LOG", str(log_path))
+    # The benchmark writes its temporary outputs in ./tmp
+    monkeypatch.chdir(tmp_path)
+    cache = ResultCache(str(tmp_path / "cache.sqlite"))
+
+    def run():
+        benchmark = CarbonBenchmark(
+            {"DS": dataset_dir},
+            str(tmp_path / "out"),
+            cache=cache,
+            backend="model",
+            n_preds=None,
+            n_workers=2,
+            command=RNAdvisorCommand(executable=f"{sys.executable} {main_path}"),
+        )
+        benchmark.run()
+
+    run()
+    assert len(log_path.read_text().split()) == 3 * len(ALL_SCORES)
+    # All the scores are read from the cache
+    run()
+    assert len(log_path.read_text().split()) == 3 * len(ALL_SCORES)
+    assert (tmp_path / "out" / "DS.csv").exists()
+
+
+def test_failed_runs_are_not_cached(tmp_path, monkeypatch):
+    dataset_dir = str(tmp_path / "DS")
+    write_dataset(dataset_dir, n_preds=1)
+    main_path = tmp_path / "main.py"
+    main_path.write_text(FAKE_MAIN)
+    monkeypatch.setenv("FAKE_MAIN_LOG", str(tmp_path / "jobs.txt"))
+    monkeypatch.setenv("FAKE_MAIN_FAIL", "MCQ")
+    monkeypatch.chdir(tmp_path)
+    cache = ResultCache(str(tmp_path / "cache.sqlite"))
+    benchmark = CarbonBenchmark(
+        {"DS": dataset_dir},
+        str(tmp_path / "out"),
+        cache=cache,
+        backend="model",
+        command=RNAdvisorCommand(executable=f"{sys.executable} {main_path}"),
+    )
+    with pytest.raises(RuntimeError, match="MCQ"):
+        benchmark.run()
+    native_path = os.path.join(dataset_dir, "NATIVE", "r1.pdb")
+    pred_path = os.path.join(dataset_dir, "PREDS", "r1", "r1_M0.pdb")
+    hashes = get_file_hash(native_path), get_file_hash(pred_path)
+    assert cache.get(*hashes, "carbon_model:RMSD", benchmark.version) is not None
+    assert cache.get(*hashes, "carbon_model:MCQ", benchmark.version) is None
+
+
+def test_concurrent_runs_of_the_model_backend(tmp_path, monkeypatch):
+    dataset_dir = str(tmp_path / "DS")
+    write_dataset(dataset_dir, n_preds=4)
+    main_path = tmp_path / "main.py"
+    main_path.write_text(FAKE_MAIN)
+    log_path = tmp_path / "jobs.txt"
+    monkeypatch.setenv("FAKE_MAIN_LOG", str(log_path))
+    monkeypatch.chdir(tmp_path)
+    with WorkerPool([sys.executable, WORKER_PATH, f"--main={main_path}"], n_workers=2) as pool:
+        benchmark = CarbonBenchmark(
+            {"DS": dataset_dir},
+            str(tmp_path / "out"),
+            worker_pool=pool,
+            backend="model",
+            n_preds=None,
+            n_workers=2,
+        )
+        benchmark.run()
+    assert sorted(log_path.read_text().split()) == sorted(4 * ALL_SCORES)
+    ci = pd.read_csv(tmp_path / "out" / "ci" / "DS.csv")
+    assert sorted(ci["NAME"].unique()) == ["ALL", "r1"]
+    assert (ci[ci["NAME"] == "r1"]["n"] == 4).all()
+    assert (ci["ci_low"] <= ci["mean"]).all() and (ci["mean"] <= ci["ci_high"]).all()
+
+
+def test_sampling_draws_from_all_the_predictions(tmp_path, monkeypatch):
+    dataset_dir = str(tmp_path / "DS")
+    write_dataset(dataset_dir, n_preds=5)
+    main_path = tmp_path / "main.py"
+    main_path.write_text(FAKE_MAIN)
+    log_path = tmp_path / "jobs.txt"
+    monkeypatch.setenv("FAKE_MAIN_LOG", str(log_path))
+    monkeypatch.chdir(tmp_path)
+    with WorkerPool([sys.executable, WORKER_PATH, f"--main={main_path}"]) as pool:
+        benchmark = CarbonBenchmark(
+            {"DS": dataset_dir},
+            str(tmp_path / "out"),
+            worker_pool=pool,
+            backend="model",
+            max_rel_margin=0.05,
+            min_preds=3,
+        )
+        benchmark.run()
+    # n_preds (2 by default) does not cut the predictions before sampling
+    assert len(log_path.read_text().split()) >= 3 * len(ALL_SCORES)
+
+
+def test_unknown_backend(tmp_path):
+    with pytest.raises(ValueError, match="Unknown backend"):
+        CarbonBenchmark({}, str(tmp_path), backend="docker")
+    # The power of the whole host can not be split between concurrent runs
+    with pytest.raises(ValueError, match="model backend"):
+        CarbonBenchmark({}, str(tmp_path), backend="rapl", n_workers=2)
+
+
+def test_get_shares():
+    phases = {
+        "RMSD": {"energy": None, "cpu": 1.0, "wall": 2.0},
+        "MCQ": {"energy": None, "cpu": 3.0, "wall": 2.0},
+    }
+    assert CarbonBenchmark.get_shares(phases) == {"RMSD": 0.25, "MCQ": 0.75}
+    phases["RMSD"]["energy"], phases["MCQ"]["energy"] = 2.0, 2.0
+    assert CarbonBenchmark.get_shares(phases) == {"RMSD": 0.5, "MCQ": 0.5}
@@ -0,0 +1,30 @@
+import numpy as np
+from scipy import stats
+
+from src.carbon.carbon_stats import RunningStats, get_ci_rows
+
+
+def test_running_stats_match_the_values():
+    values = np.random.default_rng(0).lognormal(size=50)
+    running_stats = RunningStats()
+    for value in values:
+        running_stats.update(value)
+    assert running_stats.count == 50
+    np.testing.assert_allclose(running_stats.mean, values.mean())
+    np.testing.assert_allclose(running_stats.std, values.std(ddof=1))
+    ci_low, ci_high = stats.t.interval(
+        0.95, len(values) - 1, loc=values.mean(), scale=stats.sem(values)
+    )
+    row = get_ci_rows("r1", {"RMSD": running_stats})[0]
+    np.testing.assert_allclose([row["ci_low"], row["ci_high"]], [ci_low, ci_high])
+    # More values for a narrower interval
+    assert running_stats.get_sample_size(0.01) > 50
+    assert running_stats.get_sample_size(10) == 50
+
+
+def test_single_value():
+    running_stats = RunningStats()
+    running_stats.update(3.0)
+    assert running_stats.std == 0.0
+    assert running_stats.get_margin() == 0.0
+    assert running_stats.get_sample_size(0.05) == 1
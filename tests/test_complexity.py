@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from src.time_benchmark.complexity import ComplexityAnalysis
+
+
+def get_dfs(seed=0):
+    """Times that grow as n^2 and as n^1.5, with a multiplicative noise"""
+    rng = np.random.default_rng(seed)
+    dfs = {}
+    for n_nt in [20, 40, 80, 160, 320]:
+        noise = rng.lognormal(0, 0.05, (10, 2))
+        dfs[f"decoy_{n_nt}"] = pd.DataFrame(
+            {
+                "QUADRATIC": 1e-4 * n_nt**2 * noise[:, 0],
+                "POWER": 1e-2 * n_nt**1.5 * noise[:, 1],
+            }
+        )
+        dfs[f"decoy_{n_nt}"]["COPY"] = dfs[f"decoy_{n_nt}"]["QUADRATIC"]
+    return dfs
+
+
+def test_best_scaling_model_of_each_score():
+    analysis = ComplexityAnalysis(dfs=get_dfs())
+    assert analysis.get_best_model("QUADRATIC").name == "quadratic"
+    power_law = analysis.get_best_model("POWER")
+    assert power_law.name == "power law"
+    low, high = power_law.get_params_ci().loc[1, ["low", "high"]]
+    assert low < 1.5 < high
+    prediction, low, high = analysis.predict_runtime("QUADRATIC", 200)
+    assert low < 1e-4 * 200**2 < high
+    assert analysis.predict_runtime("QUADRATIC", 200, n_decoys=10)[0] == 10 * prediction
+    assert analysis.get_unique_scores() == ["QUADRATIC", "POWER"]
+    # About 4 s for QUADRATIC and 28 s for POWER
+    assert analysis.flag_sla(10, 200)["score"].tolist() == ["POWER"]
+    flagged = analysis.flag_sla(3, 200, scores=["QUADRATIC", "POWER"])
+    assert flagged["score"].tolist() == ["POWER", "QUADRATIC"]
+    assert flagged["exceeds"].all()
@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils.csv_cache import CsvCache
+
+pytest.importorskip("pyarrow")
+
+
+class CountingCache(CsvCache):
+    """Record the CSV files that are parsed"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.parsed = []
+
+    def read_csv(self, csv_path: str) -> pd.DataFrame:
+        self.parsed.append(os.path.basename(csv_path))
+        return super().read_csv(csv_path)
+
+
+def write_csv(csv_folder, rna, seed=0):
+    rng = np.random.default_rng(seed)
+    names = [f"normalized_{rna}.pdb"] + [f"normalized_{rna}_M{i}.pdb" for i in range(5)]
+    df = pd.DataFrame(rng.random((6, 2)), index=names, columns=["RMSD", "RASP-ENERGY"])
+    df.loc[names[1], "RMSD"] = np.nan
+    df.to_csv(os.path.join(csv_folder, f"{rna}.csv"))
+
+
+def read_csvs(csv_folder):
+    return {
+        name.replace(".csv", ""): pd.read_csv(os.path.join(csv_folder, name), index_col=[0])
+        for name in os.listdir(csv_folder)
+    }
+
+
+def test_only_the_changed_csvs_are_parsed(tmp_path):
+    csv_folder = tmp_path / "output"
+    csv_folder.mkdir()
+    for rna in ["r1", "r2", "r3"]:
+        write_csv(str(csv_folder), rna)
+    cache = CountingCache(str(tmp_path / "cache"))
+    cache.read_csv_folder(str(csv_folder))
+    assert sorted(cache.parsed) == ["r1.csv", "r2.csv", "r3.csv"]
+    # Changed content, same content with a new modification time, new and removed files
+    write_csv(str(csv_folder), "r1", seed=1)
+    os.utime(csv_folder / "r2.csv", ns=(0, 0))
+    write_csv(str(csv_folder), "r4")
+    os.remove(csv_folder / "r3.csv")
+    cache = CountingCache(str(tmp_path / "cache"))
+    dfs = cache.read_csv_folder(str(csv_folder), rename={"RASP-ENERGY": "RASP"})
+    assert sorted(cache.parsed) == ["r1.csv", "r4.csv"]
+    expected = read_csvs(str(csv_folder))
+    assert sorted(dfs) == sorted(expected)
+    for name, df in expected.items():
+        pd.testing.assert_frame_equal(dfs[name], df.rename(columns={"RASP-ENERGY": "RASP"}))
+    # Nothing changed
+    cache = CountingCache(str(tmp_path / "cache"))
+    dfs = cache.read_csv_folder(str(csv_folder))
+    assert cache.parsed == []
+    for name, df in expected.items():
+        pd.testing.assert_frame_equal(dfs[name], df)
@@ -0,0 +1,65 @@
+import os
+import tarfile
+
+import pytest
+
+from src.utils.dataset_installer import DatasetInstaller
+
+
+def write_archive(tmp_path, archive_dir, decoys):
+    """Archive of Test Set I, with the content of each file of `randstr/decoys/<rna>/`"""
+    raw_dir = tmp_path / "raw"
+    for rna, files in decoys.items():
+        (raw_dir / "randstr" / "decoys" / rna).mkdir(parents=True, exist_ok=True)
+        for name, content in files.items():
+            (raw_dir / "randstr" / "decoys" / rna / name).write_text(content)
+    archive_dir.mkdir(exist_ok=True)
+    archive_path = archive_dir / "randstr.tar.gz"
+    with tarfile.open(archive_path, "w:gz") as archive:
+        archive.add(raw_dir / "randstr", arcname="randstr")
+    return archive_path
+
+
+def list_files(dataset_dir):
+    return sorted(
+        os.path.relpath(os.path.join(root, name), dataset_dir)
+        for root, _, names in os.walk(dataset_dir)
+        for name in names
+        if not name.endswith(".json")
+    )
+
+
+def test_only_the_changed_files_are_installed(tmp_path):
+    archive_dir = tmp_path / "archives"
+    decoys = {
+        "r1": {"r1.pdb": "native 1\n", "r1_M1.pdb": "decoy 1\n"},
+        "r2": {"r2.pdb": "native 2\n", "r2_M1.pdb": "decoy 2\n", "r2_M2.pdb": "decoy 3\n"},
+    }
+    write_archive(tmp_path, archive_dir, decoys)
+    installer = DatasetInstaller(str(tmp_path / "input"), str(archive_dir), offline=True)
+    assert installer.install("TestSetI") == 7
+    dataset_dir = tmp_path / "input" / "TestSetI"
+    assert list_files(dataset_dir) == [
+        "NATIVE/r1.pdb",
+        "NATIVE/r2.pdb",
+        "PREDS/r1/r1.pdb",
+        "PREDS/r1/r1_M1.pdb",
+        "PREDS/r2/r2.pdb",
+        "PREDS/r2/r2_M1.pdb",
+        "PREDS/r2/r2_M2.pdb",
+    ]
+    assert installer.install("TestSetI") == 0
+    # A changed decoy and a removed decoy
+    decoys["r2"] = {"r2.pdb": "native 2\n", "r2_M1.pdb": "decoy 2 changed\n"}
+    os.remove(tmp_path / "raw" / "randstr" / "decoys" / "r2" / "r2_M2.pdb")
+    archive_path = write_archive(tmp_path, archive_dir, decoys)
+    os.utime(archive_path, ns=(0, 0))
+    assert installer.install("TestSetI") == 1
+    assert "PREDS/r2/r2_M2.pdb" not in list_files(dataset_dir)
+    assert (dataset_dir / "PREDS" / "r2" / "r2_M1.pdb").read_text() == "decoy 2 changed\n"
+
+
+def test_missing_archive_offline(tmp_path):
+    installer = DatasetInstaller(str(tmp_path / "input"), str(tmp_path / "archives"), offline=True)
+    with pytest.raises(FileNotFoundError):
+        installer.install("TestSetII")
@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+
+from src.utils.decoy_archive import DecoyArchive, pack_rna, unpack_rna
+
+ATOM = "ATOM  {:5d}  {:<4}{:>3} A{:4d}    {:8.3f}{:8.3f}{:8.3f}  1.00  0.00           {}\n"
+
+
+def write_decoy(pdb_path, seed, n_residues=5):
+    rng = np.random.default_rng(seed)
+    lines = []
+    for i_residue in range(n_residues):
+        for i_atom, atom in enumerate(["P", "C4'", "N1"]):
+            x, y, z = rng.uniform(-99, 99, 3)
+            serial = 3 * i_residue + i_atom + 1
+            lines.append(ATOM.format(serial, atom, "G", i_residue + 1, x, y, z, atom[0]))
+    with open(pdb_path, "w") as file:
+        file.write("".join(lines) + "TER\nEND\n")
+
+
+def write_decoys(pred_dir):
+    os.makedirs(pred_dir)
+    for i in range(4):
+        write_decoy(os.path.join(pred_dir, f"r1_M{i}.pdb"), seed=i)
+    write_decoy(os.path.join(pred_dir, "r1_M4.pdb"), seed=4, n_residues=3)
+    # Coordinates that can not be written back with the PDB format
+    with open(os.path.join(pred_dir, "r1_M0.pdb")) as file:
+        content = file.read()
+    with open(os.path.join(pred_dir, "r1_M5.pdb"), "w") as file:
+        file.write(content.replace(".", ",", 1) + "REMARK 100%\n")
+
+
+def read_pdbs(pred_dir):
+    pdbs = {}
+    for name in os.listdir(pred_dir):
+        with open(os.path.join(pred_dir, name), "rb") as file:
+            pdbs[name] = file.read()
+    return pdbs
+
+
+def test_decoys_are_written_back_byte_for_byte(tmp_path):
+    pred_dir = str(tmp_path / "r1")
+    write_decoys(pred_dir)
+    archive_path = str(tmp_path / "r1.npz")
+    DecoyArchive.write(pred_dir, archive_path)
+    archive = DecoyArchive(archive_path)
+    # The topology of the first decoys is stored once
+    assert len(archive.templates) == 3
+    expected = read_pdbs(pred_dir)
+    assert {name: archive.get_pdb(name) for name in archive.names} == expected
+    archive.extract(str(tmp_path / "out"))
+    assert read_pdbs(str(tmp_path / "out")) == expected
+    sizes = {name: len(content) for name, content in expected.items()}
+    assert DecoyArchive.get_sizes(archive_path) == sizes
+
+
+def test_unpack_restores_the_decoys(tmp_path):
+    input_dir = str(tmp_path / "input")
+    pred_dir = os.path.join(input_dir, "DS", "PREDS", "r1")
+    write_decoys(pred_dir)
+    expected = read_pdbs(pred_dir)
+    pack_rna(input_dir, "DS", "r1", remove=True)
+    assert not os.path.exists(pred_dir)
+    unpack_rna(input_dir, "DS", "r1", pred_dir)
+    assert read_pdbs(pred_dir) == expected
@@ -0,0 +1,30 @@
+from src.carbon.energy_model import RaplReader
+
+
+def write_domain(root, name, energy, max_range=1000):
+    domain = root / name
+    domain.mkdir(parents=True)
+    (domain / "energy_uj").write_text(f"{energy}\n")
+    (domain / "max_energy_range_uj").write_text(f"{max_range}\n")
+
+
+def test_rapl_energy_of_the_packages(tmp_path):
+    write_domain(tmp_path, "intel-rapl:0", 900)
+    write_domain(tmp_path, "intel-rapl:1", 100)
+    # Sub-domain of the first package, already counted by it
+    write_domain(tmp_path, "intel-rapl:0:0", 50)
+    reader = RaplReader(str(tmp_path))
+    assert reader.available
+    start = reader.read()
+    assert start == [900, 100]
+    (tmp_path / "intel-rapl:0" / "energy_uj").write_text("99\n")
+    (tmp_path / "intel-rapl:1" / "energy_uj").write_text("400\n")
+    # The counter of the first package wrapped around
+    assert reader.get_energy(start, reader.read()) == (200 + 300) / 1e6
+
+
+def test_without_rapl(tmp_path):
+    reader = RaplReader(str(tmp_path / "powercap"))
+    assert not reader.available
+    assert reader.read() is None
+    assert reader.get_energy(None, None) is None
@@ -0,0 +1,36 @@
+import os
+import shutil
+
+import pandas as pd
+
+from src.utils.evaluation_helper import EvaluationHelper
+
+OUTPUT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "docker_data", "output", "TestSetI"
+)
+METRICS = ["RMSD", "MCQ", r"$INF_{all}$", "TM-score"]
+ENERGIES = ["RASP", "DFIRE", "εSCORE", "rsRNASP"]
+
+
+def copy_csvs(csv_dir, n_rnas=6):
+    os.makedirs(csv_dir)
+    for name in sorted(os.listdir(OUTPUT_DIR))[:n_rnas]:
+        shutil.copy(os.path.join(OUTPUT_DIR, name), csv_dir)
+
+
+def test_process_pool_matches_the_serial_scores(tmp_path, monkeypatch):
+    csv_dir = str(tmp_path / "csvs")
+    copy_csvs(csv_dir)
+    # The CSVs are cached in ./docker_data/cache
+    monkeypatch.chdir(tmp_path)
+    all_scores = {}
+    for n_jobs in [1, 2]:
+        save_path = str(tmp_path / f"scores_{n_jobs}")
+        helper = EvaluationHelper(METRICS, ENERGIES, csv_dir, save_path, n_jobs=n_jobs)
+        all_scores[n_jobs] = helper.compute_all_scores()
+    for score_name, scores in all_scores[1].items():
+        pd.testing.assert_frame_equal(pd.DataFrame(all_scores[2][score_name]), pd.DataFrame(scores))
+        with open(tmp_path / "scores_1" / f"{score_name}.csv") as file1, open(
+            tmp_path / "scores_2" / f"{score_name}.csv"
+        ) as file2:
+            assert file1.read() == file2.read()
@@ -0,0 +1,132 @@
+import os
+import random
+
+from Bio import PDB
+
+from src.utils.extract_pdb import CHAIN_LEN, ExtractPDB
+
+N_RESIDUES = 10
+
+
+def write_native(pdb_path, n_residues):
+    with open(pdb_path, "w") as file:
+        for i in range(n_residues):
+            file.write(
+                f"ATOM  {i + 1:>5}  P     G A{i + 1:>4}    "
+                f"{i:8.3f}{0:8.3f}{0:8.3f}  1.00  0.00           P\n"
+            )
+        file.write("TER\nEND\n")
+
+
+def extract_loop(input_path, output_path, new_length, n_decoys):
+    """Decoys of one length, parsing the native again for each decoy"""
+    indexes = ExtractPDB(input_path, output_path).select_chain_indexes(2850, new_length, n_decoys)
+    for i, (start, end) in enumerate(indexes):
+        structure = PDB.PDBParser().get_structure("structure", input_path)
+        chain = structure[0]["A"]
+        chain.child_list = chain.child_list[start:end]
+        io = PDB.PDBIO()
+        io.set_structure(structure)
+        out_dir = os.path.join(output_path, f"decoy_{new_length}")
+        os.makedirs(out_dir, exist_ok=True)
+        io.save(os.path.join(out_dir, f"decoy_{new_length}_{i}.pdb"))
+
+
+def read_decoys(output_path):
+    decoys = {}
+    for length_dir in sorted(os.listdir(output_path)):
+        for name in sorted(os.listdir(os.path.join(output_path, length_dir))):
+            with open(os.path.join(output_path, length_dir, name), "rb") as file:
+                decoys[name] = file.read()
+    return decoys
+
+
+def test_decoys_match_the_per_decoy_parsing(tmp_path):
+    native_path = str(tmp_path / "native.pdb")
+    write_native(native_path, 2850)
+    random.seed(77)
+    for new_length in range(50, 201, 50):
+        extract_loop(native_path, str(tmp_path / "loop"), new_length, 2)
+    expected = read_decoys(str(tmp_path / "loop"))
+    assert len(expected) == 8
+    for n_jobs in [1, 2]:
+        output_path = str(tmp_path / f"decoys_{n_jobs}")
+        random.seed(77)
+        ExtractPDB(native_path, output_path, n_jobs=n_jobs).run(50, 200, 50, 2)
+        assert read_decoys(output_path) == expected
+
+
+def write_two_chains(pdb_path):
+    """Chain A of 30 residues with 2 atoms each, then chain B of 2 residues"""
+    serial, lines = 0, []
+    for chain_id, n_residues in [("A", 30), ("B", 2)]:
+        for i in range(n_residues):
+            for atom in ["P", "C1'"]:
+                serial += 1
+                lines.append(
+                    f"ATOM  {serial:>5} {atom:<4}   G {chain_id}{i + 1:>4}    "
+                    f"{i:8.3f}{serial:8.3f}{0:8.3f}  1.00  0.00           {atom[0]}\n"
+                )
+        serial += 1
+        lines.append(f"TER   {serial:>5}        G {chain_id}{n_residues:>4}\n")
+    with open(pdb_path, "w") as file:
+        file.writelines(lines + ["END\n"])
+    return lines
+
+
+def get_atoms(pdb_path):
+    structure = PDB.PDBParser(QUIET=True).get_structure("structure", pdb_path)
+    return [
+        (atom.get_parent().get_parent().id, atom.get_parent().id, atom.get_id(), *atom.coord)
+        for atom in structure.get_atoms()
+    ]
+
+
+def test_stream_writer_copies_the_window(tmp_path):
+    native_path = str(tmp_path / "native.pdb")
+    lines = write_two_chains(native_path)
+    outputs = {}
+    for writer, renumber in [("biopython", False), ("stream", False), ("stream", True)]:
+        output_path = str(tmp_path / f"{writer}_{renumber}")
+        extract_pdb = ExtractPDB(
+            native_path, output_path, chain_len=None, writer=writer, renumber=renumber
+        )
+        assert extract_pdb.chain_len == 30
+        extract_pdb.write_windows([(10, 0, 5, 15)])
+        outputs[(writer, renumber)] = os.path.join(output_path, "decoy_10", "decoy_10_0.pdb")
+    # The lines of the residues 6 to 15 of chain A, and the other chains
+    expected = lines[10:30] + lines[60:] + ["END\n"]
+    with open(outputs[("stream", False)]) as file:
+        assert file.readlines() == expected
+    with open(outputs[("stream", True)]) as file:
+        serials = [int(line[6:11]) for line in file if line.startswith(("ATOM", "TER"))]
+    assert serials == list(range(1, len(expected)))
+    atoms = get_atoms(outputs[("biopython", False)])
+    assert len(atoms) == 24
+    for output in outputs.values():
+        assert get_atoms(output) == atoms
+
+
+def test_default_windows_are_drawn_from_the_published_length(tmp_path):
+    native_path = str(tmp_path / "native.pdb")
+    write_native(native_path, N_RESIDUES)
+    extract_pdb = ExtractPDB(native_path, str(tmp_path / "decoys"))
+    assert extract_pdb.chain_len == CHAIN_LEN
+    random.seed(77)
+    windows = extract_pdb.get_windows(50, 5)
+    random.seed(77)
+    starts = random.sample(range(0, CHAIN_LEN - 50), 5)
+    assert windows == [(50, i, start, start + 50) for i, start in enumerate(starts)]
+
+
+def test_short_native_skips_the_longer_lengths(tmp_path):
+    native_path = str(tmp_path / "native.pdb")
+    write_native(native_path, N_RESIDUES)
+    for writer in ["biopython", "stream"]:
+        output_path = tmp_path / writer
+        extract_pdb = ExtractPDB(native_path, str(output_path), chain_len=None, writer=writer)
+        assert extract_pdb.chain_len == N_RESIDUES
+        extract_pdb.run(2, 2850, 2, 2)
+        lengths = sorted(int(name.split("_")[1]) for name in os.listdir(output_path))
+        assert lengths == [2, 4, 6, 8, 10]
+        assert len(os.listdir(output_path / "decoy_10")) == 2
@@ -0,0 +1,70 @@
+import os
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from src.visualisation import figure_renderer
+from src.visualisation.figure_renderer import FigureRenderer
+
+
+def get_figure(y):
+    return go.Figure(go.Scatter(x=[0, 1], y=[y, y]))
+
+
+def test_only_the_changed_figures_are_exported(tmp_path, monkeypatch):
+    written = []
+
+    def write_images(figs, save_paths, **kwargs):
+        for save_path in save_paths:
+            written.append(os.path.basename(save_path))
+            with open(save_path, "w") as file:
+                file.write("image")
+
+    monkeypatch.setattr(pio, "write_images", write_images, raising=False)
+    monkeypatch.setattr(figure_renderer, "version", lambda package: "1.0.0")
+    manifest_path = str(tmp_path / "figures.json")
+    save_paths = [str(tmp_path / f"fig_{i}.png") for i in range(3)]
+
+    def render(ys, scale=2, force=False):
+        renderer = FigureRenderer(manifest_path=manifest_path, force=force)
+        for y, save_path in zip(ys, save_paths):
+            renderer.add(get_figure(y), save_path, scale=scale)
+        written.clear()
+        return renderer.render()
+
+    assert render([0, 1, 2]) == save_paths
+    assert written == ["fig_0.png", "fig_1.png", "fig_2.png"]
+    assert render([0, 1, 2]) == []
+    assert written == []
+    # New data, a removed image and new export options
+    assert render([0, 5, 2]) == [save_paths[1]]
+    os.remove(save_paths[2])
+    assert render([0, 5, 2]) == [save_paths[2]]
+    assert render([0, 5, 2], scale=3) == save_paths
+    assert render([0, 5, 2], scale=3, force=True) == save_paths
+
+
+def test_old_kaleido_exports_each_figure(tmp_path, monkeypatch):
+    written = []
+
+    def write_images(*args, **kwargs):
+        raise ValueError("Kaleido >= 1 is needed")
+
+    def write_image(fig, save_path, **kwargs):
+        written.append((save_path, kwargs))
+        with open(save_path, "w") as file:
+            file.write("image")
+
+    monkeypatch.setattr(pio, "write_images", write_images, raising=False)
+    monkeypatch.setattr(pio, "write_image", write_image)
+    monkeypatch.setattr(figure_renderer, "version", lambda package: "0.2.1")
+    renderer = FigureRenderer(manifest_path=str(tmp_path / "figures.json"))
+    save_paths = [str(tmp_path / f"fig_{i}.png") for i in range(2)]
+    for i, save_path in enumerate(save_paths):
+        renderer.add(go.Figure(go.Scatter(x=[0, 1], y=[i, i])), save_path, scale=2)
+    assert renderer.render() == save_paths
+    assert written == [(save_path, {"scale": 2}) for save_path in save_paths]
+    # The unchanged figures are not exported again
+    for i, save_path in enumerate(save_paths):
+        renderer.add(go.Figure(go.Scatter(x=[0, 1], y=[i, i])), save_path, scale=2)
+    assert renderer.render() == []
@@ -0,0 +1,37 @@
+import pandas as pd
+
+from src.time_benchmark.memory_benchmark import MemoryBenchmark
+
+FAKE_MAIN = """
+import argparse
+import time
+
+parser = argparse.ArgumentParser()
+for arg in ["native_path", "pred_path", "result_path", "all_scores"]:
+    parser.add_argument(f"--{arg}")
+args = parser.parse_args()
+if args.all_scores == "BIG":
+    data = bytearray(100 * 1024**2)
+    # Held long enough for the samples of the resident set size
+    time.sleep(0.2)
+"""
+
+
+def test_peak_memory_of_each_score(tmp_path):
+    decoys_dir = tmp_path / "input" / "decoys" / "length_10"
+    decoys_dir.mkdir(parents=True)
+    for decoy in ["a.pdb", "b.pdb"]:
+        (decoys_dir / decoy).write_text("decoy\n")
+    main_path = tmp_path / "main.py"
+    main_path.write_text(FAKE_MAIN)
+    benchmark = MemoryBenchmark(
+        str(tmp_path / "input"), str(tmp_path / "output"), ["SMALL", "BIG"], main=str(main_path)
+    )
+    benchmark.run()
+    df = pd.read_csv(tmp_path / "output" / "length_10.csv", index_col=[0])
+    assert df.index.tolist() == ["a.pdb", "b.pdb"]
+    assert df.columns.tolist() == ["SMALL", "BIG"]
+    assert (df["BIG"] - df["SMALL"] > 90).all()
+    df = pd.read_csv(tmp_path / "output" / "tracemalloc" / "length_10.csv", index_col=[0])
+    assert (df["BIG"] > 100).all()
+    assert (df["SMALL"] < 10).all()
@@ -0,0 +1,32 @@
+from src.utils.result_cache import ResultCache
+
+
+def test_results_are_addressed_by_content_and_version(tmp_path):
+    value = {"RMSD": 1.5, "MCQ": None}
+    cache = ResultCache(str(tmp_path / "cache.sqlite"))
+    cache.put("native", "decoy", "ALL", "v1", value)
+    assert cache.get("native", "decoy", "ALL", "v1") == value
+    assert cache.get("native", "decoy", "ALL", "v2") is None
+    assert cache.get("native", "other", "ALL", "v1") is None
+    cache.close()
+    cache = ResultCache(str(tmp_path / "cache.sqlite"))
+    assert cache.get("native", "decoy", "ALL", "v1") == value
+
+
+def test_least_recently_used_are_evicted(tmp_path):
+    value = {"scores": "x" * 100}
+    # Room for about 3 results
+    cache = ResultCache(str(tmp_path / "cache.sqlite"), max_size=350)
+    cache.put_many([("native", f"decoy{i}", "ALL", "v1", value) for i in range(3)])
+    assert cache.size == cache.get_size()
+    assert cache.get("native", "decoy0", "ALL", "v1") == value
+    # Replacing a result does not count it twice
+    cache.put("native", "decoy1", "ALL", "v1", value)
+    assert cache.size == cache.get_size()
+    cache.put("native", "decoy3", "ALL", "v1", value)
+    assert cache.get("native", "decoy2", "ALL", "v1") is None
+    assert cache.get("native", "decoy0", "ALL", "v1") == value
+    cache.close()
+    cache = ResultCache(str(tmp_path / "cache.sqlite"), max_size=350)
+    assert cache.size == 3 * len('{"scores": "' + "x" * 100 + '"}')
+    assert cache.get("native", "decoy3", "ALL", "v1") == value
@@ -0,0 +1,137 @@
+import os
+
+import pytest
+
+from src.utils.rna_puzzles_prepare import (
+    RNAPuzzlesPrepare,
+    clean_structure,
+    get_residue_number,
+    parse_selection,
+)
+
+STRUCTURE = """\
+HEADER    RNA                                     01-JAN-00   XXXX
+REMARK   1 SMALL TEST STRUCTURE
+ATOM      1 P      G A   1       1.000   2.000   3.000  1.00  0.00           P
+ATOM      2 C1'    G A   1       2.000   2.000   3.000  1.00  0.00           C
+ATOM      3 P      G A   2       3.000   2.000   3.000  1.00  0.00           P
+ATOM      4 C1'    G A   2       4.000   2.000   3.000  1.00  0.00           C
+ATOM      5 P      G A   3       5.000   2.000   3.000  1.00  0.00           P
+ATOM      6 C1'    G A   3       6.000   2.000   3.000  1.00  0.00           C
+ATOM      7 P      G A   3A      7.000   2.000   3.000  1.00  0.00           P
+ATOM      8 C1'    G A   3A      8.000   2.000   3.000  1.00  0.00           C
+ATOM      9 P      G A   4       9.000   2.000   3.000  1.00  0.00           P
+ATOM     10 C1'    G A   4      10.000   2.000   3.000  1.00  0.00           C
+HETATM   11 P    PSU A   5      11.000   2.000   3.000  1.00  0.00           P
+TER
+ATOM     12 P      C B   6      12.000   2.000   3.000  1.00  0.00           P
+ATOM     13 C1'    C B   6      13.000   2.000   3.000  1.00  0.00           C
+ATOM     14 P      C B   7      14.000   2.000   3.000  1.00  0.00           P
+ATOM     15 C1'    C B   7      15.000   2.000   3.000  1.00  0.00           C
+ATOM     16 P      C B   8      16.000   2.000   3.000  1.00  0.00           P
+ATOM     17 C1'    C B   8      17.000   2.000   3.000  1.00  0.00           C
+TER
+END
+"""
+# Outputs of rna_pdb_tools.py --no-hr (rna-tools 3.27.2) on STRUCTURE
+EXTRACTED = """\
+ATOM      3 P      G A   2       3.000   2.000   3.000  1.00  0.00           P
+ATOM      4 C1'    G A   2       4.000   2.000   3.000  1.00  0.00           C
+ATOM      5 P      G A   3       5.000   2.000   3.000  1.00  0.00           P
+ATOM      6 C1'    G A   3       6.000   2.000   3.000  1.00  0.00           C
+ATOM      7 P      G A   3A      7.000   2.000   3.000  1.00  0.00           P
+ATOM      8 C1'    G A   3A      8.000   2.000   3.000  1.00  0.00           C
+ATOM     14 P      C B   7      14.000   2.000   3.000  1.00  0.00           P
+ATOM     15 C1'    C B   7      15.000   2.000   3.000  1.00  0.00           C
+ATOM     16 P      C B   8      16.000   2.000   3.000  1.00  0.00           P
+ATOM     17 C1'    C B   8      17.000   2.000   3.000  1.00  0.00           C
+"""
+DELETED = """\
+ATOM      1 P      G A   1       1.000   2.000   3.000  1.00  0.00           P
+ATOM      2 C1'    G A   1       2.000   2.000   3.000  1.00  0.00           C
+ATOM      3 P      G A   2       3.000   2.000   3.000  1.00  0.00           P
+ATOM      4 C1'    G A   2       4.000   2.000   3.000  1.00  0.00           C
+ATOM      9 P      G A   4       9.000   2.000   3.000  1.00  0.00           P
+ATOM     10 C1'    G A   4      10.000   2.000   3.000  1.00  0.00           C
+ATOM     12 P      C B   6      12.000   2.000   3.000  1.00  0.00           P
+ATOM     13 C1'    C B   6      13.000   2.000   3.000  1.00  0.00           C
+ATOM     14 P      C B   7      14.000   2.000   3.000  1.00  0.00           P
+ATOM     15 C1'    C B   7      15.000   2.000   3.000  1.00  0.00           C
+ATOM     16 P      C B   8      16.000   2.000   3.000  1.00  0.00           P
+ATOM     17 C1'    C B   8      17.000   2.000   3.000  1.00  0.00           C
+"""
+
+
+def write_structure(pdb_path, chains):
+    """Structure with one atom per residue, numbered from 1 in each chain"""
+    serial = 0
+    with open(pdb_path, "w") as file:
+        for chain_id, n_residues in chains.items():
+            for i in range(1, n_residues + 1):
+                serial += 1
+                file.write(
+                    f"ATOM  {serial:>5}  P     G {chain_id}{i:>4}    "
+                    f"{i:8.3f}{0:8.3f}{0:8.3f}  1.00  0.00           P\n"
+                )
+            file.write("TER\n")
+        file.write("END\n")
+
+
+def read_residues(pdb_path):
+    with open(pdb_path) as file:
+        return [(line[21], int(line[22:26])) for line in file if line.startswith("ATOM")]
+
+
+def test_parse_selection():
+    assert parse_selection("A:2-16+34+39-123") == {"A": [(2, 16), (34, 34), (39, 123)]}
+    assert parse_selection("A:1-96+B:6-66") == {"A": [(1, 96)], "B": [(6, 66)]}
+
+
+def test_puzzles_are_cleaned(tmp_path):
+    for n_jobs in [1, 2]:
+        input_path = tmp_path / f"input_{n_jobs}"
+        for challenge, chains in [("rp10", {"A": 100, "B": 70}), ("rp02", {"G": 15})]:
+            (input_path / "NATIVE").mkdir(parents=True, exist_ok=True)
+            (input_path / "PREDS" / challenge).mkdir(parents=True)
+            write_structure(str(input_path / "NATIVE" / f"{challenge}.pdb"), chains)
+            for i in range(3):
+                write_structure(str(input_path / "PREDS" / challenge / f"{i}.pdb"), chains)
+        output_path = str(tmp_path / f"clean_{n_jobs}")
+        RNAPuzzlesPrepare(str(input_path), output_path, n_jobs=n_jobs).run()
+        clean_path = input_path / f"clean_{n_jobs}"
+        for pdb_path in [
+            clean_path / "NATIVE" / "rp10.pdb",
+            clean_path / "PREDS" / "rp10" / "1.pdb",
+        ]:
+            assert read_residues(str(pdb_path)) == [("A", i) for i in range(1, 97)] + [
+                ("B", i) for i in range(6, 67)
+            ]
+        for pdb_path in [
+            clean_path / "NATIVE" / "rp02.pdb",
+            clean_path / "PREDS" / "rp02" / "2.pdb",
+        ]:
+            assert read_residues(str(pdb_path)) == [
+                ("G", i) for i in range(1, 16) if i not in [11, 12]
+            ]
+        assert sorted(os.listdir(clean_path / "PREDS" / "rp10")) == ["0.pdb", "1.pdb", "2.pdb"]
+
+
+@pytest.mark.parametrize(
+    "action, selection, expected",
+    [("extract", "A:2-3+B:7-8", EXTRACTED), ("delete", "A:3+5", DELETED)],
+)
+def test_clean_like_rna_pdb_tools(tmp_path, action, selection, expected):
+    in_path, out_path = tmp_path / "in.pdb", tmp_path / "out.pdb"
+    in_path.write_text(STRUCTURE)
+    clean_structure(str(in_path), str(out_path), action, selection)
+    assert out_path.read_text() == expected
+
+
+def test_residue_numbers():
+    line = "ATOM      1 P      G A{}       1.000   2.000   3.000  1.00  0.00           P"
+    assert get_residue_number(line.format("  12A")) == 12
+    assert get_residue_number(line.format("9999 ")) == 9999
+    assert get_residue_number(line.format("A000 ")) == 10000
+    assert get_residue_number(line.format("ZZZZ ")) + 1 == get_residue_number(line.format("a000 "))
+    with pytest.raises(ValueError, match="Invalid residue number"):
+        get_residue_number(line.format("     "))
@@ -0,0 +1,55 @@
+import os
+import sys
+
+from src.scheduler.rnadvisor_command import WORKER_PATH
+from src.scheduler.worker_pool import WorkerPool
+
+FAKE_MAIN = """
+import argparse
+import os
+
+parser = argparse.ArgumentParser()
+for arg in ["native_path", "pred_path", "result_path", "all_scores"]:
+    parser.add_argument(f"--{arg}")
+args = parser.parse_args()
+if args.all_scores == "FAIL":
+    raise ValueError("Unknown score")
+if args.all_scores == "BIG":
+    data = bytearray(200 * 1024**2)
+with open(args.result_path, "w") as file:
+    file.write(str(os.getpid()))
+"""
+
+
+def test_jobs_are_run_by_long_lived_workers(tmp_path):
+    main_path = tmp_path / "main.py"
+    main_path.write_text(FAKE_MAIN)
+    command = [sys.executable, WORKER_PATH, f"--main={main_path}"]
+    jobs = [
+        {"native_path": "native.pdb", "pred_path": "pred.pdb", "all_scores": "ALL"}
+        for _ in range(6)
+    ]
+    for i, job in enumerate(jobs):
+        job["result_path"] = str(tmp_path / f"out_{i}.txt")
+    jobs[2]["all_scores"] = "FAIL"
+    with WorkerPool(command, n_workers=2) as pool:
+        responses = pool.map(jobs)
+    assert [response["status"] for response in responses] == ["ok"] * 2 + ["error"] + ["ok"] * 3
+    assert "Unknown score" in responses[2]["error"]
+    assert not os.path.exists(jobs[2]["result_path"])
+    # A failed job does not stop its worker
+    pids = {(tmp_path / f"out_{i}.txt").read_text() for i in [0, 1, 3, 4, 5]}
+    assert len(pids) <= 2
+
+
+def test_job_maxrss_excludes_the_previous_jobs(tmp_path):
+    main_path = tmp_path / "main.py"
+    main_path.write_text(FAKE_MAIN)
+    command = [sys.executable, WORKER_PATH, f"--main={main_path}"]
+    result_path = str(tmp_path / "out.txt")
+    with WorkerPool(command) as pool:
+        big = pool.run("native.pdb", "pred.pdb", result_path, all_scores="BIG")
+        small = pool.run("native.pdb", "pred.pdb", result_path, all_scores="SMALL")
+    assert big["status"] == small["status"] == "ok"
+    assert big["job_maxrss"] > 200 * 1024
+    assert small["job_maxrss"] < 100 * 1024
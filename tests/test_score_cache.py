@@ -0,0 +1,106 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.scores.pcc import PCC
+from src.scores.ranker import Ranker
+from src.scores.score_matrix import ScoreMatrix
+from src.utils.evaluation_helper import EvaluationHelper
+from src.utils.score_cache import ScoreCache
+
+ENERGIES = ["E1", "E2"]
+METRICS = ["M1", "M2"]
+
+
+def write_csv(csv_dir, rna, seed=0, n_decoys=30):
+    rng = np.random.default_rng(seed)
+    names = [f"normalized_{rna}.pdb"] + [f"normalized_{rna}_M{i}.pdb" for i in range(n_decoys)]
+    columns = ["RMSD", "MCQ", "RASP-ENERGY", "DFIRE"]
+    df = pd.DataFrame(rng.random((len(names), len(columns))), index=names, columns=columns)
+    df.to_csv(os.path.join(csv_dir, f"{rna}.csv"))
+
+
+def compute_all_scores(csv_dir, save_path, incremental):
+    helper = EvaluationHelper(
+        ["RMSD", "MCQ"], ["RASP", "DFIRE"], csv_dir, save_path, incremental=incremental
+    )
+    return helper.compute_all_scores()
+
+
+def test_incremental_matches_a_full_recompute(tmp_path, monkeypatch):
+    # The CSVs and the scores are cached in ./docker_data/cache
+    monkeypatch.chdir(tmp_path)
+    csv_dir = tmp_path / "csvs"
+    csv_dir.mkdir()
+    for i, rna in enumerate(["r1", "r2", "r3"]):
+        write_csv(str(csv_dir), rna, seed=i)
+    compute_all_scores(str(csv_dir), str(tmp_path / "incremental"), incremental=True)
+    # A changed RNA, a new RNA and a removed RNA
+    write_csv(str(csv_dir), "r1", seed=10)
+    write_csv(str(csv_dir), "r4", seed=4)
+    os.remove(csv_dir / "r2.csv")
+    scores = compute_all_scores(str(csv_dir), str(tmp_path / "incremental"), incremental=True)
+    expected = compute_all_scores(str(csv_dir), str(tmp_path / "full"), incremental=False)
+    for score_name, expected_scores in expected.items():
+        pd.testing.assert_frame_equal(
+            pd.DataFrame(scores[score_name]), pd.DataFrame(expected_scores)
+        )
+        with open(tmp_path / "incremental" / f"{score_name}.csv") as file1, open(
+            tmp_path / "full" / f"{score_name}.csv"
+        ) as file2:
+            assert file1.read() == file2.read()
+
+
+def counting(score_class):
+    """Subclass of a score that records the pairs (energy, metric) it computes"""
+
+    class CountingScore(score_class):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.computed = []
+
+        def _compute_scores(self, metrics_list, energy_list, score_matrix):
+            self.computed.extend(
+                (energy, metric) for energy in energy_list for metric in metrics_list
+            )
+            return super()._compute_scores(metrics_list, energy_list, score_matrix)
+
+    CountingScore.__name__ = score_class.__name__
+    return CountingScore
+
+
+def get_score_matrices(seed=0, **changes):
+    rng = np.random.default_rng(seed)
+    names = ["normalized_r1.pdb"] + [f"r1_M{i}.pdb" for i in range(10)]
+    df = pd.DataFrame(rng.random((11, 4)), index=names, columns=ENERGIES + METRICS)
+    for column, values in changes.items():
+        df[column] = values
+    return {"r1": ScoreMatrix(df, "r1")}
+
+
+def test_metric_change_keeps_the_ranks(tmp_path):
+    cache = ScoreCache(str(tmp_path / "scores.csv"))
+    ranker = counting(Ranker)(False, [], [])
+    cache.compute_rna_scores(ranker, ENERGIES, METRICS, get_score_matrices())
+    ranker.computed.clear()
+    # The rank of the native does not read the metrics
+    scores = cache.compute_rna_scores(
+        ranker, ENERGIES, METRICS, get_score_matrices(M1=np.arange(11.0))
+    )
+    assert ranker.computed == []
+    expected = ranker.compute_rna_scores(ENERGIES, METRICS, get_score_matrices())
+    np.testing.assert_array_equal(scores, expected)
+
+
+def test_only_the_changed_cells_are_computed(tmp_path):
+    cache = ScoreCache(str(tmp_path / "scores.csv"))
+    pcc = counting(PCC)([], [])
+    cache.compute_rna_scores(pcc, ENERGIES, METRICS, get_score_matrices())
+    pcc.computed.clear()
+    score_matrices = get_score_matrices(M2=np.arange(11.0))
+    scores = cache.compute_rna_scores(pcc, ENERGIES, METRICS, score_matrices)
+    assert sorted(pcc.computed) == [("E1", "M2"), ("E2", "M2")]
+    np.testing.assert_allclose(
+        scores, PCC([], []).compute_rna_scores(ENERGIES, METRICS, score_matrices)
+    )
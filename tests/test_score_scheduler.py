@@ -0,0 +1,141 @@
+import os
+import sys
+
+import pandas as pd
+
+from src.scheduler.rnadvisor_command import RNAdvisorCommand
+from src.scheduler.score_scheduler import ScoreJob, ScoreScheduler
+from src.utils.decoy_archive import pack_rna
+from src.utils.result_cache import ResultCache
+
+FAKE_RNADVISOR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_rnadvisor.py")
+DECOYS = ["r1_M1.pdb", "r1_M2.pdb", "r1_M3.pdb"]
+ROWS = ["normalized_r1.pdb"] + [f"normalized_{decoy}" for decoy in DECOYS]
+
+
+def write_dataset(input_dir, rna="r1"):
+    os.makedirs(os.path.join(input_dir, "DS", "NATIVE"), exist_ok=True)
+    os.makedirs(os.path.join(input_dir, "DS", "PREDS", rna))
+    with open(os.path.join(input_dir, "DS", "NATIVE", f"{rna}.pdb"), "w") as file:
+        file.write("native\n")
+    for decoy in DECOYS:
+        decoy = decoy.replace("r1", rna)
+        with open(os.path.join(input_dir, "DS", "PREDS", rna, decoy), "w") as file:
+            file.write(f"{decoy}\n")
+
+
+def get_scheduler(tmp_path, **kwargs) -> ScoreScheduler:
+    return ScoreScheduler(
+        ["DS"],
+        str(tmp_path / "input"),
+        str(tmp_path / "output"),
+        command=RNAdvisorCommand(executable=f"{sys.executable} {FAKE_RNADVISOR}"),
+        **kwargs,
+    )
+
+
+def test_done_rnas_are_skipped(tmp_path, monkeypatch):
+    for rna in ["r1", "r2"]:
+        write_dataset(str(tmp_path / "input"), rna)
+    log_path = tmp_path / "calls.txt"
+    monkeypatch.setenv("FAKE_RNADVISOR_LOG", str(log_path))
+    report = get_scheduler(tmp_path, n_workers=2).run()
+    assert sorted(job.rna for job in report["done"]) == ["r1", "r2"]
+    df = pd.read_csv(tmp_path / "output" / "DS" / "r1.csv", index_col=[0])
+    assert df.index.tolist() == ROWS
+    report = get_scheduler(tmp_path, n_workers=2).run()
+    assert sorted(job.rna for job in report["skipped"]) == ["r1", "r2"]
+    assert log_path.read_text().split() == ["3", "3"]
+
+
+def test_failed_rnas_are_retried(tmp_path):
+    write_dataset(str(tmp_path / "input"))
+    # RNAdvisor that logs each run and fails
+    main_path = tmp_path / "main.py"
+    log_path = tmp_path / "calls.txt"
+    main_path.write_text(f"open({str(log_path)!r}, 'a').write('run\\n')\nraise ValueError\n")
+    scheduler = ScoreScheduler(
+        ["DS"],
+        str(tmp_path / "input"),
+        str(tmp_path / "output"),
+        retries=2,
+        command=RNAdvisorCommand(executable=f"{sys.executable} {main_path}"),
+    )
+    report = scheduler.run()
+    assert [job.rna for job in report["failed"]] == ["r1"]
+    assert len(log_path.read_text().split()) == 3
+    assert not os.path.exists(tmp_path / "output" / "DS" / "r1.csv")
+
+
+def test_cache_keeps_all_rows(tmp_path, monkeypatch):
+    write_dataset(str(tmp_path / "input"))
+    log_path = tmp_path / "calls.txt"
+    monkeypatch.setenv("FAKE_RNADVISOR_LOG", str(log_path))
+    output_path = tmp_path / "output" / "DS" / "r1.csv"
+    cache = ResultCache(str(tmp_path / "cache.sqlite"))
+    get_scheduler(tmp_path, cache=cache).run()
+    expected = pd.read_csv(output_path, index_col=[0])
+    assert expected.index.tolist() == ROWS
+    # A modified decoy is the only one computed again
+    with open(tmp_path / "input" / "DS" / "PREDS" / "r1" / DECOYS[1], "w") as file:
+        file.write("modified\n")
+    os.remove(output_path)
+    get_scheduler(tmp_path, cache=cache).run()
+    df = pd.read_csv(output_path, index_col=[0])
+    assert df.index.tolist() == ROWS
+    assert log_path.read_text().split() == ["3", "1"]
+    unchanged = [row for row in ROWS if row != f"normalized_{DECOYS[1]}"]
+    pd.testing.assert_frame_equal(df.loc[unchanged], expected.loc[unchanged])
+
+
+def test_shards_are_merged_in_order(tmp_path):
+    write_dataset(str(tmp_path / "input"))
+    get_scheduler(tmp_path, shard_size=1).run()
+    df = pd.read_csv(tmp_path / "output" / "DS" / "r1.csv", index_col=[0])
+    assert df.index.tolist() == ROWS
+
+
+def test_archived_rnas_are_scored(tmp_path):
+    input_dir = str(tmp_path / "input")
+    write_dataset(input_dir)
+    pack_rna(input_dir, "DS", "r1", remove=True)
+    scheduler = get_scheduler(tmp_path)
+    assert [job.rna for job in scheduler.run()["done"]] == ["r1"]
+    df = pd.read_csv(tmp_path / "output" / "DS" / "r1.csv", index_col=[0])
+    assert df.index.tolist() == ROWS
+    # The extracted decoys are removed once scored
+    assert not os.path.exists(scheduler.get_archive_dir("DS", "r1"))
+
+
+class ExtractionScheduler(ScoreScheduler):
+    """Record the RNAs whose decoys are on disk when a job is scheduled"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.extracted = []
+
+    def extract_decoys(self, job: ScoreJob):
+        decoys_dir = os.path.dirname(job.pred_path)
+        on_disk = sorted(os.listdir(decoys_dir)) if os.path.isdir(decoys_dir) else []
+        self.extracted.append((job.rna, on_disk))
+        super().extract_decoys(job)
+
+
+def test_archives_are_extracted_one_job_at_a_time(tmp_path):
+    input_dir = str(tmp_path / "input")
+    for rna in ["r1", "r2"]:
+        write_dataset(input_dir, rna)
+        pack_rna(input_dir, "DS", rna, remove=True)
+    scheduler = ExtractionScheduler(
+        ["DS"],
+        input_dir,
+        str(tmp_path / "output"),
+        command=RNAdvisorCommand(executable=f"{sys.executable} {FAKE_RNADVISOR}"),
+    )
+    jobs = scheduler.get_jobs()
+    assert not os.path.exists(jobs[0].pred_path)
+    assert len(scheduler.run()["done"]) == 2
+    assert sorted(scheduler.extracted) == [("r1", []), ("r2", [])]
+    assert not os.path.exists(jobs[0].pred_path)
+    df = pd.read_csv(tmp_path / "output" / "DS" / "r2.csv", index_col=[0])
+    assert df.index.tolist() == [row.replace("r1", "r2") for row in ROWS]
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from src.utils.score_store import ScoreStore
+
+
+def get_df(rna: str, n_decoys: int) -> pd.DataFrame:
+    names = [f"normalized_{rna}.pdb"] + [f"{rna}_M{i}.pdb" for i in range(n_decoys)]
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({"RMSD": rng.random(len(names)), "RASP": rng.random(len(names))}, names)
+
+
+def test_store_keeps_the_rows_of_each_rna():
+    dfs = {"r1": get_df("r1", 3), "r2": get_df("r2", 5).drop(columns=["RASP"])}
+    dfs["r2"]["DFIRE"] = np.arange(6.0)
+    store = ScoreStore.from_dfs(dfs)
+    assert store.rna_names == ["r1", "r2"]
+    for rna, df in dfs.items():
+        pd.testing.assert_frame_equal(store.get_rna(rna)[store.columns[rna]], df.astype(np.float32))
+        assert store.get_score_matrix(rna).get_native_indexes().tolist() == [0]
+    expected = pd.concat([df.iloc[1:] for df in dfs.values()]).astype(np.float32)
+    pd.testing.assert_frame_equal(store.get_frame(), expected)
+    pd.testing.assert_frame_equal(
+        store.get_frame(["r2"], remove_native=False),
+        dfs["r2"].reindex(columns=expected.columns).astype(np.float32),
+    )
+
+
+def test_frame_is_sampled_per_rna():
+    store = ScoreStore.from_dfs({"r1": get_df("r1", 100), "r2": get_df("r2", 300)})
+    df = store.get_frame(max_rows=40)
+    assert len(df) == 40
+    assert df.index.str.startswith("r1_").sum() == 10
+    assert not df.index.str.startswith("normalized_").any()
+    assert df.equals(store.get_frame(max_rows=40))
+    assert len(store.get_frame(max_rows=1000)) == 400
+
+
+def test_only_the_normalized_native_is_removed():
+    df = get_df("r1", 3).rename(index={"r1_M0.pdb": "r1.pdb"})
+    store = ScoreStore.from_dfs({"r1": df})
+    assert store.get_frame().index.tolist() == ["r1.pdb", "r1_M1.pdb", "r1_M2.pdb"]
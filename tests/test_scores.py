@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import pearsonr
+
+from src.scores.enrichment_score import EnrichmentScore
+from src.scores.pcc import PCC
+from src.scores.ranker import Ranker
+from src.scores.score_matrix import to_score_matrices
+from src.scores.top_ranker import TopRanker
+
+METRICS = ["RMSD", "INF-ALL", "MCQ"]
+ENERGIES = ["RASP", "DFIRE", "εSCORE"]
+ASCENDING_METRICS = ["INF-ALL"]
+ASCENDING_ENERGIES = ["εSCORE"]
+
+
+def get_dfs(n_rnas=4, n_decoys=30, seed=0):
+    """Scores of a few RNAs, with ties, NaN, INF and a missing energy"""
+    rng = np.random.default_rng(seed)
+    dfs = {}
+    for i_rna in range(n_rnas):
+        rna = f"r{i_rna}"
+        names = [f"normalized_{rna}.pdb"] + [f"normalized_{rna}_M{i}.pdb" for i in range(n_decoys)]
+        df = pd.DataFrame(
+            rng.integers(0, 10, (len(names), len(METRICS + ENERGIES))).astype(float),
+            index=names,
+            columns=METRICS + ENERGIES,
+        )
+        df.iloc[rng.integers(0, len(names), 3), 1] = np.nan
+        df.iloc[rng.integers(0, len(names), 2), 4] = np.inf
+        if i_rna == 0:
+            df = df.drop(columns=["DFIRE"])
+        dfs[rna] = df
+    return dfs
+
+
+def get_sorted_names(df: pd.DataFrame, column: str, ascending_columns):
+    return df.sort_values(by=column, ascending=(column not in ascending_columns)).index.tolist()
+
+
+def get_native_rank(df: pd.DataFrame, energy: str, name: str) -> int:
+    sorted_names = get_sorted_names(df, energy, ASCENDING_ENERGIES)
+    if f"normalized_{name}.pdb" in sorted_names:
+        return sorted_names.index(f"normalized_{name}.pdb")
+    return sorted_names.index(f"{name}.pdb")
+
+
+def pcc_loop(metric, energy, df, name):
+    values = np.nan_to_num(df[[metric, energy]].to_numpy(), nan=1e301)
+    values = values[(values < 1e300).all(axis=1)]
+    try:
+        return abs(pearsonr(values[:, 0], values[:, 1])[0])
+    except ValueError:
+        return np.nan
+
+
+def es_loop(metric, energy, df, name):
+    n_top = int(len(df) * 0.1)
+    top_metrics = get_sorted_names(df, metric, ASCENDING_METRICS)[:n_top]
+    top_energies = get_sorted_names(df, energy, ASCENDING_ENERGIES)[:n_top]
+    if top_metrics == top_energies:
+        return 10
+    return 100 * len(set(top_metrics) & set(top_energies)) / (len(df) - 1)
+
+
+def rank_loop(metric, energy, df, name):
+    return get_native_rank(df, energy, name) + 1
+
+
+def top_loop(metric, energy, df, name):
+    return 1 if get_native_rank(df, energy, name) < 1 else 0
+
+
+def compute_score_loop(score_helper, score_fn, dfs):
+    """Score of each pair (energy, metric), computed one RNA and one pair at a time"""
+    scores = {energy: {metric: [] for metric in METRICS} for energy in ENERGIES}
+    for energy in ENERGIES:
+        for metric in METRICS:
+            for name, df in dfs.items():
+                try:
+                    current_score = score_fn(metric, energy, df, name)
+                except KeyError:
+                    current_score = np.nan
+                if not np.isnan(current_score):
+                    scores[energy][metric].append(current_score)
+    return score_helper.convert_dict_to_df(scores)
+
+
+SCORES = [
+    (PCC(ASCENDING_METRICS, ASCENDING_ENERGIES), pcc_loop),
+    (EnrichmentScore(ASCENDING_METRICS, ASCENDING_ENERGIES), es_loop),
+    (Ranker(False, ASCENDING_METRICS, ASCENDING_ENERGIES), rank_loop),
+    (TopRanker(1, ASCENDING_METRICS, ASCENDING_ENERGIES), top_loop),
+]
+
+
+@pytest.mark.filterwarnings("ignore")
+@pytest.mark.parametrize("score_helper, score_fn", SCORES)
+def test_scores_match_the_loop_over_pairs(score_helper, score_fn):
+    dfs = get_dfs()
+    expected = compute_score_loop(score_helper, score_fn, dfs)
+    scores = score_helper.compute_score(ENERGIES, METRICS, dfs)
+    pd.testing.assert_frame_equal(pd.DataFrame(scores), pd.DataFrame(expected), check_dtype=False)
+
+
+@pytest.mark.filterwarnings("ignore")
+def test_scores_share_the_sorted_columns():
+    dfs = get_dfs()
+    score_matrices = to_score_matrices(dfs)
+    for score_helper, score_fn in SCORES:
+        expected = compute_score_loop(score_helper, score_fn, dfs)
+        scores = score_helper.compute_score(ENERGIES, METRICS, score_matrices)
+        pd.testing.assert_frame_equal(
+            pd.DataFrame(scores), pd.DataFrame(expected), check_dtype=False
+        )
+    # Each column is sorted once, in the order of its scores
+    rank_index = score_matrices["r1"].rank_index
+    assert sorted(rank_index._sort_indexes) == sorted(
+        (column, column not in ASCENDING_METRICS + ASCENDING_ENERGIES)
+        for column in METRICS + ENERGIES
+    )
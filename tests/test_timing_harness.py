@@ -0,0 +1,76 @@
+import os
+import sys
+
+import pandas as pd
+
+from src.scheduler.rnadvisor_command import RNAdvisorCommand
+from src.time_benchmark.timing_harness import TimingHarness, parse_cpus
+
+# Logs the score and the CPUs of each run
+LOGGING_RNADVISOR = """
+import os
+import sys
+
+with open(os.environ["FAKE_RNADVISOR_LOG"], "a") as file:
+    file.write(f"{sys.argv[-1]} {sorted(os.sched_getaffinity(0))}\\n")
+"""
+
+# A process and its child that both hold 100 MB at the same time
+FAKE_RNADVISOR = """
+import os
+import time
+
+pid = os.fork()
+data = bytearray(100 * 1024**2)
+time.sleep(0.5)
+if pid == 0:
+    os._exit(0)
+os.waitpid(pid, 0)
+"""
+
+
+def test_runs_are_warmed_up_and_repeated(tmp_path, monkeypatch):
+    decoys_dir = tmp_path / "input" / "decoys" / "length_10"
+    decoys_dir.mkdir(parents=True)
+    for decoy in ["a.pdb", "b.pdb"]:
+        (decoys_dir / decoy).write_text("decoy\n")
+    script_path = tmp_path / "rnadvisor.py"
+    script_path.write_text(LOGGING_RNADVISOR)
+    log_path = tmp_path / "runs.txt"
+    monkeypatch.setenv("FAKE_RNADVISOR_LOG", str(log_path))
+    harness = TimingHarness(
+        str(tmp_path / "input"),
+        str(tmp_path / "output"),
+        scores=["RMSD", "MCQ"],
+        warmup=1,
+        repeats=2,
+        cpus={0},
+        command=RNAdvisorCommand(executable=f"{sys.executable} {script_path}"),
+    )
+    harness.run()
+    runs = log_path.read_text().splitlines()
+    assert len(runs) == 2 * 2 * (1 + 2)
+    assert set(runs) == {"--all_scores=RMSD [0]", "--all_scores=MCQ [0]"}
+    df = pd.read_csv(tmp_path / "output" / "length_10.csv")
+    assert len(df) == 2 * 2 * 2
+    assert sorted(df["repeat"].unique()) == [0, 1]
+    assert (df["returncode"] == 0).all()
+    summary = pd.read_csv(tmp_path / "output" / "summary.csv")
+    assert summary["score"].tolist() == ["MCQ", "RMSD"]
+    assert summary["wall_count"].tolist() == [4, 4]
+    assert not os.path.exists(tmp_path / "input" / "tmp_harness")
+
+
+def test_parse_cpus():
+    assert parse_cpus("0-3,6") == {0, 1, 2, 3, 6}
+
+
+def test_max_rss_sums_the_process_tree(tmp_path):
+    script_path = tmp_path / "rnadvisor.py"
+    script_path.write_text(FAKE_RNADVISOR)
+    command = RNAdvisorCommand(executable=f"{sys.executable} {script_path}")
+    harness = TimingHarness(str(tmp_path), str(tmp_path), command=command)
+    argv = harness.get_argv("native.pdb", "pred.pdb", str(tmp_path / "out.csv"), "RMSD")
+    measure = harness.run_once(argv, str(tmp_path))
+    assert measure["returncode"] == 0
+    assert measure["max_rss"] > 180 * 1024
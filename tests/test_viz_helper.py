@@ -0,0 +1,87 @@
+import os
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.visualisation.viz_helper import LIST_ENERGIES, NEGATIVE_ENERGY, VizHelper
+
+pytest.importorskip("pyarrow")
+
+METRICS = ["RMSD", "MCQ"]
+COLUMNS = ["RMSD", "MCQ", "RASP-ENERGY", "BARNABA-eSCORE", "DFIRE", "rsRNASP"]
+
+
+def write_csvs(csv_folder, n_rnas=3, n_decoys=20):
+    os.makedirs(csv_folder)
+    rng = np.random.default_rng(0)
+    for i_rna in range(n_rnas):
+        rna = f"r{i_rna}"
+        names = [f"normalized_{rna}.pdb"] + [f"normalized_{rna}_M{i}.pdb" for i in range(n_decoys)]
+        df = pd.DataFrame(rng.normal(size=(len(names), len(COLUMNS))), index=names, columns=COLUMNS)
+        df.to_csv(os.path.join(csv_folder, f"{rna}.csv"))
+
+
+def convert_loop(viz_helper, energies, metrics, normalize):
+    """Long frame of the plots, built one (metric, energy) pair at a time"""
+    df = viz_helper.df[energies + metrics]
+    new_df: Dict = {"Metric": [], "metric": [], "energy": [], "Energy": [], "RNA": []}
+    for metric in metrics:
+        for energy in energies:
+            new_df["RNA"].extend(df.index.tolist())
+            new_df["Energy"].extend(len(df) * [energy])
+            new_df["Metric"].extend(len(df) * [metric])
+            new_df["metric"].extend(df[metric].values)
+            if normalize:
+                energy_normalized = (
+                    viz_helper.energy_normalizer[energy]
+                    .transform(df[energy].values.reshape(-1, 1))
+                    .reshape(-1)
+                )
+            else:
+                energy_normalized = df[energy].values
+            if energy in NEGATIVE_ENERGY:
+                energy_normalized = 1 * normalize - energy_normalized
+            energy_normalized = np.log(1e-10 + abs(energy_normalized))
+            new_df["energy"].extend(energy_normalized)
+    return pd.DataFrame(new_df)
+
+
+@pytest.fixture
+def viz_helper(tmp_path, monkeypatch):
+    csv_folder = str(tmp_path / "output")
+    write_csvs(csv_folder)
+    # The CSVs are cached in ./docker_data/cache
+    monkeypatch.chdir(tmp_path)
+    return VizHelper(csv_folder)
+
+
+@pytest.mark.parametrize("normalize", [True, False])
+def test_plot_frame_matches_the_loop(viz_helper, normalize):
+    df = viz_helper._convert_df_to_plot(LIST_ENERGIES, METRICS, [], normalize=normalize)
+    expected = convert_loop(viz_helper, LIST_ENERGIES, METRICS, normalize)
+    df = df.astype({"Metric": str, "Energy": str})
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_decoys_are_sampled_before_the_frame_is_built(viz_helper):
+    n_pairs = len(METRICS) * len(LIST_ENERGIES)
+    df = viz_helper._convert_df_to_plot(LIST_ENERGIES, METRICS, [], max_points=30 * n_pairs)
+    assert len(df) == 30 * n_pairs
+    # The same fraction of the decoys of each RNA, with all their (metric, energy) pairs
+    rnas = df["RNA"].str.extract(r"normalized_(r\d)_")[0]
+    assert rnas.value_counts().tolist() == [10 * n_pairs] * 3
+    full_df = viz_helper._convert_df_to_plot(LIST_ENERGIES, METRICS, [])
+    expected = full_df[full_df["RNA"].isin(df["RNA"])].reset_index(drop=True)
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_filter_removes_the_non_finite_values(viz_helper):
+    df = pd.DataFrame(
+        {
+            "metric": np.array([1, np.nan, 2, 3, 0, 4], dtype=np.float32),
+            "energy": np.array([1, 2, np.inf, -np.inf, 5, 6], dtype=np.float32),
+        }
+    )
+    assert viz_helper.filter_df(df)["metric"].tolist() == [1, 4]
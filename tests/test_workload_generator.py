@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.utils.workload_generator import WorkloadGenerator
+
+
+def write_native(pdb_path, chains):
+    """Native with 2 atoms per residue, and the given number of residues per chain"""
+    serial = 0
+    with open(pdb_path, "w") as file:
+        for chain_id, n_residues in chains.items():
+            for i in range(n_residues):
+                for atom in ["P", "C1'"]:
+                    serial += 1
+                    file.write(
+                        f"ATOM  {serial:>5} {atom:<4}   G {chain_id}{i + 1:>4}    "
+                        f"{i:8.3f}{serial:8.3f}{0:8.3f}  1.00  0.00           {atom[0]}\n"
+                    )
+            file.write("TER\n")
+        file.write("END\n")
+
+
+def read_decoys(output_path):
+    decoys = {}
+    for root, _, names in os.walk(output_path):
+        for name in [name for name in names if name.endswith(".pdb")]:
+            with open(os.path.join(root, name), "rb") as file:
+                decoys[os.path.relpath(os.path.join(root, name), output_path)] = file.read()
+    return decoys
+
+
+def test_workload_is_the_same_for_any_number_of_processes(tmp_path):
+    natives = {str(tmp_path / "n1.pdb"): ["A", "B"], str(tmp_path / "n2.pdb"): None}
+    write_native(str(tmp_path / "n1.pdb"), {"A": 25, "B": 20, "C": 50})
+    write_native(str(tmp_path / "n2.pdb"), {"A": 30})
+    workloads = {}
+    for n_jobs in [1, 3]:
+        output_path = str(tmp_path / f"workload_{n_jobs}")
+        manifest = WorkloadGenerator(
+            natives, output_path, min_len=10, max_len=40, step=10, n_decoys=3, n_jobs=n_jobs
+        ).run()
+        manifest["native_path"] = manifest["native_path"].str.replace(output_path, "")
+        manifest["pred_path"] = manifest["pred_path"].str.replace(output_path, "")
+        workloads[n_jobs] = manifest, read_decoys(output_path)
+    manifest, decoys = workloads[1]
+    pd.testing.assert_frame_equal(workloads[3][0], manifest)
+    assert workloads[3][1] == decoys
+    # The selected chains of n1 have 45 residues, and n2 has 30
+    assert manifest.groupby("rna")["length"].max().to_dict() == {"n1": 40, "n2": 30}
+    assert len(manifest) == 3 * (4 + 3)
+    assert manifest["seed"].is_unique
+    assert len(set(decoys.values())) == len(decoys)
+
+
+def test_residue_noise_moves_each_residue_as_a_block(tmp_path):
+    native_path = str(tmp_path / "native.pdb")
+    write_native(native_path, {"A": 20})
+    output_path = str(tmp_path / "workload")
+    manifest = WorkloadGenerator(
+        {native_path: None}, output_path, min_len=10, max_len=10, n_decoys=1, noise_model="residue"
+    ).run()
+
+    def read_coords(pdb_path):
+        with open(pdb_path) as file:
+            lines = [line for line in file if line.startswith("ATOM")]
+        return np.array(
+            [[float(line[i : i + 8]) for i in (30, 38, 46)] for line in lines]  # noqa: E203
+        )
+
+    moves = read_coords(manifest.loc[0, "pred_path"]) - read_coords(manifest.loc[0, "native_path"])
+    assert len(moves) == 20
+    np.testing.assert_allclose(moves[0::2], moves[1::2], atol=2e-3)
+    assert np.abs(moves).max() > 0.01